@@ -25,6 +25,7 @@ CREATE TABLE WFHRequest (
     status VARCHAR(20) DEFAULT 'PENDING',
     reason_for_applying TEXT,
     reason_for_rejection TEXT DEFAULT NULL,
+    change_seq BIGINT DEFAULT NULL,
     FOREIGN KEY (staff_id) REFERENCES Staff(staff_id),
     FOREIGN KEY (manager_id) REFERENCES Staff(staff_id)
 );
@@ -40,11 +41,54 @@ CREATE TABLE WFHSchedule (
     dept VARCHAR(255) NOT NULL,
     position VARCHAR(255) NOT NULL,    
     reason_for_withdrawing TEXT DEFAULT NULL,
+    change_seq BIGINT DEFAULT NULL,
     FOREIGN KEY (request_id) REFERENCES WFHRequest(request_id),
     FOREIGN KEY (staff_id) REFERENCES Staff(staff_id),
     FOREIGN KEY (manager_id) REFERENCES Staff(staff_id)
 );
 
+CREATE TABLE TeamDailyOccupancy (
+    manager_id INT NOT NULL,
+    date DATE NOT NULL,
+    wfh_count_am INT NOT NULL DEFAULT 0,
+    wfh_count_pm INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (manager_id, date),
+    FOREIGN KEY (manager_id) REFERENCES Staff(staff_id)
+);
+
+CREATE TABLE ChangeSequence (
+    id INT PRIMARY KEY,
+    seq BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE WFHEvent (
+    event_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    kind VARCHAR(32) NOT NULL,
+    staff_id INT NOT NULL,
+    manager_id INT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    change_seq BIGINT DEFAULT NULL
+);
+
+CREATE TABLE CacheVersion (
+    scope VARCHAR(64) PRIMARY KEY,
+    seq BIGINT NOT NULL DEFAULT 0,
+    bumped_at DATETIME DEFAULT NULL
+);
+
+CREATE INDEX ix_wfhrequest_manager_status ON WFHRequest (manager_id, status);
+CREATE INDEX ix_wfhrequest_staff_start_status ON WFHRequest (staff_id, start_date, status);
+CREATE INDEX ix_wfhrequest_status_start ON WFHRequest (status, start_date);
+CREATE INDEX ix_wfhrequest_change_seq ON WFHRequest (change_seq);
+
+CREATE INDEX ix_wfhschedule_staff_date_status ON WFHSchedule (staff_id, date, status);
+CREATE INDEX ix_wfhschedule_date_status ON WFHSchedule (date, status);
+CREATE INDEX ix_wfhschedule_manager_status ON WFHSchedule (manager_id, status);
+CREATE INDEX ix_wfhschedule_request_id ON WFHSchedule (request_id);
+CREATE INDEX ix_wfhschedule_change_seq ON WFHSchedule (change_seq);
+CREATE INDEX ix_wfhevent_change_seq ON WFHEvent (change_seq);
+
 
 INSERT INTO Staff (staff_id, staff_fname, staff_lname, dept, position, country, email, reporting_manager, role, password)
 VALUES 
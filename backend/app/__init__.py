@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from config import Config
+from app.log import configure_logging
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -12,6 +13,9 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Configure logging
+    configure_logging(app)
+
     # Configure CORS
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
@@ -24,6 +28,30 @@ def create_app(config_class=Config):
     app.register_blueprint(staff_controller.staff_bp)
     app.register_blueprint(wfh_controller.wfh_bp)
 
+    # Per-route latency and query metrics on /metrics
+    if app.config.get('METRICS_ENABLED', True):
+        from app.metrics import init_metrics
+
+        init_metrics(app)
+
+    # Versioned cache for schedule summary and detail views
+    if app.config.get('RESPONSE_CACHE_ENABLED', False):
+        from app.cache import init_cache
+
+        init_cache(app)
+
+    # Server-sent event stream of request and occupancy changes
+    if app.config.get('EVENT_STREAM_ENABLED', False):
+        from app.events import init_events
+
+        init_events(app)
+
+    # Register CLI commands
+    from app.commands import rebuild_occupancy_command, check_indexes_command
+
+    app.cli.add_command(rebuild_occupancy_command)
+    app.cli.add_command(check_indexes_command)
+
     @app.route("/")
     def test():
         return "Welcome to the WFH Scheduler API."
@@ -0,0 +1,480 @@
+import functools
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session, attributes
+from app import db
+from app.models.cache_version import CacheVersion
+from app.models.staff import Staff
+from app.models.wfh_schedule import WFHSchedule
+from app.services.org_hierarchy_service import OrgHierarchyService
+
+logger = logging.getLogger(__name__)
+
+# Scope version that every cached entry depends on, bumped when the change cannot be narrowed down
+GLOBAL_SCOPE = 'global'
+# Row of the shared version table holding the latest sequence number
+SEQUENCE_SCOPE = 'sequence'
+
+# What a cached value depends on: the teams (None for the whole company) and a date range
+CacheScope = namedtuple('CacheScope', ['teams', 'start_date', 'end_date'])
+CacheEntry = namedtuple('CacheEntry', ['value', 'seq', 'scope', 'created_at'])
+
+
+def team_scope(team):
+    return f'team:{team}'
+
+
+def team_date_scope(team, day):
+    return f'team:{team}:{day.isoformat()}'
+
+
+def date_scope(day):
+    return f'date:{day.isoformat()}'
+
+
+class LRUStore:
+    """
+    Thread-safe LRU of cache entries, bounded by entry count and by the
+    approximate JSON size of the cached values.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, entry, size):
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (entry, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+
+class MemoryBackend:
+    """
+    Keeps entries and scope versions in this process. Each gunicorn worker
+    caches and invalidates on its own, so a change committed by one worker is
+    not seen by the caches of the others.
+
+    A version bumped more than RESPONSE_CACHE_TTL seconds ago can only be
+    newer than entries that have expired anyway, so such versions are pruned
+    at most once per TTL instead of one per team and date being kept forever.
+    """
+
+    def __init__(self, config):
+        self.store = LRUStore(config['RESPONSE_CACHE_MAX_ENTRIES'], config['RESPONSE_CACHE_MAX_BYTES'])
+        self.ttl = config['RESPONSE_CACHE_TTL']
+        self._seq = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._pruned_at = time.monotonic()
+
+    def current(self):
+        return self._seq
+
+    def versions(self, scopes):
+        with self._lock:
+            return {scope: self._versions[scope][0] for scope in scopes if scope in self._versions}
+
+    def bump(self, scopes):
+        now = time.monotonic()
+        with self._lock:
+            self._seq += 1
+            for scope in scopes:
+                self._versions[scope] = (self._seq, now)
+            if now - self._pruned_at >= self.ttl:
+                self._pruned_at = now
+                self._versions = {
+                    scope: version for scope, version in self._versions.items() if now - version[1] < self.ttl
+                }
+            return self._seq
+
+
+class DatabaseBackend(MemoryBackend):
+    """
+    Keeps entries in this process but the scope versions in the CacheVersion
+    table, so a change committed by any worker invalidates every worker's
+    entries. Costs one or two small queries per cache hit.
+    """
+
+    def current(self):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(CacheVersion.seq).where(CacheVersion.scope == SEQUENCE_SCOPE)
+            ).scalar() or 0
+
+    def versions(self, scopes):
+        if not scopes:
+            return {}
+        with db.engine.connect() as conn:
+            return dict(conn.execute(
+                select(CacheVersion.scope, CacheVersion.seq).where(CacheVersion.scope.in_(scopes))
+            ).all())
+
+    def bump(self, scopes):
+        now = datetime.now()
+        # Own short transaction, so bumps never hold locks inside an approval
+        with db.engine.begin() as conn:
+            conn.execute(
+                insert(CacheVersion)
+                .prefix_with('IGNORE', dialect='mysql')
+                .prefix_with('OR IGNORE', dialect='sqlite'),
+                [{'scope': scope, 'seq': 0} for scope in (SEQUENCE_SCOPE, *scopes)]
+            )
+            conn.execute(
+                update(CacheVersion).where(CacheVersion.scope == SEQUENCE_SCOPE).values(seq=CacheVersion.seq + 1)
+            )
+            seq = conn.execute(select(CacheVersion.seq).where(CacheVersion.scope == SEQUENCE_SCOPE)).scalar()
+            conn.execute(
+                update(CacheVersion).where(CacheVersion.scope.in_(scopes), CacheVersion.seq < seq)
+                .values(seq=seq, bumped_at=now)
+            )
+            if time.monotonic() - self._pruned_at >= self.ttl:
+                self._pruned_at = time.monotonic()
+                conn.execute(delete(CacheVersion).where(
+                    CacheVersion.scope != SEQUENCE_SCOPE, CacheVersion.bumped_at < now - timedelta(seconds=self.ttl)
+                ))
+        return seq
+
+
+BACKENDS = {'memory': MemoryBackend, 'database': DatabaseBackend}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Lets concurrent callers with the same key share one computation: the
+    first caller computes, the others wait for its result or its exception.
+    A waiter that gives up after `timeout` seconds computes on its own.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                logger.warning("Gave up waiting for in-flight computation of %s", key[0])
+                return fn()
+            self.shared += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class ResponseCache:
+    """
+    Caches read-only schedule views keyed by (view, arguments).
+
+    Every committed change to approved schedules bumps a version for each
+    (team, date) it touched, plus the team and the date on their own, all set
+    to one increasing sequence number. An entry remembers the sequence number
+    from before it was computed and is stale once any version in its scope is
+    newer. Team versions are checked first so untouched teams cost one lookup
+    each, whatever the date range.
+
+    Concurrent misses for the same key wait on a single computation.
+
+    Views listed in `stale_while_revalidate` as view -> (max_age, stale)
+    seconds may serve older data: an entry younger than max_age is served
+    without checking versions, and a stale entry younger than max_age + stale
+    is served while a background thread recomputes it.
+    """
+
+    def __init__(self, backend, ttl, wait_timeout, stale_while_revalidate=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.flights = SingleFlight(wait_timeout)
+        self.stale_while_revalidate = stale_while_revalidate or {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, scope_fn, compute):
+        freshness = self.stale_while_revalidate.get(key[0])
+        entry = self.backend.store.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.created_at
+            if (freshness is not None and age <= freshness[0]) or not self._is_stale(entry):
+                self.hits += 1
+                return self._served(entry.value, 'HIT', age, freshness)
+            if freshness is not None and age <= freshness[0] + freshness[1]:
+                self.stale_hits += 1
+                self._refresh_in_background(key, scope_fn, compute)
+                return self._served(entry.value, 'STALE', age, freshness)
+
+        self.misses += 1
+        # Read before computing, so a change committed meanwhile leaves the entry stale.
+        # Misses only share a computation that started after the same latest change.
+        seq = self.backend.current()
+        value = self.flights.do((key, seq), lambda: self._compute(key, seq, scope_fn, compute))
+        return self._served(value, 'MISS', 0, freshness)
+
+    def _refresh_in_background(self, key, scope_fn, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    seq = self.backend.current()
+                    self.flights.do((key, seq), lambda: self._compute(key, seq, scope_fn, compute))
+            except Exception:
+                logger.exception("Background refresh of %s failed", key[0])
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f'refresh-{key[0]}', daemon=True).start()
+
+    @staticmethod
+    def _served(value, status, age, freshness):
+        # Picked up by the after_request hook to add freshness headers
+        if has_request_context():
+            g.response_cache = {'status': status, 'age': age, 'freshness': freshness}
+        return value
+
+    def _compute(self, key, seq, scope_fn, compute):
+        scope = scope_fn()
+        value = compute()
+        if scope is not None:
+            size = len(json.dumps(value, default=str))
+            self.backend.store.set(key, CacheEntry(value, seq, scope, time.monotonic()), size)
+        return value
+
+    def bump(self, changes):
+        """
+        Bumps the versions for an iterable of (team, date) pairs; a team of
+        None bumps the global version and so invalidates every entry.
+        """
+        scopes = set()
+        for team, day in changes:
+            if team is None:
+                scopes.add(GLOBAL_SCOPE)
+                continue
+            scopes.update((team_scope(team), team_date_scope(team, day), date_scope(day)))
+        if scopes:
+            seq = self.backend.bump(sorted(scopes))
+            logger.debug("Bumped %s cache scopes to %s", len(scopes), seq)
+
+    def clear(self):
+        self.backend.store.clear()
+
+    def _is_stale(self, entry):
+        if time.monotonic() - entry.created_at >= self.ttl:
+            return True
+
+        teams, start_date, end_date = entry.scope
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        if teams is None:
+            scopes = [GLOBAL_SCOPE, *(date_scope(day) for day in days)]
+            return any(seq > entry.seq for seq in self.backend.versions(scopes).values())
+
+        versions = self.backend.versions([GLOBAL_SCOPE, *(team_scope(team) for team in teams)])
+        if versions.get(GLOBAL_SCOPE, 0) > entry.seq:
+            return True
+        changed_teams = [team for team in teams if versions.get(team_scope(team), 0) > entry.seq]
+        if not changed_teams:
+            return False
+        # Only the changed teams need their dates checked
+        versions = self.backend.versions([team_date_scope(team, day) for team in changed_teams for day in days])
+        return any(seq > entry.seq for seq in versions.values())
+
+
+def init_cache(app):
+    """
+    Creates the app's ResponseCache and adds X-Cache and Age headers, plus
+    Cache-Control for stale-while-revalidate views, to cached responses.
+    RESPONSE_CACHE_BACKEND is 'database', 'memory' or a 'module:Class' path
+    to a backend with the same methods. The memory backend is refused when
+    WEB_CONCURRENCY asks gunicorn for more than one worker.
+    """
+    name = app.config.get('RESPONSE_CACHE_BACKEND', 'database')
+    if name == 'memory' and int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        raise RuntimeError(
+            "RESPONSE_CACHE_BACKEND 'memory' cannot invalidate across workers; use 'database'")
+    if name in BACKENDS:
+        backend_class = BACKENDS[name]
+    else:
+        module_name, _, class_name = name.partition(':')
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+
+    app.extensions['response_cache'] = ResponseCache(
+        backend_class(app.config),
+        app.config['RESPONSE_CACHE_TTL'],
+        app.config['RESPONSE_CACHE_WAIT_TIMEOUT'],
+        app.config.get('RESPONSE_CACHE_STALE_WHILE_REVALIDATE'),
+    )
+
+    @app.after_request
+    def _add_freshness_headers(response):
+        served = g.pop('response_cache', None)
+        if served is not None:
+            response.headers['X-Cache'] = served['status']
+            response.headers['Age'] = str(int(served['age']))
+            if served['freshness'] is not None:
+                max_age, stale = served['freshness']
+                response.headers['Cache-Control'] = f'private, max-age={max_age}, stale-while-revalidate={stale}'
+        return response
+
+
+def get_cache():
+    if has_app_context():
+        return current_app.extensions.get('response_cache')
+    return None
+
+
+def cached(view, scope_fn):
+    """
+    Caches a read-only WFHScheduleService view. `scope_fn` takes the view's
+    arguments and returns its CacheScope, or None to skip caching the result.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            cache = get_cache()
+            if cache is None:
+                return fn(*args)
+            return cache.get_or_compute((view, *args), lambda: scope_fn(*args), lambda: fn(*args))
+        return wrapper
+    return decorator
+
+
+# Bump versions when approved schedules change, mirroring the org hierarchy invalidation
+
+def _record(session, staff_id, day):
+    session.info.setdefault('response_cache_changes', set()).add((staff_id, day))
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_schedule_flush(session, flush_context):
+    if get_cache() is None:
+        return
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, WFHSchedule) and obj.status == 'APPROVED':
+            _record(session, obj.staff_id, obj.date)
+        elif isinstance(obj, Staff):
+            _record(session, None, None)
+    for obj in session.dirty:
+        if isinstance(obj, Staff) and session.is_modified(obj):
+            _record(session, None, None)
+        if not isinstance(obj, WFHSchedule):
+            continue
+        state = attributes.instance_state(obj)
+        history = {key: state.attrs[key].history for key in ('status', 'staff_id', 'date', 'duration')}
+        if not any(h.has_changes() for h in history.values()):
+            continue
+        if 'APPROVED' not in (*history['status'].deleted, *history['status'].unchanged, *history['status'].added):
+            continue
+        for staff_id in (*history['staff_id'].deleted, *history['staff_id'].unchanged, *history['staff_id'].added):
+            for day in (*history['date'].deleted, *history['date'].unchanged, *history['date'].added):
+                _record(session, staff_id, day)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_schedule_bulk_change(orm_execute_state):
+    if orm_execute_state.is_select or get_cache() is None or not any(
+            mapper.class_ in (WFHSchedule, Staff) for mapper in orm_execute_state.all_mappers):
+        return
+    # Set by statements that only move schedules between non-approved states
+    if orm_execute_state.execution_options.get('approved_unchanged'):
+        return
+    if orm_execute_state.is_insert and all(mapper.class_ is WFHSchedule for mapper in orm_execute_state.all_mappers):
+        # Bulk inserts of new schedules only matter once they are approved
+        parameters = orm_execute_state.parameters
+        for row in parameters if isinstance(parameters, list) else [parameters or {}]:
+            if row.get('status') == 'APPROVED':
+                _record(orm_execute_state.session, row.get('staff_id'), row.get('date'))
+    else:
+        _record(orm_execute_state.session, None, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    changes = session.info.pop('response_cache_changes', None)
+    cache = get_cache()
+    if not changes or cache is None:
+        return
+    # A team is the staff member's reporting manager. Without a built org index the
+    # team cannot be looked up here, because no SQL may run after a commit.
+    index = OrgHierarchyService.cached_index()
+    resolved = set()
+    for staff_id, day in changes:
+        node = index.get_staff(staff_id) if index is not None and staff_id is not None else None
+        resolved.add((node.reporting_manager, day) if node is not None else (None, None))
+    cache.bump(resolved)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('response_cache_changes', None)
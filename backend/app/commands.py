@@ -0,0 +1,53 @@
+import click
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from app import db
+from app.services.team_occupancy_service import TeamOccupancyService
+
+
+@click.command('rebuild-occupancy')
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='First date to rebuild (YYYY-MM-DD). Defaults to 2 months before today.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last date to rebuild (YYYY-MM-DD). Defaults to 3 months after today.')
+@with_appcontext
+def rebuild_occupancy_command(start_date, end_date):
+    """Recompute TeamDailyOccupancy from approved schedules for a date range."""
+    today = datetime.now().date()
+    start_date = start_date.date() if start_date else today - timedelta(days=60)
+    end_date = end_date.date() if end_date else today + timedelta(days=90)
+    if start_date > end_date:
+        raise click.BadParameter('start date must not be after end date')
+
+    row_count = TeamOccupancyService.rebuild(start_date, end_date)
+    click.echo(f"Rebuilt {row_count} team occupancy rows from {start_date} to {end_date}")
+
+
+@click.command('check-indexes')
+@with_appcontext
+def check_indexes_command():
+    """Check that the live schema has every index declared on the models."""
+    inspector = inspect(db.engine)
+    live_tables = set(inspector.get_table_names())
+    missing = []
+
+    for table in db.metadata.sorted_tables:
+        if not table.indexes:
+            continue
+        if table.name not in live_tables:
+            missing.extend(f"{table.name}.{index.name}" for index in table.indexes)
+            continue
+
+        # Match on column lists so equivalent indexes created under other names still count
+        live_columns = {tuple(index['column_names']) for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if tuple(column.name for column in index.columns) not in live_columns:
+                missing.append(f"{table.name}.{index.name}")
+
+    if missing:
+        for name in missing:
+            click.echo(f"Missing index: {name}")
+        raise SystemExit(1)
+
+    click.echo("All declared indexes are present")
@@ -1,7 +1,9 @@
+import logging
 from flask import Blueprint, request, jsonify
 from app.services.staff_service import StaffService
 
 staff_bp = Blueprint('staff', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
 
 @staff_bp.route('/login', methods=['POST'])
 def login():
@@ -16,7 +18,7 @@ def login():
         return jsonify({"message": "Invalid email or password"}), 401
     
     staff_details = staff.to_dict()
-    print(staff_details)
+    logger.info("Login successful for staff_id: %s", staff.staff_id)
     return jsonify({
         "message": "Login successful",
         **staff_details
@@ -33,5 +35,5 @@ def get_departments():
         data = StaffService.get_departments()  
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in get_departments: {str(e)}")
+        logger.exception("Error in get_departments: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
@@ -1,36 +1,49 @@
-from flask import Blueprint, request, jsonify
+import hashlib
+import logging
+from flask import Blueprint, Response, request, jsonify, make_response
 from app.services.wfh_request_service import WFHRequestService
 from app.services.wfh_schedule_service import WFHScheduleService
 from app.services.wfh_check_service import WFHCheckService
+from app.services.wfh_approval_service import WFHApprovalService
+from app.services.change_sequence_service import ChangeSequenceService
+from app.services.org_hierarchy_service import OrgHierarchyService
+from app.services.event_service import EventService
+from app.events import get_broker
 from app.models.wfh_request import WFHRequest
 from app.models.wfh_schedule import WFHSchedule
 from datetime import datetime, timedelta, date
 from app import db
 
 wfh_bp = Blueprint('wfh', __name__, url_prefix='/api')
+logger = logging.getLogger(__name__)
+
+# Largest page the request list endpoints will return for one `limit`
+MAX_PAGE_SIZE = 100
+
+# Largest batch accepted by the bulk approve/reject endpoint
+MAX_BULK_UPDATE = 200
+
+# Default and largest number of rows of each kind /changes returns per page
+DEFAULT_CHANGES_PAGE = 500
+MAX_CHANGES_PAGE = 2000
 
 @wfh_bp.route('/request', methods=['POST'])
 def create_wfh_request():
-    print("\n===== NEW WFH REQUEST =====")
-    print("Received a new WFH request")
     data = request.get_json()
 
     # Validate input
-    print("\n----- Input Validation -----")
     required_fields = ['staff_id', 'manager_id', 'reason_for_applying', 
                        'date', 'duration', 'dept', 'position']
     for field in required_fields:
         if field not in data:
-            print(f"Validation failed: Missing required field: {field}")
+            logger.info("Validation failed: Missing required field: %s", field)
             return jsonify({"message": f"Missing required field: {field}"}), 400
-    print("Input validation successful")
 
     try:
         # Get today's date for the request_date
         today = datetime.now().date()
 
         # Create WFHRequest
-        print("\n----- Creating WFH Request -----")
         end_date = None
         if 'end_date' in data and data['end_date']:
             if(not isinstance(data['end_date'], date)):
@@ -44,10 +57,9 @@ def create_wfh_request():
             end_date=end_date,
             reason_for_applying=data['reason_for_applying'],duration=data['duration']
         )
-        print(f"WFH request created successfully. Request ID: {wfh_request.request_id}")
+        logger.debug("WFH request created. Request ID: %s", wfh_request.request_id)
 
         # Create WFH Schedules
-        print("\n----- Creating WFH Schedules -----")
         if(not isinstance(data['date'], date)):
             start_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
         wfh_schedules = WFHScheduleService.create_schedule(
@@ -60,14 +72,9 @@ def create_wfh_request():
             dept=data['dept'],
             position=data['position']
         )
-        print(f"WFH schedules created successfully. Number of schedules: {len(wfh_schedules)}")
-
-        print("\n===== WFH REQUEST COMPLETED =====")
-        print("WFH request and schedules creation completed successfully")
-        print(f"Request ID: {wfh_request.request_id}")
-        print(f"Number of Schedules: {len(wfh_schedules)}")
-        print(f"Status: {wfh_request.status}")
-        print("==================================\n")
+        logger.info(
+            "WFH request %s created with %s schedules, status %s",
+            wfh_request.request_id, len(wfh_schedules), wfh_request.status)
 
         return jsonify({
             "message": "WFH request and schedules created successfully",
@@ -77,47 +84,99 @@ def create_wfh_request():
         }), 201
 
     except ValueError as ve:
-        print(f"\n===== ERROR OCCURRED =====")
-        print(f"Validation failed: {ve}")
-        print("============================\n")
+        logger.info("Validation failed: %s", ve)
         db.session.rollback()
         return jsonify({"message": str(ve)}), 400
         
     except Exception as e:
         db.session.rollback()
-        print("\n===== ERROR OCCURRED =====")
-        print(f"An error occurred while processing the WFH request: {str(e)}")
-        print("============================\n")
-        db.session.rollback()
+        logger.exception("An error occurred while processing the WFH request: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 @wfh_bp.route('/pending-requests/<int:manager_id>', methods=['GET'])
 def get_pending_requests(manager_id):
-    print(f"\n===== GET PENDING REQUESTS =====")
-    print(f"Retrieving pending requests for manager_id: {manager_id}")
-    
     try:
-        print("Calling WFHRequestService.get_pending_requests_for_manager()")
-        pending_requests = WFHRequestService.get_pending_requests_for_manager(manager_id)
-        
-        print(f"Number of pending requests retrieved: {len(pending_requests)}")
-        
-        response = [request.to_dict() for request in pending_requests]
-        print("Successfully converted requests to dictionary format")
-        
-        print("===== GET PENDING REQUESTS COMPLETED =====\n")
-        return jsonify(response), 200
+        limit, filters = _page_args()
+    except ValueError as ve:
+        return jsonify({"message": str(ve)}), 400
+
+    try:
+        # One extra row tells us whether there is a next page
+        pending_requests = WFHRequestService.get_pending_requests_for_manager(
+            manager_id, limit=limit + 1 if limit else None, **filters)
+        logger.debug("Retrieved %s pending requests for manager_id: %s", len(pending_requests), manager_id)
+
+        if limit is None:
+            response = [request.to_dict() for request in pending_requests]
+            return jsonify(response), 200
+
+        pending_requests, next_cursor = _split_page(pending_requests, limit)
+        return jsonify({
+            "pending_requests": [request.to_dict() for request in pending_requests],
+            "next_cursor": next_cursor
+        }), 200
     
     except Exception as e:
-        print(f"ERROR: An exception occurred while retrieving pending requests")
-        print(f"Exception details: {str(e)}")
-        print("===== GET PENDING REQUESTS FAILED =====\n")
+        logger.exception("An exception occurred while retrieving pending requests: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 
+def _page_args():
+    """
+    Reads the optional paging and filter query params shared by the request
+    list endpoints. Returns the page size (None when no `limit` was given, in
+    which case every matching request is returned) and the service filters.
+    """
+    limit = request.args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError("limit must be a positive integer")
+        limit = min(int(limit), MAX_PAGE_SIZE)
+
+    cursor = request.args.get('cursor')
+    after_id = WFHRequestService.decode_cursor(cursor) if cursor else None
+
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if start_date:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    if end_date:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    return limit, {'start_date': start_date or None, 'end_date': end_date or None, 'after_id': after_id}
+
+
+def _split_page(requests, limit):
+    if len(requests) <= limit:
+        return requests, None
+    requests = requests[:limit]
+    return requests, WFHRequestService.encode_cursor(requests[-1].request_id)
+
+def _etag_for(stamp):
+    """
+    Strong ETag for this URL, query string included, at the given version stamp.
+    Views that default a query param, like a date window around today, put the
+    value they resolved it to in the stamp, since the URL alone does not show it.
+    Returns (etag, response), where response is a 304 when the client's
+    If-None-Match already holds the etag, so the view can return it unbuilt.
+    """
+    etag = hashlib.sha1(repr((request.full_path, stamp)).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return etag, response
+    return etag, None
+
+def _tagged(data, etag):
+    response = jsonify(data)
+    if etag is not None:
+        response.set_etag(etag)
+        # Browsers keep the copy but revalidate it on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @wfh_bp.route('/update-request', methods=['PATCH'])
 def update_wfh_request():
-    print(f"\n===== UPDATE REQUESTS =====")
     data = request.get_json()
     request_id = data['request_id']
     new_request_status = data['request_status']
@@ -128,7 +187,7 @@ def update_wfh_request():
     # Calculate the date 2 months ago
     two_months_ago = current_date - timedelta(days=60)
 
-    print(f"Updating request for request_id: {request_id}")
+    logger.debug("Updating request for request_id: %s", request_id)
     
     try:
         # Fetch the request
@@ -138,7 +197,6 @@ def update_wfh_request():
         
 
         if new_request_status == 'APPROVED' and request_obj.duration != "WITHDRAWAL REQUEST":
-            staff_id = request_obj.staff_id
             start_date = request_obj.start_date
             end_date = request_obj.end_date
 
@@ -155,18 +213,17 @@ def update_wfh_request():
                 # Single date request
                 if start_date >= current_date:
                     dates_to_check.append(start_date)
-            violated_dates = []
-            # Check WFH policy for each date
-            for date_to_check in dates_to_check:
-                result = WFHCheckService.check_team_count(staff_id, date_to_check,request_obj.duration)
-                if result != 'Success':
-                    violated_dates.append(date_to_check)
-            
+            # Check WFH policy for all dates and approve under the team's occupancy locks
+            outcome = WFHApprovalService.approve_request(request_id, dates_to_check, two_months_ago)
+            violated_dates = outcome['violated_dates']
+
             if len(violated_dates) > 0:
                 formatted_dates = ",".join([d.strftime("%d-%m-%Y") for d in violated_dates])
                 return jsonify({"message": f"Cannot approve request due to policy violation on date(s) {formatted_dates}"}), 400
+            if not outcome['success']:
+                return jsonify({"message": outcome['message']}), 404
+            return jsonify(outcome['message']), 200
 
-        print("Calling WFHRequestService.update_request()")
         response = WFHRequestService.update_request(
             request_id, new_request_status, two_months_ago, reason)
         if response == True:
@@ -177,13 +234,13 @@ def update_wfh_request():
                     original_request = WFHRequest.query.filter_by(request_id=int(schedule.reason_for_withdrawing)).first()
                     if original_request.end_date is None:
                         original_request.status = "WITHDRAWN"
+                        EventService.request_status(original_request)
                 response2 = WFHScheduleService.update_schedule(request_id, new_request_status)
             if new_request_status == 'REJECTED' and request_obj.duration == "WITHDRAWAL REQUEST":
                 WFHScheduleService.orig_schedule_request_id(schedule.schedule_id)
 
             if response2 == True:
-                print("Successfully updated")
-                print("===== UPDATE PENDING REQUESTS COMPLETED =====\n")
+                logger.info("Updated request %s as %s", request_id, new_request_status)
                 return jsonify(f"Successfully updated request {request_id} as {new_request_status}"), 200
                 
             else:
@@ -194,9 +251,39 @@ def update_wfh_request():
 
     except Exception as e:
         db.session.rollback()
-        print("\n===== ERROR OCCURRED =====")
-        print(f"An error occurred while processing the WFH request: {str(e)}")
-        print("============================\n")
+        logger.exception("An error occurred while updating the WFH request: %s", e)
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
+
+@wfh_bp.route('/bulk-update-request', methods=['PATCH'])
+def bulk_update_wfh_requests():
+    """
+    Approves or rejects a batch of requests in one transaction.
+    Body: {"requests": [{"request_id", "request_status", "reason"}, ...]}
+    Returns the outcome of every decision; a failed one does not block the rest.
+    """
+    data = request.get_json(silent=True) or {}
+    decisions = data.get('requests')
+    if not isinstance(decisions, list) or not decisions:
+        return jsonify({"message": "requests must be a non-empty list"}), 400
+    if len(decisions) > MAX_BULK_UPDATE:
+        return jsonify({"message": f"At most {MAX_BULK_UPDATE} requests can be updated at once"}), 400
+    for decision in decisions:
+        if not isinstance(decision, dict) or not isinstance(decision.get('request_id'), int):
+            return jsonify({"message": "Each request needs an integer request_id"}), 400
+
+    two_months_ago = datetime.now().date() - timedelta(days=60)
+
+    try:
+        results = WFHApprovalService.bulk_update_requests(decisions, two_months_ago)
+        return jsonify({
+            "results": results,
+            "updated": sum(1 for result in results if result['success']),
+            "failed": sum(1 for result in results if not result['success'])
+        }), 200
+
+    except Exception as e:
+        logger.exception("An error occurred while bulk updating WFH requests: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 
@@ -213,11 +300,13 @@ def reject_expired_request():
         # Calculate the date 2 months ago
         two_months_ago = current_date - timedelta(days=60)
 
-        # Fetch all requests from the database
-        request_list = WFHRequestService.reject_expired(two_months_ago)
-        for request in request_list:
-            WFHScheduleService.update_schedule(request, "EXPIRED")
-        return jsonify({"message": f"Updated requests to 'EXPIRED'."}), 200
+        # Expire stale requests and their schedules in one transaction
+        counts = WFHRequestService.reject_expired(two_months_ago)
+        return jsonify({
+            "message": "Updated requests to 'EXPIRED'.",
+            "expired_requests": counts['requests'],
+            "expired_schedules": counts['schedules']
+        }), 200
 
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an error
@@ -228,12 +317,13 @@ def check_wfh_count():
 
     data = request.get_json()
     staff_id = data['staff_id']
-    date = data['date']
+    # Accept either a list of dates or a single date
+    dates = data.get('dates') or [data['date']]
     duration = data['duration']
     
     try:
-        result = WFHCheckService.check_team_count(staff_id, date, duration)
-        return('done')
+        result = WFHCheckService.check_team_capacity_bulk(staff_id, dates, duration)
+        return jsonify(result), 200
     
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an error
@@ -257,11 +347,18 @@ def manager_schedule_summary(manager_id):
         else:
             end_date = today + timedelta(days=90)  # 3 months after today
 
+        etag = None
+        stamp = WFHScheduleService.manager_summary_stamp(manager_id, start_date, end_date)
+        if stamp is not None:
+            etag, not_modified = _etag_for((start_date, end_date, stamp))
+            if not_modified is not None:
+                return not_modified
+
         data = WFHScheduleService.get_manager_schedule_summary(manager_id, start_date, end_date)
-        return jsonify(data), 200
+        return _tagged(data, etag), 200
 
     except Exception as e:
-        print(f"Error in manager_schedule_summary: {str(e)}")
+        logger.exception("Error in manager_schedule_summary: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 @wfh_bp.route('/manager-schedule-detail/<int:manager_id>/<date>', methods=['GET'])
@@ -271,7 +368,7 @@ def manager_schedule_detail(manager_id, date):
         data = WFHScheduleService.get_manager_schedule_detail(manager_id, date_obj)
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in manager_schedule_detail: {str(e)}")
+        logger.exception("Error in manager_schedule_detail: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
     
 @wfh_bp.route('/personal-schedule/<int:staff_id>', methods=['GET'])
@@ -291,11 +388,16 @@ def personal_schedule(staff_id):
         else:
             end_date = today + timedelta(days=90)  # 3 months after today
 
+        stamp = WFHScheduleService.schedule_stamp([staff_id], start_date, end_date)
+        etag, not_modified = _etag_for((start_date, end_date, stamp))
+        if not_modified is not None:
+            return not_modified
+
         data = WFHScheduleService.get_personal_schedule(staff_id, start_date, end_date)
-        return jsonify(data), 200
+        return _tagged(data, etag), 200
 
     except Exception as e:
-        print(f"Error in manager_schedule_summary: {str(e)}")
+        logger.exception("Error in manager_schedule_summary: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
     
 @wfh_bp.route('staff-schedule-summary/<int:reporting_manager>', methods = ['GET'])
@@ -320,7 +422,7 @@ def staff_schedule_summary(reporting_manager):
         data = WFHScheduleService.get_staff_schedule_summary(reporting_manager, start_date, end_date,staff_id)
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in staff_schedule_summary: {str(e)}")
+        logger.exception("Error in staff_schedule_summary: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 @wfh_bp.route('/staff-schedule-detail/<int:staff_id>/<date>', methods=['GET'])
@@ -328,22 +430,41 @@ def staff_schedule_detail(staff_id, date):
     try:
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
         data = WFHScheduleService.get_staff_schedule_detail(staff_id, date_obj)
-        print("Success")
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in staff_schedule_detail: {str(e)}")
+        logger.exception("Error in staff_schedule_detail: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 @wfh_bp.route('staff-requests/<int:staff_id>', methods=['GET'])
 def get_staff_requests(staff_id):
     try:
-        staff_requests = WFHRequestService.get_staff_requests(staff_id)
-        requests_data = [request.to_dict() for request in staff_requests]
-        # Return the serialized data using jsonify
-        print("Success")
-        return jsonify({"staff_requests": requests_data}), 200
+        limit, filters = _page_args()
+    except ValueError as ve:
+        return jsonify({"message": str(ve)}), 400
+
+    statuses = request.args.get('status')
+    if statuses:
+        filters['statuses'] = [status.strip().upper() for status in statuses.split(',') if status.strip()]
+
+    try:
+        etag, not_modified = _etag_for(WFHRequestService.staff_requests_stamp(staff_id))
+        if not_modified is not None:
+            return not_modified
+
+        staff_requests = WFHRequestService.get_staff_requests(
+            staff_id, limit=limit + 1 if limit else None, **filters)
+        if limit is None:
+            requests_data = [request.to_dict() for request in staff_requests]
+            # Return the serialized data using jsonify
+            return _tagged({"staff_requests": requests_data}, etag), 200
+
+        staff_requests, next_cursor = _split_page(staff_requests, limit)
+        return _tagged({
+            "staff_requests": [request.to_dict() for request in staff_requests],
+            "next_cursor": next_cursor
+        }, etag), 200
     except Exception as e:
-        print(f"Error in get_staff_requests: {str(e)}")
+        logger.exception("Error in get_staff_requests: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
         
 @wfh_bp.route('hr-schedule-summary', methods = ['GET'])
@@ -367,7 +488,7 @@ def hr_schedule_summary():
         data = WFHScheduleService.get_hr_schedule_summary(start_date, end_date)
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in hr_schedule_summary: {str(e)}")
+        logger.exception("Error in hr_schedule_summary: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 @wfh_bp.route('/hr-schedule-detail/<date>', methods=['GET'])
@@ -375,10 +496,9 @@ def hr_schedule_detail(date):
     try:
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
         data = WFHScheduleService.get_hr_schedule_detail(date_obj)
-        print("Success")
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in hr_schedule_detail: {str(e)}")
+        logger.exception("Error in hr_schedule_detail: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
     
 
@@ -426,9 +546,7 @@ def create_cancel_request():
     
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an error
-        print(f"ERROR: An exception occurred while creating cancel request")
-        print(f"Exception details: {str(e)}")
-        print("===== CREATE CANCEL REQUEST FAILED =====\n")
+        logger.exception("An exception occurred while creating cancel request: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
     
 @wfh_bp.route('/schedules-by-request-id/<request_id>', methods=['GET'])
@@ -436,10 +554,9 @@ def get_schedules_by_request_id(request_id):
     try:
         # Fetch schedule data from the service
         data = WFHScheduleService.get_schedules_by_request_id(request_id)
-        print("Schedules fetched successfully")
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in get_schedules_by_request_id: {str(e)}")
+        logger.exception("Error in get_schedules_by_request_id: %s", e)
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
 
@@ -471,8 +588,103 @@ def get_schedules_by_ori_request_id(request_id):
     try:
         # Fetch schedule data from the service
         data = WFHScheduleService.get_schedules_by_ori_req_id(request_id)
-        print("Schedules fetched successfully")
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in get_schedules_by_request_id: {str(e)}")
-        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
+        logger.exception("Error in get_schedules_by_request_id: %s", e)
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
+
+@wfh_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    Schedules and requests changed since the `since` cursor, for
+    scope=staff:<staff_id>, team:<manager_id> (everyone below the manager)
+    or company. Without `since` only the current cursor is returned: take it
+    before a full load, then poll from it and upsert the rows by id.
+    """
+    try:
+        staff_ids = _changes_scope(request.args.get('scope', ''))
+        limit = request.args.get('limit', str(DEFAULT_CHANGES_PAGE))
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError("limit must be a positive integer")
+        since = request.args.get('since')
+        if since is not None and not since.isdigit():
+            raise ValueError("since must be a non-negative integer")
+    except ValueError as ve:
+        return jsonify({"message": str(ve)}), 400
+    except LookupError as le:
+        return jsonify({"message": str(le)}), 404
+
+    try:
+        if since is None:
+            return jsonify({"schedules": [], "requests": [], "next_since": ChangeSequenceService.current(),
+                            "has_more": False}), 200
+
+        changes = ChangeSequenceService.get_changes(int(since), staff_ids, min(int(limit), MAX_CHANGES_PAGE))
+        logger.debug("Returning %s schedule and %s request changes since %s",
+                     len(changes['schedules']), len(changes['requests']), since)
+        return jsonify({
+            "schedules": [{**s.to_dict(), "change_seq": s.change_seq} for s in changes['schedules']],
+            "requests": [{**r.to_dict(), "change_seq": r.change_seq} for r in changes['requests']],
+            "next_since": changes['next_since'],
+            "has_more": changes['has_more']
+        }), 200
+    except Exception as e:
+        logger.exception("Error in get_changes: %s", e)
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
+
+@wfh_bp.route('/events', methods=['GET'])
+def stream_events():
+    """
+    Server-sent events for the same scopes as /changes: request_created,
+    request_status and occupancy. A client that reconnects with Last-Event-ID
+    (or passes `since`) first gets the events it missed, then live ones.
+    """
+    try:
+        staff_ids = _changes_scope(request.args.get('scope', ''))
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        if since is not None and not since.isdigit():
+            raise ValueError("since must be a non-negative integer")
+    except ValueError as ve:
+        return jsonify({"message": str(ve)}), 400
+    except LookupError as le:
+        return jsonify({"message": str(le)}), 404
+
+    broker = get_broker()
+    if broker is None:
+        return jsonify({"message": "The event stream is disabled"}), 404
+
+    subscription, seq = broker.subscribe(staff_ids)
+    try:
+        replay, cursor = [], seq
+        if since is not None:
+            replay = EventService.get_events(int(since), staff_ids, upper=seq)[0]
+            cursor = max(int(since), seq)
+    except Exception as e:
+        broker.unsubscribe(subscription)
+        logger.exception("Error in stream_events: %s", e)
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
+    return Response(broker.stream(subscription, replay, cursor), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _changes_scope(scope):
+    # Staff ids the scope covers, or None for the whole company
+    if scope == 'company':
+        return None
+    kind, _, staff_id = scope.partition(':')
+    if kind not in ('staff', 'team') or not staff_id.isdigit():
+        raise ValueError("scope must be staff:<staff_id>, team:<manager_id> or company")
+
+    staff_id = int(staff_id)
+    subtree = OrgHierarchyService.get_subtree(staff_id)
+    if subtree is None:
+        raise LookupError(f"No staff found with id: {staff_id}")
+    if kind == 'staff':
+        return [staff_id]
+    return [node.staff_id for node in subtree.get_descendants(staff_id)]
@@ -0,0 +1,186 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from flask import current_app, has_app_context
+from app.services.change_sequence_service import ChangeSequenceService
+from app.services.event_service import EventService
+
+logger = logging.getLogger(__name__)
+
+# Seconds between deletes of events older than the retention period
+PRUNE_INTERVAL = 3600
+# Milliseconds a disconnected client waits before reconnecting
+RECONNECT_DELAY = 2000
+
+
+class Subscription:
+    """
+    One open stream: the staff it covers (None for everyone) and a bounded
+    queue of event batches, one per broker poll. A stream that falls behind
+    is marked overflowed instead of holding up the broker; it then ends and
+    the client resumes from its Last-Event-ID.
+    """
+
+    def __init__(self, staff_ids, max_queued):
+        self.staff_ids = None if staff_ids is None else frozenset(staff_ids)
+        self.batches = queue.Queue(max_queued)
+        self.overflowed = False
+
+    def matches(self, event):
+        return self.staff_ids is None or not self.staff_ids.isdisjoint((event['staff_id'], event['manager_id']))
+
+    def deliver(self, events):
+        batch = [event for event in events if self.matches(event)]
+        if not batch or self.overflowed:
+            return
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            self.overflowed = True
+
+
+class EventBroker:
+    """
+    Fans committed WFHEvent rows out to the event streams open in this
+    process. A single thread per worker reads everything published after the
+    last change_seq it saw, however many streams are open, so every gunicorn
+    worker's streams see the events any worker committed. The thread only
+    runs while at least one stream is subscribed.
+    """
+
+    def __init__(self, app, poll_interval, heartbeat, max_stream_seconds, max_queued, retention):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.max_stream_seconds = max_stream_seconds
+        self.max_queued = max_queued
+        self.retention = retention
+        self.last_seq = None
+        self._subscribers = set()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+
+    def subscribe(self, staff_ids):
+        """
+        Registers a stream for the given staff (None for everyone) and returns
+        (subscription, seq). Every matching event committed after `seq` is
+        delivered to the subscription; earlier ones are the caller's to replay.
+        """
+        subscription = Subscription(staff_ids, self.max_queued)
+        with self._lock:
+            if self.last_seq is None:
+                self.last_seq = ChangeSequenceService.current()
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+                self._thread.start()
+            return subscription, self.last_seq
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def poll(self):
+        """
+        Delivers the events committed since the last poll to every subscriber.
+        Returns the number of events read.
+        """
+        with self._lock:
+            since = self.last_seq
+        if since is None:
+            return 0
+
+        with self.app.app_context():
+            events, upper = EventService.get_events(since)
+            if time.monotonic() - self._pruned_at > PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                EventService.prune(self.retention)
+
+        # Subscribers registered while the query ran were handed `since` and get these too
+        with self._lock:
+            for subscription in self._subscribers:
+                subscription.deliver(events)
+            self.last_seq = upper
+        return len(events)
+
+    def stream(self, subscription, replay, cursor):
+        """
+        Server-sent event stream for a subscription: a `ready` event carrying
+        the cursor, the replayed events, then live ones, with a comment line
+        every `heartbeat` seconds. Ends after `max_stream_seconds` or when the
+        subscription overflows, and unsubscribes when closed.
+        """
+        try:
+            yield f"retry: {RECONNECT_DELAY}\n\n"
+            yield _format('ready', {'since': cursor}, cursor)
+            yield from _format_batch(replay)
+
+            deadline = time.monotonic() + self.max_stream_seconds
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch = subscription.batches.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Events up to the cursor were already replayed
+                batch = [event for event in batch if event['seq'] > cursor]
+                if batch:
+                    cursor = batch[-1]['seq']
+                    yield from _format_batch(batch)
+        finally:
+            self.unsubscribe(subscription)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._subscribers:
+                    # Start again from the then current sequence on the next subscribe
+                    self._thread = None
+                    self.last_seq = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling for events failed")
+
+
+def _format(kind, data, seq=None):
+    lines = [f"event: {kind}"]
+    if seq is not None:
+        lines.append(f"id: {seq}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _format_batch(events):
+    # Only the last event of a commit carries its id, so a client that resumes
+    # from its Last-Event-ID never misses the rest of a commit
+    for i, event in enumerate(events):
+        last_of_commit = i + 1 == len(events) or events[i + 1]['seq'] != event['seq']
+        data = {key: value for key, value in event.items() if key != 'kind'}
+        yield _format(event['kind'], data, event['seq'] if last_of_commit else None)
+
+
+def init_events(app):
+    app.extensions['event_broker'] = EventBroker(
+        app,
+        app.config['EVENT_STREAM_POLL_INTERVAL'],
+        app.config['EVENT_STREAM_HEARTBEAT'],
+        app.config['EVENT_STREAM_MAX_SECONDS'],
+        app.config['EVENT_STREAM_MAX_QUEUED'],
+        timedelta(hours=app.config['EVENT_RETENTION_HOURS']),
+    )
+
+
+def get_broker():
+    if has_app_context():
+        return current_app.extensions.get('event_broker')
+    return None
@@ -0,0 +1,75 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+_stream_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Queues records for the listener to format. The stdlib prepare() formats
+    the record on the calling thread and drops exc_info, which would leave the
+    traceback inside the message; this one only merges the arguments.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(app):
+    """
+    Sets up the 'app' logger used by every controller and service. Records are
+    put on an in-memory queue by the request thread and formatted and written
+    to stdout by a background QueueListener, so logging never blocks on I/O.
+    The listener is shared by every app in the process; each call applies its
+    app's LOG_LEVEL and LOG_JSON to it.
+    """
+    global _listener, _stream_handler
+
+    logger = logging.getLogger('app')
+    logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+
+    if _listener is None:
+        _stream_handler = logging.StreamHandler(sys.stdout)
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(_RecordQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, _stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    if app.config.get('LOG_JSON', True):
+        _stream_handler.setFormatter(JsonFormatter())
+    else:
+        _stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    return logger
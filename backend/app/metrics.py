@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed upper bounds, rendered the way Prometheus
+    expects: one _bucket line per bound plus +Inf, _sum and _count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            cumulative += count
+            yield ('+Inf' if bound == float('inf') else _format_value(bound)), cumulative
+
+
+class MetricsRegistry:
+    """
+    Per-app store of request metrics, keyed by (endpoint, method).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.statements = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.requests = defaultdict(int)
+        self.rows_hydrated = defaultdict(int)
+
+    def record(self, endpoint, method, status, duration, statement_count, rows_hydrated):
+        with self._lock:
+            self.latency[(endpoint, method)].observe(duration)
+            self.statements[(endpoint, method)].observe(statement_count)
+            self.requests[(endpoint, method, str(status))] += 1
+            self.rows_hydrated[(endpoint, method)] += rows_hydrated
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Requests handled, by route and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                labels = _labels(endpoint=endpoint, method=method, status=status)
+                lines.append(f'http_requests_total{{{labels}}} {value}')
+
+            lines += _render_histogram(
+                'http_request_duration_seconds', 'Request latency in seconds, by route.', self.latency)
+            lines += _render_histogram(
+                'db_statements_per_request', 'SQL statements executed per request, by route.', self.statements)
+
+            lines += [
+                '# HELP db_rows_hydrated_total ORM rows loaded into objects, by route.',
+                '# TYPE db_rows_hydrated_total counter',
+            ]
+            for (endpoint, method), value in sorted(self.rows_hydrated.items()):
+                lines.append(f'db_rows_hydrated_total{{{_labels(endpoint=endpoint, method=method)}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(name, help_text, histograms):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        labels = _labels(endpoint=endpoint, method=method)
+        for bound, cumulative in histogram.samples():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {_format_value(histogram.sum)}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def _labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def init_metrics(app):
+    """
+    Times every request, counts the SQL statements and ORM rows it caused and
+    serves the totals on /metrics.
+    """
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics = {'start': time.perf_counter(), 'statements': 0, 'rows_hydrated': 0}
+
+    @app.after_request
+    def _record_request_metrics(response):
+        metrics = g.pop('metrics', None)
+        if metrics is not None and request.endpoint != 'metrics':
+            registry.record(
+                request.endpoint or 'unmatched',
+                request.method,
+                response.status_code,
+                time.perf_counter() - metrics['start'],
+                metrics['statements'],
+                metrics['rows_hydrated'],
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _current_request_metrics():
+    if has_request_context() and has_app_context() and 'metrics' in current_app.extensions:
+        return g.get('metrics')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current_request_metrics()
+    if metrics is not None:
+        metrics['statements'] += 1
+
+
+@event.listens_for(Session, 'loaded_as_persistent')
+def _count_hydrated_row(session, instance):
+    metrics = _current_request_metrics()
+    if metrics is not None:
+        metrics['rows_hydrated'] += 1
@@ -0,0 +1,9 @@
+from app import db
+
+class CacheVersion(db.Model):
+    __tablename__ = 'CacheVersion'
+
+    scope = db.Column(db.String(64), primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False, default=0)
+    # When seq was last raised; versions older than the cache TTL are pruned
+    bumped_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,7 @@
+from app import db
+
+class ChangeSequence(db.Model):
+    __tablename__ = 'ChangeSequence'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    seq = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,17 @@
+from app import db
+
+class TeamDailyOccupancy(db.Model):
+    __tablename__ = 'TeamDailyOccupancy'
+
+    manager_id = db.Column(db.Integer, db.ForeignKey('Staff.staff_id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    wfh_count_am = db.Column(db.Integer, nullable=False, default=0)
+    wfh_count_pm = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'manager_id': self.manager_id,
+            'date': self.date.isoformat(),
+            'wfh_count_am': self.wfh_count_am,
+            'wfh_count_pm': self.wfh_count_pm
+        }
@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+class WFHEvent(db.Model):
+    __tablename__ = 'WFHEvent'
+    __table_args__ = (
+        db.Index('ix_wfhevent_change_seq', 'change_seq'),
+    )
+
+    event_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(32), nullable=False)
+    staff_id = db.Column(db.Integer, nullable=False)
+    manager_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    # Commit-ordered sequence number of the transaction that published the event
+    change_seq = db.Column(db.BigInteger, nullable=True)
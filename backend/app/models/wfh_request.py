@@ -3,6 +3,12 @@ from sqlalchemy.sql import expression
 
 class WFHRequest(db.Model):
     __tablename__ = 'WFHRequest'
+    __table_args__ = (
+        db.Index('ix_wfhrequest_manager_status', 'manager_id', 'status'),
+        db.Index('ix_wfhrequest_staff_start_status', 'staff_id', 'start_date', 'status'),
+        db.Index('ix_wfhrequest_status_start', 'status', 'start_date'),
+        db.Index('ix_wfhrequest_change_seq', 'change_seq'),
+    )
 
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     staff_id = db.Column(db.Integer, db.ForeignKey('Staff.staff_id'), nullable=False)
@@ -14,6 +20,8 @@ class WFHRequest(db.Model):
     status = db.Column(db.String(20), nullable=False, server_default=expression.text("'PENDING'"))
     reason_for_applying = db.Column(db.Text, nullable=False)
     reason_for_rejection = db.Column(db.Text, nullable=True)
+    # Commit-ordered sequence number of the last change to this row, see ChangeSequenceService
+    change_seq = db.Column(db.BigInteger, nullable=True)
 
     def to_dict(self):
         end_date = None
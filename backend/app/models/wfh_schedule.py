@@ -3,6 +3,13 @@ from sqlalchemy.sql import expression
 
 class WFHSchedule(db.Model):
     __tablename__ = 'WFHSchedule'
+    __table_args__ = (
+        db.Index('ix_wfhschedule_staff_date_status', 'staff_id', 'date', 'status'),
+        db.Index('ix_wfhschedule_date_status', 'date', 'status'),
+        db.Index('ix_wfhschedule_manager_status', 'manager_id', 'status'),
+        db.Index('ix_wfhschedule_request_id', 'request_id'),
+        db.Index('ix_wfhschedule_change_seq', 'change_seq'),
+    )
 
     schedule_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     request_id = db.Column(db.Integer, db.ForeignKey('WFHRequest.request_id'), nullable=False)
@@ -14,6 +21,8 @@ class WFHSchedule(db.Model):
     dept = db.Column(db.String(50), nullable=False)
     position = db.Column(db.String(50), nullable=False)
     reason_for_withdrawing = db.Column(db.Text, nullable=True)
+    # Commit-ordered sequence number of the last change to this row, see ChangeSequenceService
+    change_seq = db.Column(db.BigInteger, nullable=True)
     
 
     def to_dict(self):
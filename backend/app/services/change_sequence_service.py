@@ -0,0 +1,176 @@
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.change_sequence import ChangeSequence
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+
+
+class ChangeSequenceService:
+    """
+    Stamps every inserted or updated WFHRequest and WFHSchedule row with a
+    change_seq taken from one counter row when the transaction commits.
+
+    The counter row stays locked from the increment to the commit, so numbers
+    are handed out in commit order: once a reader has seen change_seq N, no
+    later commit can write a number at or below N. Only the tail end of a
+    commit is serialised, not the rest of the transaction.
+    """
+
+    COUNTER_ID = 1
+
+    @staticmethod
+    def current():
+        return db.session.execute(
+            select(ChangeSequence.seq).where(ChangeSequence.id == ChangeSequenceService.COUNTER_ID)
+        ).scalar() or 0
+
+    @staticmethod
+    def stamp(model, *criteria):
+        """
+        Returns (max change_seq, row count) of the model's rows matching
+        `criteria`. It changes whenever one of those rows is inserted, updated
+        or deleted, so it can stand in for the rows themselves in an ETag.
+        """
+        return tuple(db.session.query(func.max(model.change_seq), func.count()).filter(*criteria).one())
+
+    @staticmethod
+    def record_bulk(model, ids):
+        """
+        Marks rows changed by a bulk UPDATE, which the flush listener cannot
+        see, so they are stamped when the transaction commits. `ids` are
+        request_ids for WFHRequest and schedule_ids for WFHSchedule.
+        """
+        key = 'requests' if model is WFHRequest else 'schedules'
+        _changes(db.session())[key].update(ids)
+
+    @staticmethod
+    def record_bulk_schedules(request_ids):
+        # Every schedule of the given requests, whether or not it was stamped before
+        _changes(db.session())['request_schedules'].update(request_ids)
+
+    @staticmethod
+    def insert_on_commit(model, key, values):
+        """
+        Inserts a `model` row with `values` when the current transaction
+        commits, stamped with the commit's change_seq, in one statement with
+        the other rows queued for that model. A later call with the same key
+        replaces the queued values. Nothing is inserted on rollback.
+        """
+        _changes(db.session())['inserts'].setdefault(model, {})[key] = values
+
+    @staticmethod
+    def get_changes(since, staff_ids=None, limit=500):
+        """
+        Schedules and requests changed after `since`, for the given staff or
+        the whole company when staff_ids is None, ordered by change_seq.
+        Returns {'schedules', 'requests', 'next_since', 'has_more'}; clients
+        apply the rows and ask again from next_since.
+
+        Pages end on a whole change_seq, so the rows of one commit are never
+        split across pages. A single commit larger than `limit` is returned
+        whole. Deleted rows are not reported.
+        """
+        current = ChangeSequenceService.current()
+        upper = current
+        for model in (WFHSchedule, WFHRequest):
+            # The change_seq of the first row past the limit, if there is one
+            overflow = ChangeSequenceService._changed(model, since, current, staff_ids).with_entities(
+                model.change_seq
+            ).order_by(model.change_seq).offset(limit).limit(1).scalar()
+            if overflow is not None:
+                upper = min(upper, overflow - 1 if overflow - 1 > since else overflow)
+
+        return {
+            'schedules': ChangeSequenceService._changed(WFHSchedule, since, upper, staff_ids).order_by(
+                WFHSchedule.change_seq, WFHSchedule.schedule_id).all(),
+            'requests': ChangeSequenceService._changed(WFHRequest, since, upper, staff_ids).order_by(
+                WFHRequest.change_seq, WFHRequest.request_id).all(),
+            'next_since': upper,
+            'has_more': upper < current,
+        }
+
+    @staticmethod
+    def _changed(model, since, upper, staff_ids):
+        query = model.query.filter(model.change_seq > since, model.change_seq <= upper)
+        if staff_ids is not None:
+            query = query.filter(model.staff_id.in_(staff_ids))
+        return query
+
+    @staticmethod
+    def _next(conn):
+        counter = ChangeSequence.id == ChangeSequenceService.COUNTER_ID
+        if conn.execute(update(ChangeSequence).where(counter).values(seq=ChangeSequence.seq + 1)).rowcount == 0:
+            conn.execute(
+                insert(ChangeSequence)
+                .prefix_with('IGNORE', dialect='mysql')
+                .prefix_with('OR IGNORE', dialect='sqlite'),
+                {'id': ChangeSequenceService.COUNTER_ID, 'seq': 0}
+            )
+            conn.execute(update(ChangeSequence).where(counter).values(seq=ChangeSequence.seq + 1))
+        return conn.execute(select(ChangeSequence.seq).where(counter)).scalar()
+
+
+def _changes(session):
+    return session.info.setdefault(
+        'change_seq', {'schedules': set(), 'requests': set(), 'schedule_requests': set(),
+                       'request_schedules': set(), 'inserts': {}})
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_changed_rows(session, flush_context):
+    for obj in (*session.new, *session.dirty):
+        if obj not in session.new and not session.is_modified(obj):
+            continue
+        if isinstance(obj, WFHSchedule):
+            _changes(session)['schedules'].add(obj.schedule_id)
+        elif isinstance(obj, WFHRequest):
+            _changes(session)['requests'].add(obj.request_id)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_schedule_insert(orm_execute_state):
+    if not orm_execute_state.is_insert or not any(
+            mapper.class_ is WFHSchedule for mapper in orm_execute_state.all_mappers):
+        return
+    # Bulk inserted schedules have no ids yet, so they are found again by request
+    parameters = orm_execute_state.parameters
+    for row in parameters if isinstance(parameters, list) else [parameters or {}]:
+        if row.get('request_id') is not None:
+            _changes(orm_execute_state.session)['schedule_requests'].add(row['request_id'])
+
+
+@event.listens_for(Session, 'before_commit')
+def _assign_change_seq(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    changes = session.info.pop('change_seq', None)
+    if not changes or not any(changes.values()):
+        return
+
+    conn = session.connection()
+    seq = ChangeSequenceService._next(conn)
+    if changes['schedules']:
+        conn.execute(update(WFHSchedule).where(
+            WFHSchedule.schedule_id.in_(changes['schedules'])
+        ).values(change_seq=seq))
+    if changes['schedule_requests']:
+        conn.execute(update(WFHSchedule).where(
+            WFHSchedule.request_id.in_(changes['schedule_requests']),
+            WFHSchedule.change_seq.is_(None)
+        ).values(change_seq=seq))
+    if changes['request_schedules']:
+        conn.execute(update(WFHSchedule).where(
+            WFHSchedule.request_id.in_(changes['request_schedules'])
+        ).values(change_seq=seq))
+    if changes['requests']:
+        conn.execute(update(WFHRequest).where(
+            WFHRequest.request_id.in_(changes['requests'])
+        ).values(change_seq=seq))
+    for model, rows in changes['inserts'].items():
+        conn.execute(insert(model), [{**values, 'change_seq': seq} for values in rows.values()])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('change_seq', None)
@@ -0,0 +1,98 @@
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import delete, or_
+from app import db
+from app.models.wfh_event import WFHEvent
+from app.services.change_sequence_service import ChangeSequenceService
+
+logger = logging.getLogger(__name__)
+
+REQUEST_CREATED = 'request_created'
+REQUEST_STATUS = 'request_status'
+OCCUPANCY = 'occupancy'
+
+
+class EventService:
+    """
+    Publishes live update events as WFHEvent rows written by the commit of
+    the change they describe, so an event is only seen once its change is
+    committed and is dropped with it on rollback. Rows carry the commit's
+    change_seq and are read back in that order by every worker's EventBroker.
+
+    An event is about one staff member and addressed to one manager, and
+    reaches the subscribers of either. Publishing the same event key twice
+    in a transaction keeps only the latest payload.
+    """
+
+    @staticmethod
+    def publish(kind, key, staff_id, manager_id, payload):
+        # Does not commit; the event is written when the caller commits
+        ChangeSequenceService.insert_on_commit(WFHEvent, (kind, *key), {
+            'kind': kind, 'staff_id': staff_id, 'manager_id': manager_id,
+            'payload': json.dumps(payload), 'created_at': datetime.now(),
+        })
+
+    @staticmethod
+    def request_created(wfh_request):
+        EventService.publish(REQUEST_CREATED, (wfh_request.request_id,), wfh_request.staff_id, wfh_request.manager_id, {
+            'request_id': wfh_request.request_id,
+            'start_date': wfh_request.start_date.isoformat(),
+            'end_date': wfh_request.end_date.isoformat() if wfh_request.end_date else None,
+            'duration': wfh_request.duration,
+            'status': wfh_request.status or 'PENDING',
+        })
+
+    @staticmethod
+    def request_status(wfh_request):
+        EventService.status_changed(
+            wfh_request.request_id, wfh_request.staff_id, wfh_request.manager_id, wfh_request.status)
+
+    @staticmethod
+    def status_changed(request_id, staff_id, manager_id, status):
+        # For requests changed by bulk UPDATEs, which have no loaded WFHRequest
+        EventService.publish(REQUEST_STATUS, (request_id,), staff_id, manager_id, {
+            'request_id': request_id,
+            'status': status,
+        })
+
+    @staticmethod
+    def occupancy(schedule, occupancy):
+        # One event per team and date with the counts as committed
+        EventService.publish(OCCUPANCY, (occupancy.manager_id, occupancy.date), schedule.staff_id,
+                             occupancy.manager_id, occupancy.to_dict())
+
+    @staticmethod
+    def get_events(since, staff_ids=None, upper=None):
+        """
+        Events committed after change_seq `since` and up to `upper` (the
+        current sequence when omitted), about or addressed to the given staff,
+        or everyone's when staff_ids is None. Returns (events as dicts, upper).
+        """
+        if upper is None:
+            upper = ChangeSequenceService.current()
+        query = db.session.query(
+            WFHEvent.change_seq, WFHEvent.kind, WFHEvent.staff_id, WFHEvent.manager_id, WFHEvent.payload
+        ).filter(WFHEvent.change_seq > since, WFHEvent.change_seq <= upper)
+        if staff_ids is not None:
+            query = query.filter(or_(WFHEvent.staff_id.in_(staff_ids), WFHEvent.manager_id.in_(staff_ids)))
+        events = [
+            {'seq': seq, 'kind': kind, 'staff_id': staff_id, 'manager_id': manager_id, 'data': json.loads(payload)}
+            for seq, kind, staff_id, manager_id, payload in query.order_by(WFHEvent.change_seq, WFHEvent.event_id)
+        ]
+        return events, upper
+
+    @staticmethod
+    def prune(max_age):
+        """
+        Deletes events older than `max_age` on a connection of its own, so the
+        delete does not pass through the session listeners that invalidate caches.
+        Returns the number of rows removed.
+        """
+        with db.engine.begin() as conn:
+            removed = conn.execute(
+                delete(WFHEvent).where(WFHEvent.created_at < datetime.now() - max_age)
+            ).rowcount
+        if removed:
+            logger.info("Pruned %s events older than %s", removed, max_age)
+        return removed
@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, literal, select
+from sqlalchemy.orm import Session, aliased
+from app import db
+from app.models.staff import Staff
+
+# Read-only snapshot of the Staff columns the schedule views need
+StaffNode = namedtuple('StaffNode', [
+    'staff_id', 'staff_fname', 'staff_lname', 'dept', 'position', 'role', 'reporting_manager'
+])
+
+
+class OrgIndex:
+    """
+    In-memory org tree built from a single bulk Staff query.
+    Maps staff_id -> StaffNode and manager_id -> role -> direct reports.
+    """
+
+    def __init__(self, staff_nodes):
+        self.staff = {}
+        self.children = defaultdict(lambda: defaultdict(list))
+        for node in sorted(staff_nodes, key=lambda n: n.staff_id):
+            self.staff[node.staff_id] = node
+            self.children[node.reporting_manager][node.role].append(node)
+
+    def get_staff(self, staff_id):
+        return self.staff.get(staff_id)
+
+    def get_children(self, staff_id, role=None):
+        by_role = self.children.get(staff_id)
+        if not by_role:
+            return []
+        if role is not None:
+            return list(by_role.get(role, []))
+        return sorted((node for nodes in by_role.values() for node in nodes), key=lambda n: n.staff_id)
+
+    def get_team(self, staff_id):
+        # Everyone who reports to the same manager as staff_id
+        node = self.staff.get(staff_id)
+        if node is None:
+            return []
+        return self.get_children(node.reporting_manager)
+
+    def all_staff(self):
+        return list(self.staff.values())
+
+
+class OrgSubtree:
+    """
+    Compact parent/child view of one staff member's reporting subtree, at any depth.
+    """
+
+    def __init__(self, root_id, staff_nodes):
+        self.root_id = root_id
+        self.staff = {}
+        self.children = defaultdict(list)
+        for node in sorted(staff_nodes, key=lambda n: n.staff_id):
+            self.staff[node.staff_id] = node
+            if node.staff_id != root_id:
+                self.children[node.reporting_manager].append(node)
+
+    @property
+    def root(self):
+        return self.staff.get(self.root_id)
+
+    def get_children(self, staff_id, role=None):
+        return [node for node in self.children.get(staff_id, []) if role is None or node.role == role]
+
+    def get_descendants(self, staff_id):
+        # Everyone below staff_id, however many levels down
+        descendants = []
+        pending = list(self.children.get(staff_id, []))
+        while pending:
+            node = pending.pop()
+            descendants.append(node)
+            pending.extend(self.children.get(node.staff_id, []))
+        return sorted(descendants, key=lambda n: n.staff_id)
+
+
+class OrgHierarchyService:
+    _lock = threading.Lock()
+
+    # Guards the recursive query against reporting-line cycles
+    MAX_DEPTH = 32
+
+    @staticmethod
+    def get_index():
+        """
+        Returns the cached OrgIndex for the current app, rebuilding it when it
+        has been invalidated or is older than ORG_HIERARCHY_TTL seconds.
+        """
+        cache = OrgHierarchyService._get_cache()
+        ttl = current_app.config.get('ORG_HIERARCHY_TTL', 300)
+
+        index = cache['index']
+        if index is not None and time.monotonic() - cache['built_at'] < ttl:
+            return index
+
+        with OrgHierarchyService._lock:
+            index = cache['index']
+            if index is None or time.monotonic() - cache['built_at'] >= ttl:
+                rows = db.session.query(
+                    Staff.staff_id,
+                    Staff.staff_fname,
+                    Staff.staff_lname,
+                    Staff.dept,
+                    Staff.position,
+                    Staff.role,
+                    Staff.reporting_manager
+                ).all()
+                index = OrgIndex(StaffNode(*row) for row in rows)
+                cache['index'] = index
+                cache['built_at'] = time.monotonic()
+            return index
+
+    @staticmethod
+    def cached_index():
+        """
+        Returns the OrgIndex already built for the current app, or None.
+        Never queries, so it is safe where no SQL may run.
+        """
+        if not has_app_context():
+            return None
+        return OrgHierarchyService._get_cache()['index']
+
+    @staticmethod
+    def get_subtree(staff_id):
+        """
+        Returns the OrgSubtree rooted at staff_id, fetched with one recursive CTE
+        and cached alongside the org index. Returns None for an unknown staff_id.
+        """
+        cache = OrgHierarchyService._get_cache()
+        ttl = current_app.config.get('ORG_HIERARCHY_TTL', 300)
+
+        cached = cache['subtrees'].get(staff_id)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        columns = [
+            Staff.staff_id, Staff.staff_fname, Staff.staff_lname, Staff.dept,
+            Staff.position, Staff.role, Staff.reporting_manager
+        ]
+        tree = select(*columns, literal(0).label('depth')).where(
+            Staff.staff_id == staff_id
+        ).cte('org_tree', recursive=True)
+
+        child = aliased(Staff)
+        tree = tree.union_all(
+            select(
+                child.staff_id, child.staff_fname, child.staff_lname, child.dept,
+                child.position, child.role, child.reporting_manager, tree.c.depth + 1
+            ).join(
+                tree, child.reporting_manager == tree.c.staff_id
+            ).where(
+                child.staff_id != child.reporting_manager,  # top of the chain reports to themselves
+                tree.c.depth < OrgHierarchyService.MAX_DEPTH
+            )
+        )
+
+        rows = db.session.execute(select(*[tree.c[column.key] for column in columns])).all()
+        subtree = OrgSubtree(staff_id, {StaffNode(*row) for row in rows}) if rows else None
+        cache['subtrees'][staff_id] = (time.monotonic(), subtree)
+        return subtree
+
+    @staticmethod
+    def invalidate():
+        if has_app_context():
+            current_app.extensions['org_hierarchy'] = OrgHierarchyService._empty_cache()
+
+    @staticmethod
+    def _get_cache():
+        return current_app.extensions.setdefault('org_hierarchy', OrgHierarchyService._empty_cache())
+
+    @staticmethod
+    def _empty_cache():
+        return {'index': None, 'built_at': 0.0, 'subtrees': {}}
+
+    @staticmethod
+    def get_all_subordinates(staff_id):
+        """
+        Retrieves all subordinates for a given staff member as StaffNode
+        entries, from the cached reporting subtree.
+        For directors (role 1):
+            - If they have role 2 subordinates, return them and everyone below them.
+            - Else, return role 3 subordinates, each with everyone below them.
+        For managers (role 3):
+            - Return everyone below them, whatever their role.
+        Reporting chains are followed to any depth, so a manager's team takes in
+        sub-managers and their reports rather than only direct role 2 reports.
+        """
+        subtree = OrgHierarchyService.get_subtree(staff_id)
+        if subtree is None:
+            raise ValueError(f"No staff found with id: {staff_id}")
+
+        if subtree.root.role == 1:
+            # Director
+            direct_staff = subtree.get_children(staff_id, role=2)
+            if direct_staff:
+                staff = list(direct_staff)
+                for node in direct_staff:
+                    staff.extend(subtree.get_descendants(node.staff_id))
+                return {'type': 'direct', 'staff': sorted(staff, key=lambda n: n.staff_id)}
+            managers = subtree.get_children(staff_id, role=3)
+            if not managers:
+                return {'type': 'none', 'staff': []}
+            return {
+                'type': 'manager',
+                'managers': {manager: subtree.get_descendants(manager.staff_id) for manager in managers}
+            }
+        elif subtree.root.role == 3:
+            # Manager
+            return {'type': 'direct', 'staff': subtree.get_descendants(staff_id)}
+        else:
+            # Other roles do not have subordinates in this context
+            return {'type': 'none', 'staff': []}
+
+
+# Invalidate the cached org tree whenever Staff rows change
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_staff_flush(session, flush_context):
+    if any(isinstance(obj, Staff) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['org_hierarchy_dirty'] = True
+        OrgHierarchyService.invalidate()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidate_on_staff_bulk_change(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+            mapper.class_ is Staff for mapper in orm_execute_state.all_mappers):
+        orm_execute_state.session.info['org_hierarchy_dirty'] = True
+        OrgHierarchyService.invalidate()
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_on_staff_transaction_end(session):
+    # A rebuild between the change and the commit may have seen uncommitted rows
+    if session.info.pop('org_hierarchy_dirty', False):
+        OrgHierarchyService.invalidate()
@@ -1,6 +1,11 @@
+import logging
 from app.models.staff import Staff
+from app.services.org_hierarchy_service import OrgHierarchyService
 from sqlalchemy.exc import SQLAlchemyError
 
+logger = logging.getLogger(__name__)
+
+
 class StaffService:
     @staticmethod
     def authenticate_staff(email, password):
@@ -9,10 +14,10 @@ class StaffService:
             if staff and staff.password == password:
                 return staff
             else:
-                print("Wrong email or password")
+                logger.info("Wrong email or password")
                 return None
         except SQLAlchemyError as e:
-            print(f"Database error during authentication: {str(e)}")
+            logger.error("Database error during authentication: %s", e)
             raise
 
     @staticmethod
@@ -23,10 +28,10 @@ class StaffService:
                 raise ValueError(f"No staff found with id: {staff_id}")
             return staff
         except SQLAlchemyError as e:
-            print(f"Database error while fetching staff by ID: {str(e)}")
+            logger.error("Database error while fetching staff by ID: %s", e)
             raise
         except ValueError as e:
-            print(str(e))
+            logger.info(str(e))
             raise
 
     # New Method to Get Subordinates
@@ -38,56 +43,40 @@ class StaffService:
                 raise ValueError(f"No subordinates found for staff_id: {staff_id}")
             return subordinates
         except SQLAlchemyError as e:
-            print(f"Database error while fetching subordinates: {str(e)}")
+            logger.error("Database error while fetching subordinates: %s", e)
             raise
         except ValueError as e:
-            print(str(e))
+            logger.info(str(e))
             raise
 
     # NEW METHOD TO HANDLE BOTH CASES FOR DIRECTORS AND MANAGERS
     @staticmethod
     def get_all_subordinates(staff_id):
         """
-        Retrieves all subordinates for a given staff member.
-        For directors (role 1):
-            - If they have role 2 subordinates, return them.
-            - Else, return role 3 subordinates and their role 2 subordinates.
-        For managers (role 3):
-            - Return their direct role 2 subordinates.
+        Same result as OrgHierarchyService.get_all_subordinates, with Staff
+        rows instead of StaffNode entries.
         """
         try:
-            staff = Staff.query.get(staff_id)
-            if not staff:
-                raise ValueError(f"No staff found with id: {staff_id}")
+            result = OrgHierarchyService.get_all_subordinates(staff_id)
+            nodes = result.get('staff', [])
+            for manager, staffs in result.get('managers', {}).items():
+                nodes = nodes + [manager] + staffs
+            rows = {
+                staff.staff_id: staff
+                for staff in Staff.query.filter(Staff.staff_id.in_({node.staff_id for node in nodes})).all()
+            } if nodes else {}
 
-            if staff.role == 1:
-                # Director
-                # Check for direct role 2 subordinates
-                direct_staff = Staff.query.filter_by(reporting_manager=staff_id, role=2).all()
-                if direct_staff:
-                    return {'type': 'direct', 'staff': direct_staff}
-                else:
-                    # Get role 3 managers under the director
-                    managers = Staff.query.filter_by(reporting_manager=staff_id, role=3).all()
-                    if not managers:
-                        return {'type': 'none', 'staff': []}
-                    managers_with_staff = {}
-                    for manager in managers:
-                        staffs = Staff.query.filter_by(reporting_manager=manager.staff_id, role=2).all()
-                        managers_with_staff[manager] = staffs
-                    return {'type': 'manager', 'managers': managers_with_staff}
-            elif staff.role == 3:
-                # Manager
-                direct_staff = Staff.query.filter_by(reporting_manager=staff_id, role=2).all()
-                return {'type': 'direct', 'staff': direct_staff}
-            else:
-                # Other roles do not have subordinates in this context
-                return {'type': 'none', 'staff': []}
+            if result['type'] == 'manager':
+                return {'type': 'manager', 'managers': {
+                    rows[manager.staff_id]: [rows[node.staff_id] for node in staffs]
+                    for manager, staffs in result['managers'].items()
+                }}
+            return {'type': result['type'], 'staff': [rows[node.staff_id] for node in result['staff']]}
         except SQLAlchemyError as e:
-            print(f"Database error while fetching all subordinates: {str(e)}")
+            logger.error("Database error while fetching all subordinates: %s", e)
             raise
         except ValueError as e:
-            print(str(e))
+            logger.info(str(e))
             raise
 
     @staticmethod
@@ -0,0 +1,179 @@
+import logging
+from app import db
+from app.models.team_daily_occupancy import TeamDailyOccupancy
+from app.models.wfh_schedule import WFHSchedule
+from sqlalchemy import bindparam, func, insert, tuple_, update
+
+logger = logging.getLogger(__name__)
+
+
+class OccupancyChanges:
+    """
+    Occupancy deltas of a unit of work keyed by (manager_id, date), with the
+    last schedule that moved each one, for TeamOccupancyService.apply_changes.
+    """
+
+    def __init__(self):
+        self.deltas = {}
+        self.schedules = {}
+
+    def add(self, schedule, delta):
+        # Adds (delta=1) or removes (delta=-1) an approved schedule
+        count_am, count_pm = TeamOccupancyService.duration_counts(schedule.duration)
+        if count_am == 0 and count_pm == 0:
+            return
+        key = (schedule.manager_id, schedule.date)
+        delta_am, delta_pm = self.deltas.get(key, (0, 0))
+        self.deltas[key] = (delta_am + delta * count_am, delta_pm + delta * count_pm)
+        self.schedules[key] = schedule
+
+
+class TeamOccupancyService:
+    @staticmethod
+    def duration_counts(duration):
+        # Returns the (am, pm) slots taken by a schedule of the given duration
+        if duration == 'FULL_DAY':
+            return 1, 1
+        elif duration == 'HALF_DAY_AM':
+            return 1, 0
+        elif duration == 'HALF_DAY_PM':
+            return 0, 1
+        return 0, 0
+
+    @staticmethod
+    def apply_changes(changes):
+        """
+        Writes the deltas collected in an OccupancyChanges to the occupancy
+        rows with UPDATE ... SET wfh_count_am = wfh_count_am + :am, so
+        concurrent changes to the same team and date add up instead of
+        overwriting each other. Missing rows are created first. Does not
+        commit, so the change lands in the same transaction as the schedule
+        status update. Returns the updated rows keyed by (manager_id, date).
+        """
+        deltas = {key: counts for key, counts in changes.deltas.items() if counts != (0, 0)}
+        if not deltas:
+            return {}
+
+        db.session.execute(
+            insert(TeamDailyOccupancy)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite'),
+            [{'manager_id': manager_id, 'date': day, 'wfh_count_am': 0, 'wfh_count_pm': 0}
+             for manager_id, day in sorted(deltas)]
+        )
+        table = TeamDailyOccupancy.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.manager_id == bindparam('key_manager_id'), table.c.date == bindparam('key_date'))
+            .values(wfh_count_am=table.c.wfh_count_am + bindparam('delta_am'),
+                    wfh_count_pm=table.c.wfh_count_pm + bindparam('delta_pm')),
+            [{'key_manager_id': manager_id, 'key_date': day, 'delta_am': delta_am, 'delta_pm': delta_pm}
+             for (manager_id, day), (delta_am, delta_pm) in sorted(deltas.items())]
+        )
+
+        rows = TeamDailyOccupancy.query.filter(
+            tuple_(TeamDailyOccupancy.manager_id, TeamDailyOccupancy.date).in_(list(deltas))
+        ).populate_existing().all()
+        for row in rows:
+            if row.wfh_count_am < 0 or row.wfh_count_pm < 0:
+                logger.warning(
+                    "Occupancy of team %s on %s dropped below zero (am %s, pm %s); run rebuild-occupancy",
+                    row.manager_id, row.date, row.wfh_count_am, row.wfh_count_pm)
+        return {(row.manager_id, row.date): row for row in rows}
+
+    @staticmethod
+    def lock_rows(keys):
+        """
+        Serialises capacity-checked approvals per team and date. Makes sure an
+        occupancy row exists for every (manager_id, date) in `keys`, then locks
+        those rows with SELECT ... FOR UPDATE, always in the same order so two
+        approvals cannot deadlock. Only the given teams and dates are locked.
+
+        Starts the caller's unit of work: on MySQL every plain read of a
+        transaction sees the snapshot of its first read, so the lock must come
+        before any read that depends on what earlier approvals committed. A
+        read-only transaction the caller left open is rolled back first; staged
+        changes raise RuntimeError rather than being committed or discarded.
+        Nothing is committed here, so the placeholder rows are dropped with the
+        rest of a rejected approval. The locks are held until the caller
+        commits or rolls back.
+        Returns the locked rows keyed by (manager_id, date).
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return {}
+
+        if db.session.new or db.session.dirty or db.session.deleted:
+            raise RuntimeError("Occupancy rows must be locked before the unit of work changes anything")
+        db.session.rollback()
+
+        db.session.execute(
+            insert(TeamDailyOccupancy)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite'),
+            [{'manager_id': manager_id, 'date': day, 'wfh_count_am': 0, 'wfh_count_pm': 0}
+             for manager_id, day in keys]
+        )
+
+        key_filter = tuple_(TeamDailyOccupancy.manager_id, TeamDailyOccupancy.date).in_(keys)
+        if db.session.get_bind().dialect.name == 'sqlite':
+            # SQLite ignores FOR UPDATE and only locks the whole database, which a write takes
+            db.session.execute(
+                update(TeamDailyOccupancy)
+                .where(key_filter)
+                .values(wfh_count_am=TeamDailyOccupancy.wfh_count_am)
+                .execution_options(synchronize_session=False)
+            )
+
+        rows = TeamDailyOccupancy.query.filter(key_filter).order_by(
+            TeamDailyOccupancy.manager_id, TeamDailyOccupancy.date
+        ).with_for_update().populate_existing().all()
+        return {(row.manager_id, row.date): row for row in rows}
+
+    @staticmethod
+    def rebuild(start_date, end_date):
+        """
+        Recomputes TeamDailyOccupancy from the approved schedules in
+        [start_date, end_date], replacing whatever is stored for that range.
+        Returns the number of occupancy rows written.
+        """
+        rows = db.session.query(
+            WFHSchedule.manager_id,
+            WFHSchedule.date,
+            WFHSchedule.duration,
+            func.count(WFHSchedule.schedule_id)
+        ).filter(
+            WFHSchedule.date >= start_date,
+            WFHSchedule.date <= end_date,
+            WFHSchedule.status == 'APPROVED'
+        ).group_by(
+            WFHSchedule.manager_id, WFHSchedule.date, WFHSchedule.duration
+        ).all()
+
+        counts = {}
+        for manager_id, sched_date, duration, count in rows:
+            count_am, count_pm = TeamOccupancyService.duration_counts(duration)
+            wfh_count_am, wfh_count_pm = counts.get((manager_id, sched_date), (0, 0))
+            counts[(manager_id, sched_date)] = (wfh_count_am + count_am * count, wfh_count_pm + count_pm * count)
+
+        try:
+            TeamDailyOccupancy.query.filter(
+                TeamDailyOccupancy.date >= start_date,
+                TeamDailyOccupancy.date <= end_date
+            ).delete(synchronize_session=False)
+
+            db.session.add_all([
+                TeamDailyOccupancy(
+                    manager_id=manager_id,
+                    date=sched_date,
+                    wfh_count_am=wfh_count_am,
+                    wfh_count_pm=wfh_count_pm
+                )
+                for (manager_id, sched_date), (wfh_count_am, wfh_count_pm) in counts.items()
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return len(counts)
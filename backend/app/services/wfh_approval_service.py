@@ -0,0 +1,274 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from sqlalchemy import func
+from app import db
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.wfh_request_service import WFHRequestService
+from app.services.wfh_check_service import WFHCheckService
+from app.services.wfh_schedule_service import WFHScheduleService
+from app.services.team_occupancy_service import OccupancyChanges, TeamOccupancyService
+from app.services.event_service import EventService
+
+logger = logging.getLogger(__name__)
+
+BULK_DECISIONS = ('APPROVED', 'REJECTED')
+
+
+class WFHApprovalService:
+    @staticmethod
+    def bulk_update_requests(decisions, two_months_ago):
+        """
+        Approves or rejects many requests in one transaction.
+        Approvals hold the affected team/date occupancy locks until the commit.
+
+        `decisions` is a list of {'request_id', 'request_status', 'reason'} dicts,
+        evaluated in order. Requests, schedules, team sizes and existing approved
+        WFH counts are loaded with a handful of queries up front. Each approval is
+        checked against the 50% team rule including the approvals accepted
+        earlier in the same batch. Returns one outcome dict per decision.
+        """
+        current_date = datetime.now().date()
+        request_ids = {d.get('request_id') for d in decisions}
+
+        # Lock the team/date occupancy rows every approval in the batch could check or write
+        approve_ids = {d.get('request_id') for d in decisions if d.get('request_status') == 'APPROVED'}
+        if approve_ids:
+            TeamOccupancyService.lock_rows(WFHApprovalService._lock_keys(
+                db.session.query(Staff.reporting_manager, WFHSchedule.manager_id, WFHSchedule.date).join(
+                    WFHRequest, WFHRequest.request_id == WFHSchedule.request_id
+                ).join(
+                    Staff, Staff.staff_id == WFHRequest.staff_id
+                ).filter(
+                    WFHSchedule.request_id.in_(approve_ids),
+                    WFHSchedule.status == 'PENDING',
+                    WFHRequest.duration != "WITHDRAWAL REQUEST"
+                ).distinct().all(), current_date))
+
+        requests = {
+            r.request_id: r for r in WFHRequest.query.filter(WFHRequest.request_id.in_(request_ids)).all()
+        }
+        schedules_by_request = defaultdict(list)
+        for schedule in WFHSchedule.query.filter(WFHSchedule.request_id.in_(request_ids)).order_by(
+                WFHSchedule.date).all():
+            schedules_by_request[schedule.request_id].append(schedule)
+
+        # Teams are keyed by the requester's reporting manager, as in WFHCheckService
+        team_of = dict(db.session.query(Staff.staff_id, Staff.reporting_manager).filter(
+            Staff.staff_id.in_({r.staff_id for r in requests.values()})
+        ).all())
+        capacity = WFHApprovalService._load_capacity(requests, schedules_by_request, team_of, current_date)
+
+        # Original requests behind withdrawal schedules, so approving a withdrawal needs no extra query
+        original_ids = {
+            int(s.reason_for_withdrawing)
+            for request_id, request_obj in requests.items() if request_obj.duration == "WITHDRAWAL REQUEST"
+            for s in schedules_by_request[request_id] if s.reason_for_withdrawing
+        }
+        original_requests = {
+            r.request_id: r for r in WFHRequest.query.filter(WFHRequest.request_id.in_(original_ids)).all()
+        } if original_ids else {}
+
+        # Occupancy changes of the whole batch, written together before the commit
+        occupancy_changes = OccupancyChanges()
+
+        results = []
+        seen = set()
+        try:
+            for decision in decisions:
+                request_id = decision.get('request_id')
+                status = decision.get('request_status')
+                outcome = {'request_id': request_id, 'request_status': status}
+                results.append(outcome)
+
+                if status not in BULK_DECISIONS:
+                    outcome.update(success=False, message=f"Unsupported status: {status}")
+                    continue
+                if request_id in seen:
+                    outcome.update(success=False, message="Duplicate request in batch")
+                    continue
+                seen.add(request_id)
+
+                request_obj = requests.get(request_id)
+                schedules = schedules_by_request.get(request_id)
+                if not request_obj:
+                    outcome.update(success=False, message="Request does not exist")
+                    continue
+                if not schedules:
+                    outcome.update(success=False, message=f"No schedules found for request_id: {request_id}")
+                    continue
+                if not WFHRequestService.check_date(request_obj.start_date, two_months_ago):
+                    outcome.update(success=False, message="The date is invalid to be approved")
+                    continue
+
+                is_withdrawal = request_obj.duration == "WITHDRAWAL REQUEST"
+                if status == 'APPROVED' and not is_withdrawal:
+                    team = team_of.get(request_obj.staff_id)
+                    dates = [s.date for s in schedules if s.status == 'PENDING' and s.date >= current_date]
+                    violated = capacity.violations(team, dates, request_obj.duration)
+                    if violated:
+                        formatted_dates = ",".join(d.strftime("%d-%m-%Y") for d in violated)
+                        outcome.update(
+                            success=False,
+                            message=f"Cannot approve request due to policy violation on date(s) {formatted_dates}")
+                        continue
+                    capacity.add(team, dates, request_obj.duration)
+
+                request_obj.status = status
+                if status == 'REJECTED':
+                    request_obj.reason_for_rejection = decision.get('reason')
+                EventService.request_status(request_obj)
+
+                if is_withdrawal and status == 'APPROVED':
+                    outcome['schedule_status'] = 'WITHDRAWN'
+                    WFHScheduleService.apply_status(schedules, 'WITHDRAWN', occupancy_changes)
+                    for schedule in schedules:
+                        original = original_requests.get(int(schedule.reason_for_withdrawing or 0))
+                        if original and original.end_date is None and original.status != 'WITHDRAWN':
+                            original.status = 'WITHDRAWN'
+                            EventService.request_status(original)
+                elif is_withdrawal:
+                    # A rejected withdrawal hands the schedule back to its original request
+                    WFHScheduleService.apply_status(schedules, status, occupancy_changes)
+                    for schedule in schedules:
+                        schedule.request_id = schedule.reason_for_withdrawing
+                else:
+                    WFHScheduleService.apply_status(schedules, status, occupancy_changes)
+
+                outcome.update(success=True, message=f"Successfully updated request {request_id} as {status}")
+
+            WFHScheduleService.apply_occupancy(occupancy_changes)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        logger.info(
+            "Bulk update of %s requests: %s succeeded",
+            len(decisions), sum(1 for outcome in results if outcome['success']))
+        return results
+
+    @staticmethod
+    def approve_request(request_id, dates, two_months_ago):
+        """
+        Approves a single (non-withdrawal) request and its schedules atomically.
+        The team's occupancy rows for `dates`, and the rows its schedules are
+        counted in, are locked before the 50% check, so concurrent approvals for
+        the same team and date run one after another and cannot both pass the
+        check. Other teams are not blocked.
+        Returns {'success', 'message', 'violated_dates'}.
+        """
+        # One row per pending schedule, or a single row with no schedule
+        rows = db.session.query(
+            WFHRequest.staff_id, WFHRequest.duration, Staff.reporting_manager, WFHSchedule.manager_id, WFHSchedule.date
+        ).join(
+            Staff, Staff.staff_id == WFHRequest.staff_id
+        ).outerjoin(
+            WFHSchedule, (WFHSchedule.request_id == WFHRequest.request_id) & (WFHSchedule.status == 'PENDING')
+        ).filter(WFHRequest.request_id == request_id).all()
+        if not rows:
+            return {'success': False, 'message': "Request Does not Exist!", 'violated_dates': []}
+        staff_id, duration, team = rows[0][:3]
+        lock_keys = {(team, d) for d in dates}
+        lock_keys.update((manager_id, day) for _, _, _, manager_id, day in rows if day is not None)
+
+        try:
+            TeamOccupancyService.lock_rows(lock_keys)
+
+            if dates:
+                result = WFHCheckService.check_team_capacity_bulk(staff_id, dates, duration)
+                violated_dates = [date.fromisoformat(d) for d in result['violated_dates']]
+                if violated_dates:
+                    db.session.rollback()
+                    return {'success': False, 'message': "Policy violation", 'violated_dates': violated_dates}
+
+            request_obj = db.session.get(WFHRequest, request_id)
+            if not WFHRequestService.check_date(request_obj.start_date, two_months_ago):
+                db.session.rollback()
+                return {'success': False, 'message': "The date is invalid to be approved", 'violated_dates': []}
+
+            schedules = WFHSchedule.query.filter_by(request_id=request_id).all()
+            if not schedules:
+                raise ValueError(f"No schedules found for request_id: {request_id}")
+
+            request_obj.status = 'APPROVED'
+            EventService.request_status(request_obj)
+            WFHScheduleService.apply_status(schedules, 'APPROVED')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        logger.info("Approved request %s with %s schedules", request_id, len(schedules))
+        return {'success': True, 'message': f"Successfully updated request {request_id} as APPROVED",
+                'violated_dates': []}
+
+    @staticmethod
+    def _lock_keys(rows, current_date):
+        # Capacity is checked per reporting manager but occupancy is written per
+        # schedule manager_id, so both keys are locked when they differ
+        keys = set()
+        for team, manager_id, day in rows:
+            keys.add((manager_id, day))
+            if day >= current_date:
+                keys.add((team, day))
+        return keys
+
+    @staticmethod
+    def _load_capacity(requests, schedules_by_request, team_of, current_date):
+        teams = set()
+        dates = set()
+        for request_id, request_obj in requests.items():
+            if request_obj.duration == "WITHDRAWAL REQUEST":
+                continue
+            teams.add(team_of.get(request_obj.staff_id))
+            dates.update(s.date for s in schedules_by_request.get(request_id, []) if s.date >= current_date)
+        teams.discard(None)
+
+        team_counts = {}
+        approved = []
+        if teams and dates:
+            team_counts = dict(db.session.query(Staff.reporting_manager, func.count(Staff.staff_id)).filter(
+                Staff.reporting_manager.in_(teams)
+            ).group_by(Staff.reporting_manager).all())
+            approved = db.session.query(
+                Staff.reporting_manager, WFHSchedule.date, WFHSchedule.duration, func.count(WFHSchedule.schedule_id)
+            ).join(
+                Staff, Staff.staff_id == WFHSchedule.staff_id
+            ).filter(
+                Staff.reporting_manager.in_(teams),
+                WFHSchedule.date.in_(dates),
+                WFHSchedule.status == 'APPROVED'
+            ).group_by(Staff.reporting_manager, WFHSchedule.date, WFHSchedule.duration).all()
+
+        return TeamCapacity(team_counts, approved)
+
+
+class TeamCapacity:
+    """
+    Approved WFH per team, date and duration, updated as a batch is approved.
+    Applies the same clash rule as WFHCheckService.check_team_capacity_bulk.
+    """
+
+    def __init__(self, team_counts, approved_rows):
+        self.team_counts = team_counts
+        self.approved = defaultdict(Counter)
+        for team, day, duration, count in approved_rows:
+            self.approved[(team, day)][duration] += count
+
+    def applied(self, team, day, duration):
+        counts = self.approved[(team, day)]
+        if duration == 'FULL_DAY':
+            return sum(counts.values())
+        # a half-day request only clashes with the same half or a full day
+        return counts[duration] + counts['FULL_DAY']
+
+    def violations(self, team, dates, duration):
+        max_wfh = self.team_counts.get(team, 0) // 2
+        return [d for d in dates if max_wfh - self.applied(team, d, duration) < 1]
+
+    def add(self, team, dates, duration):
+        for d in dates:
+            self.approved[(team, d)][duration] += 1
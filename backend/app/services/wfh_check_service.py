@@ -1,48 +1,84 @@
+import logging
 from app import db
 from app.models.staff import Staff
 from app.models.wfh_schedule import WFHSchedule
 from app.services.staff_service import StaffService
+from sqlalchemy import func
+from datetime import datetime, date
+
+logger = logging.getLogger(__name__)
 
 class WFHCheckService:
     @staticmethod
     def check_team_count(staff_id, date, duration):
+        result = WFHCheckService.check_team_capacity_bulk(staff_id, [date], duration)
+        # If more than 50% would be working from home, return an error
+        if result['violated_dates']:
+            logger.info("Max limit for Team under manager: %s on date: %s", result['manager_id'], date)
+            return 'Unable to apply due to max limit'
+        else:
+            return 'Success'
+
+    @staticmethod
+    def check_team_capacity_bulk(staff_id, dates, duration):
+        """
+        Checks the 50% team WFH rule for every date in `dates` at once.
+        Team size is computed once and the approved schedules for all dates
+        are counted in a single grouped query.
+        Returns the per-date WFH count and headroom (how many more staff may
+        still WFH) along with the dates that would violate the rule.
+        """
         # identify the staff department
         manager_id = StaffService.get_staff_by_id(staff_id).reporting_manager
-        
+
         # find out how many people in that department
         team_count = WFHCheckService.team_count(manager_id)
-        
-        # now, find out how many people in that department also have approved WFH on that date
-        applied_count = 0
 
-        # get all the schedules with the same date and status 'APPROVED' or 'PENDING'
-        schedules = db.session.query(WFHSchedule).filter(
-            WFHSchedule.date == date,
-            WFHSchedule.status == 'APPROVED')
-        
-        for schedule in schedules:
-            # get the department of the schedule's staff
-            schedule_staff = StaffService.get_staff_by_id(schedule.staff_id)
-            m_id = schedule_staff.reporting_manager
-
-            # if department is same as the one applying, increase counter
-            if m_id == manager_id:
-
-                if duration == "FULL_DAY":
-                    applied_count += 1
-
-                else:
-                    if schedule.duration == duration or schedule.duration == "FULL_DAY":
-                        applied_count += 1
-
-        # Calculate the percentage of staff working from home, if including this request
-        wfh_percentage = (applied_count +1) / team_count
-        # If more than 50% are working from home, return an error
-        if wfh_percentage > 0.5:
-            print(f"Max limit for Team under manager: {m_id} on date: {date}")
-            return 'Unable to apply due to max limit'
-        else:
-            return 'Success'
+        dates = sorted({WFHCheckService._to_date(d) for d in dates})
+        applied_counts = {}
+        if dates:
+            # approved WFH in the same team on any of the dates, restricted to the team's staff ids
+            team_staff_ids = db.session.query(Staff.staff_id).filter(Staff.reporting_manager == manager_id)
+            query = db.session.query(WFHSchedule.date, func.count(WFHSchedule.schedule_id)).filter(
+                WFHSchedule.date.in_(dates),
+                WFHSchedule.status == 'APPROVED',
+                WFHSchedule.staff_id.in_(team_staff_ids))
+
+            # a half-day request only clashes with the same half or a full day
+            if duration != "FULL_DAY":
+                query = query.filter(WFHSchedule.duration.in_([duration, "FULL_DAY"]))
+
+            applied_counts = dict(query.group_by(WFHSchedule.date).all())
+
+        # at most half the team may WFH, so (applied + 1) / team_count <= 0.5
+        max_wfh = team_count // 2
+        dates_data = []
+        violated_dates = []
+        for d in dates:
+            applied_count = applied_counts.get(d, 0)
+            headroom = max_wfh - applied_count
+            if headroom < 1:
+                violated_dates.append(d.isoformat())
+            dates_data.append({
+                'date': d.isoformat(),
+                'wfh_count': applied_count,
+                'headroom': headroom
+            })
+
+        return {
+            'manager_id': manager_id,
+            'team_count': team_count,
+            'dates': dates_data,
+            'violated_dates': violated_dates
+        }
+
+    @staticmethod
+    def _to_date(value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value, '%Y-%m-%d').date()
 
     @staticmethod
     def team_count(m_id):
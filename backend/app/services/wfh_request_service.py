@@ -1,7 +1,15 @@
+import base64
+import json
+import logging
 from app import db
 from app.models.wfh_request import WFHRequest
 from app.models.wfh_schedule import WFHSchedule
+from app.services.change_sequence_service import ChangeSequenceService
+from app.services.event_service import EventService
 from datetime import datetime, timedelta, date
+from sqlalchemy import func, select, update
+
+logger = logging.getLogger(__name__)
 
 class WFHRequestService:
     @staticmethod
@@ -22,17 +30,11 @@ class WFHRequestService:
         
         if end_date:
             if(not isinstance(end_date, date)):
-                print("try2")
-                print(type(end_date))
-                print(isinstance(end_date, date))
                 end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-                print("try2")
 
             if end_date < min_valid_date or end_date > max_valid_date:
                 raise ValueError("End date must be between 2 months ago and 3 months from now.")
-            # print(type(end_date))
-            # print(type(start_date))
-            
+
             if start_date >= end_date:
                 raise ValueError("End date must be after start date.")
 
@@ -42,7 +44,7 @@ class WFHRequestService:
             WFHRequest.start_date == start_date,
             WFHRequest.status != 'EXPIRED'
         ).first()
-        print(duration)
+        logger.debug("Creating %s request for staff %s on %s", duration, staff_id, start_date)
         if duration == "WITHDRAWAL REQUEST":
             existing_request = False
 
@@ -59,12 +61,14 @@ class WFHRequestService:
             reason_for_applying=reason_for_applying, duration=duration
         )
         db.session.add(new_request)
+        # The request_created event is published once its schedules exist, see WFHScheduleService
         db.session.commit()
         return new_request
     
     @staticmethod
-    def get_pending_requests_for_manager(manager_id):
-        return WFHRequest.query.filter_by(manager_id=manager_id, status='PENDING').all()
+    def get_pending_requests_for_manager(manager_id, start_date=None, end_date=None, limit=None, after_id=None):
+        query = WFHRequest.query.filter_by(manager_id=manager_id, status='PENDING')
+        return WFHRequestService._page(query, start_date, end_date, limit, after_id)
     
 
     @staticmethod
@@ -78,6 +82,7 @@ class WFHRequestService:
         # If status is CANCELLED, we don't need to check the date range
             if new_request_status == 'CANCELLED':
                 request.status = new_request_status
+                EventService.request_status(request)
                 db.session.commit()
                 return True
             # Check if within date range
@@ -90,6 +95,7 @@ class WFHRequestService:
                 # provide reason for reject
                 if new_request_status == 'REJECTED':
                     request.reason_for_rejection = reason
+                EventService.request_status(request)
 
             # not within date range = not suppose to approve
             else:
@@ -108,22 +114,59 @@ class WFHRequestService:
         
     @staticmethod
     def reject_expired(two_months_ago):
-        # Fetch all requests from the database
-        requests = WFHRequest.query.all()
-        request_ids = []
-
-        # Check each request
-        for request in requests:
-
-            # Check if date range is within 2 months and only update those that has not been updated expired
-            if (WFHRequestService.check_date(request.start_date , two_months_ago) != True) and request.status == 'PENDING':
-                request.status = 'EXPIRED'  # Update status to expired
-                request.reason_for_rejection = "Past time period" 
-                request_ids.append(request.request_id)
+        """
+        Expires every PENDING request whose start date is not after two_months_ago,
+        together with its PENDING schedules, using two set-based UPDATEs in one
+        transaction. The affected ids are selected first so the changed rows
+        can be stamped with the change sequence and a status event published
+        for each request. Returns the number of requests
+        and schedules affected.
+        """
+        expired = db.session.execute(
+            select(WFHRequest.request_id, WFHRequest.staff_id, WFHRequest.manager_id).where(
+                WFHRequest.status == 'PENDING',
+                WFHRequest.start_date <= two_months_ago
+            )
+        ).all()
+        expired_request_ids = [row.request_id for row in expired]
+        if not expired_request_ids:
+            return {'requests': 0, 'schedules': 0}
+
+        try:
+            # Schedules first, while the affected requests are still PENDING
+            schedule_count = db.session.execute(
+                update(WFHSchedule)
+                .where(
+                    WFHSchedule.status == 'PENDING',
+                    WFHSchedule.request_id.in_(expired_request_ids)
+                )
+                .values(status='EXPIRED')
+                # PENDING to EXPIRED leaves approved counts, and so cached views, as they were
+                .execution_options(synchronize_session=False, approved_unchanged=True)
+            ).rowcount
+
+            request_count = db.session.execute(
+                update(WFHRequest)
+                .where(
+                    WFHRequest.status == 'PENDING',
+                    WFHRequest.request_id.in_(expired_request_ids)
+                )
+                .values(status='EXPIRED', reason_for_rejection="Past time period")
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+            ChangeSequenceService.record_bulk(WFHRequest, expired_request_ids)
+            ChangeSequenceService.record_bulk_schedules(expired_request_ids)
+            for row in expired:
+                EventService.status_changed(row.request_id, row.staff_id, row.manager_id, 'EXPIRED')
+
+            # Commit the changes to the database
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        # Commit the changes to the database
-        db.session.commit()
-        return request_ids
+        return {'requests': request_count, 'schedules': schedule_count}
     
 
     @staticmethod
@@ -134,8 +177,50 @@ class WFHRequestService:
             return False
         
     @staticmethod
-    def get_staff_requests(staff_id):
-        return WFHRequest.query.filter_by(staff_id = staff_id).all()
+    def get_staff_requests(staff_id, statuses=None, start_date=None, end_date=None, limit=None, after_id=None):
+        query = WFHRequest.query.filter_by(staff_id = staff_id)
+        if statuses:
+            query = query.filter(WFHRequest.status.in_(statuses))
+        return WFHRequestService._page(query, start_date, end_date, limit, after_id)
+
+    @staticmethod
+    def staff_requests_stamp(staff_id):
+        # Changes whenever any of the staff member's requests is created or updated
+        return ChangeSequenceService.stamp(WFHRequest, WFHRequest.staff_id == staff_id)
+
+    @staticmethod
+    def _page(query, start_date, end_date, limit, after_id):
+        """
+        Applies the optional date-range filter and one keyset page to a WFHRequest query.
+        A request matches the range if any of its dates fall inside it. Rows come back
+        in request_id order, starting after after_id, at most `limit` of them.
+        """
+        if start_date:
+            query = query.filter(func.coalesce(WFHRequest.end_date, WFHRequest.start_date) >= start_date)
+        if end_date:
+            query = query.filter(WFHRequest.start_date <= end_date)
+        if after_id is not None:
+            query = query.filter(WFHRequest.request_id > after_id)
+        query = query.order_by(WFHRequest.request_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @staticmethod
+    def encode_cursor(request_id):
+        # Opaque to clients, so the keyset can change without breaking them
+        return base64.urlsafe_b64encode(json.dumps({'after': request_id}).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            after_id = json.loads(base64.urlsafe_b64decode(padded.encode()))['after']
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Invalid cursor")
+        if not isinstance(after_id, int):
+            raise ValueError("Invalid cursor")
+        return after_id
 
     @staticmethod
     def check_withdrawal(staff_id, start_date):
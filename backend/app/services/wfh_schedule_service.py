@@ -1,58 +1,99 @@
+import logging
+from collections import defaultdict
 from app import db
 from app.models.wfh_schedule import WFHSchedule
 from app.models.wfh_request import WFHRequest
-from app.models.staff import Staff
 from datetime import timedelta
-from app.services.staff_service import StaffService
+from sqlalchemy import func, insert, select
+from app.services.org_hierarchy_service import OrgHierarchyService
+from app.services.team_occupancy_service import OccupancyChanges, TeamOccupancyService
+from app.services.change_sequence_service import ChangeSequenceService
+from app.services.event_service import EventService
+from app.cache import CacheScope, cached
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, summaries fall back to plain Python counting
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Bit flags for the half days a schedule duration covers
+AM = 1
+PM = 2
+DURATION_CODES = {'HALF_DAY_AM': AM, 'HALF_DAY_PM': PM, 'FULL_DAY': AM | PM}
+
+
+def _subtree_scope(manager_id, start_date, end_date):
+    # Everyone under manager_id belongs to the team of their own reporting manager
+    subtree = OrgHierarchyService.get_subtree(manager_id)
+    if subtree is None:
+        return None
+    teams = {node.reporting_manager for node in subtree.staff.values() if node.staff_id != manager_id}
+    return CacheScope(frozenset(teams), start_date, end_date)
+
+
+def _team_scope(staff_id, date):
+    staff = OrgHierarchyService.get_index().get_staff(staff_id)
+    if staff is None:
+        return None
+    return CacheScope(frozenset([staff.reporting_manager or staff_id]), date, date)
+
 
 class WFHScheduleService:
     @staticmethod
     def create_schedule(request_id, staff_id, manager_id, start_date, end_date, duration, dept, position):
-        schedules = []
+        # Expand the request into its weekly dates up front
+        schedule_dates = []
         current_date = start_date
-
         while True:
-            # Query all schedules for the current date
-            existing_schedules = WFHSchedule.query.filter(
-                WFHSchedule.staff_id == staff_id,
-                WFHSchedule.date == current_date,
-                WFHSchedule.status != 'EXPIRED'
-            ).all()
-
-            # Check if any of the existing schedules are 'APPROVED' or 'PENDING'
-            if any(schedule.status in ['APPROVED', 'PENDING'] for schedule in existing_schedules):
-                print(f"Schedule for {current_date} already exists")
-                current_date += timedelta(days=7)  # Move to the next week
-                if end_date is None or current_date > end_date:
-                    break  # If no end_date or we've passed the end_date, stop creating schedule
-                continue
-
-            # Create a new schedule if no 'APPROVED' or 'PENDING' schedules exist
-            new_schedule = WFHSchedule(
-                request_id=request_id,
-                staff_id=staff_id,
-                manager_id=manager_id,
-                date=current_date,
-                duration=duration,
-                dept=dept,
-                position=position
-            )
-            db.session.add(new_schedule)
-            schedules.append(new_schedule)
-            print(f"Schedule for {current_date} created successfully")
-
+            schedule_dates.append(current_date)
             current_date += timedelta(days=7)  # Move to the next week
             if end_date is None or current_date > end_date:
                 break  # If no end_date or we've passed the end_date, stop creating schedule
 
-        if len(schedules) == 0:
-            print("No schedules were created. Removing request from entry")
+        # Fetch every 'APPROVED' or 'PENDING' schedule of the staff in the range with one query
+        taken_dates = {
+            row.date for row in db.session.query(WFHSchedule.date).filter(
+                WFHSchedule.staff_id == staff_id,
+                WFHSchedule.date >= schedule_dates[0],
+                WFHSchedule.date <= schedule_dates[-1],
+                WFHSchedule.status.in_(['APPROVED', 'PENDING'])
+            )
+        }
+
+        new_rows = []
+        for schedule_date in schedule_dates:
+            if schedule_date in taken_dates:
+                logger.debug("Schedule for %s already exists", schedule_date)
+                continue
+            new_rows.append({
+                'request_id': request_id,
+                'staff_id': staff_id,
+                'manager_id': manager_id,
+                'date': schedule_date,
+                'duration': duration,
+                'status': 'PENDING',
+                'dept': dept,
+                'position': position
+            })
+
+        if len(new_rows) == 0:
+            logger.info("No schedules were created. Removing request %s from entry", request_id)
             db.session.delete(WFHRequest.query.get(request_id))
             db.session.commit()
             raise ValueError("No schedules were created")
 
+        # Write all new schedules with a single bulk insert, and announce the request with them
+        db.session.execute(insert(WFHSchedule), new_rows)
+        EventService.request_created(db.session.get(WFHRequest, request_id))
         db.session.commit()
-        return schedules
+        logger.info("%s schedules for request_id %s created successfully", len(new_rows), request_id)
+        # The bulk insert does not hand back rows, so load the persisted schedules with their ids
+        return WFHSchedule.query.filter(
+            WFHSchedule.request_id == request_id,
+            WFHSchedule.date.in_([row['date'] for row in new_rows])
+        ).order_by(WFHSchedule.date).all()
 
     @staticmethod
     def update_schedule(request_id, status):
@@ -62,7 +103,27 @@ class WFHScheduleService:
         if not schedules:
             raise ValueError(f"No schedules found for request_id: {request_id}")
 
+        WFHScheduleService.apply_status(schedules, status)
+
+        # Commit the updated schedules to the database
+        db.session.commit()
+        logger.info("Schedules for request_id %s have been updated to %s", request_id, status)
+
+        return True
+
+    @staticmethod
+    def apply_status(schedules, status, occupancy_changes=None):
+        """
+        Moves each schedule to `status` following the request lifecycle and keeps
+        the team occupancy counters in step, publishing an occupancy event for
+        every team and date they move. Does not commit.
+        `occupancy_changes` is an optional OccupancyChanges that collects the
+        counter changes of several calls, for the caller to write with
+        apply_occupancy; without it they are written straight away.
+        """
+        changes = occupancy_changes if occupancy_changes is not None else OccupancyChanges()
         for schedule in schedules:
+            previous_status = schedule.status
             if schedule.status == "PENDING":
                 if status == "APPROVED":
                     schedule.status = "APPROVED"
@@ -75,134 +136,160 @@ class WFHScheduleService:
             elif status == "WITHDRAWN":
                 schedule.status = "WITHDRAWN"
 
-        # Commit the updated schedules to the database
-        db.session.commit()
-        print(f"Schedules for request_id {request_id} have been updated successfully.")
+            # Keep the team occupancy counters in step with approved state
+            if previous_status != "APPROVED" and schedule.status == "APPROVED":
+                changes.add(schedule, 1)
+            elif previous_status == "APPROVED" and schedule.status != "APPROVED":
+                changes.add(schedule, -1)
 
-        return True
+        if occupancy_changes is None:
+            WFHScheduleService.apply_occupancy(changes)
+
+    @staticmethod
+    def apply_occupancy(changes):
+        # Writes collected occupancy changes and publishes one event per team and date
+        for key, occupancy in TeamOccupancyService.apply_changes(changes).items():
+            EventService.occupancy(changes.schedules[key], occupancy)
 
     @staticmethod
     def get_manager_schedule_summary(manager_id, start_date, end_date):
         try:
-            # Get all subordinates based on manager's role
-            subordinates_info = StaffService.get_all_subordinates(manager_id)
-
-            if subordinates_info['type'] == 'none':
-                return {'dates': []}
-
-            date_list = []
-            current_date = start_date
-            while current_date <= end_date:
-                date_list.append(current_date)
-                current_date += timedelta(days=1)
-
-            dates_data = []
-
-            if subordinates_info['type'] == 'direct':
-                staff_list = subordinates_info['staff']
-                staff_ids = [staff.staff_id for staff in staff_list]
-                total_staff = len(staff_ids)
-
-                for d in date_list:
-                    date_str = d.isoformat()
-
-                    # Initialize counts
-                    wfh_count_am = 0
-                    wfh_count_pm = 0
-
-                    # Get all approved schedules for the date
-                    schedules = WFHSchedule.query.filter(
-                        WFHSchedule.staff_id.in_(staff_ids),
-                        WFHSchedule.date == d,
-                        WFHSchedule.status == 'APPROVED'
-                    ).all()
-
-                    for sched in schedules:
-                        if sched.duration == 'FULL_DAY':
-                            wfh_count_am += 1
-                            wfh_count_pm += 1
-                        elif sched.duration == 'HALF_DAY_AM':
-                            wfh_count_am += 1
-                        elif sched.duration == 'HALF_DAY_PM':
-                            wfh_count_pm += 1
-
-                    office_count_am = total_staff - wfh_count_am
-                    office_count_pm = total_staff - wfh_count_pm
-
-                    dates_data.append({
-                        'date': date_str,
-                        'total_staff': total_staff,
-                        'wfh_count_am': wfh_count_am,
-                        'wfh_count_pm': wfh_count_pm,
-                        'office_count_am': office_count_am,
-                        'office_count_pm': office_count_pm
-                    })
-            elif subordinates_info['type'] == 'manager':
-                # Aggregate counts across all sub-managers, including the managers
-                all_staff_ids = []
-                total_staff = 0
-                for manager, staffs in subordinates_info['managers'].items():
-                    all_staff_ids.append(manager.staff_id)  # Include manager's own ID
-                    total_staff += 1  # Count the manager
-                    all_staff_ids.extend([staff.staff_id for staff in staffs])
-                    total_staff += len(staffs)
-
-                for d in date_list:
-                    date_str = d.isoformat()
-
-                    # Initialize counts
-                    wfh_count_am = 0
-                    wfh_count_pm = 0
-
-                    # Get all approved schedules for the date
-                    schedules = WFHSchedule.query.filter(
-                        WFHSchedule.staff_id.in_(all_staff_ids),
-                        WFHSchedule.date == d,
-                        WFHSchedule.status == 'APPROVED'
-                    ).all()
-
-                    for sched in schedules:
-                        if sched.duration == 'FULL_DAY':
-                            wfh_count_am += 1
-                            wfh_count_pm += 1
-                        elif sched.duration == 'HALF_DAY_AM':
-                            wfh_count_am += 1
-                        elif sched.duration == 'HALF_DAY_PM':
-                            wfh_count_pm += 1
-
-                    office_count_am = total_staff - wfh_count_am
-                    office_count_pm = total_staff - wfh_count_pm
-
-                    dates_data.append({
-                        'date': date_str,
-                        'total_staff': total_staff,
-                        'wfh_count_am': wfh_count_am,
-                        'wfh_count_pm': wfh_count_pm,
-                        'office_count_am': office_count_am,
-                        'office_count_pm': office_count_pm
-                    })
-
-            return {'dates': dates_data}
-
+            return WFHScheduleService._manager_schedule_summary(manager_id, start_date, end_date)
         except Exception as e:
-            print(f"Error in manager_schedule_summary: {str(e)}")
+            logger.warning("Error in manager_schedule_summary: %s", e)
             return {'dates': []}
 
+    @staticmethod
+    @cached('manager_schedule_summary', lambda manager_id, start_date, end_date: _subtree_scope(
+        manager_id, start_date, end_date))
+    def _manager_schedule_summary(manager_id, start_date, end_date):
+        staff_ids = WFHScheduleService._summary_staff_ids(manager_id)
+        if staff_ids is None:
+            return {'dates': []}
+
+        counts = WFHScheduleService._count_wfh_by_date(start_date, end_date, staff_ids=staff_ids)
+        return {'dates': WFHScheduleService._build_summary(start_date, end_date, counts, len(staff_ids))}
+
+    @staticmethod
+    def _summary_staff_ids(manager_id):
+        # Get all subordinates based on manager's role, None when there are none to count
+        subordinates_info = OrgHierarchyService.get_all_subordinates(manager_id)
+
+        if subordinates_info['type'] == 'direct':
+            return [staff.staff_id for staff in subordinates_info['staff']]
+        elif subordinates_info['type'] == 'manager':
+            # Aggregate counts across all sub-managers, including the managers
+            staff_ids = []
+            for manager, staffs in subordinates_info['managers'].items():
+                staff_ids.append(manager.staff_id)  # Include manager's own ID
+                staff_ids.extend([staff.staff_id for staff in staffs])
+            return staff_ids
+        return None
+
+    @staticmethod
+    def manager_summary_stamp(manager_id, start_date, end_date):
+        """
+        Cheap version stamp of get_manager_schedule_summary's result, for ETags:
+        the staff counted plus the change stamp of their schedules in the range.
+        Returns None when there is nothing to stamp.
+        """
+        try:
+            staff_ids = WFHScheduleService._summary_staff_ids(manager_id)
+        except ValueError:
+            return None
+        if staff_ids is None:
+            return None
+        return (tuple(staff_ids), *WFHScheduleService.schedule_stamp(staff_ids, start_date, end_date))
+
+    @staticmethod
+    def schedule_stamp(staff_ids, start_date, end_date):
+        # Changes whenever a schedule of these staff in the range is created or updated
+        return ChangeSequenceService.stamp(
+            WFHSchedule,
+            WFHSchedule.staff_id.in_(staff_ids),
+            WFHSchedule.date >= start_date,
+            WFHSchedule.date <= end_date
+        )
+
     @staticmethod
     def get_manager_schedule_detail(manager_id, date):
         try:
-            # Get all subordinates based on manager's role
-            subordinates_info = StaffService.get_all_subordinates(manager_id)
+            return WFHScheduleService._manager_schedule_detail(manager_id, date)
+        except Exception as e:
+            logger.warning("Error in manager_schedule_detail: %s", e)
+            return {'date': date.isoformat(), 'staff': []}
+
+    @staticmethod
+    @cached('manager_schedule_detail', lambda manager_id, date: _subtree_scope(manager_id, date, date))
+    def _manager_schedule_detail(manager_id, date):
+        # Get all subordinates based on manager's role
+        subordinates_info = OrgHierarchyService.get_all_subordinates(manager_id)
+
+        if subordinates_info['type'] == 'none':
+            return {'date': date.isoformat(), 'staff': []}
+
+        if subordinates_info['type'] == 'direct':
+            staff_list = subordinates_info['staff']
+            staff_ids = [staff.staff_id for staff in staff_list]
+
+            staff_status = {}
+            for staff in staff_list:
+                staff_status[staff.staff_id] = {
+                    'staff_id': staff.staff_id,
+                    'name': f"{staff.staff_fname} {staff.staff_lname}",
+                    'position': staff.position,
+                    'status_am': 'OFFICE',
+                    'status_pm': 'OFFICE'
+                }
+
+            schedules = WFHScheduleService._approved_on(date, staff_ids)
+
+            for sched in schedules:
+                if sched.duration == 'FULL_DAY':
+                    staff_status[sched.staff_id]['status_am'] = 'WFH'
+                    staff_status[sched.staff_id]['status_pm'] = 'WFH'
+                elif sched.duration == 'HALF_DAY_AM':
+                    staff_status[sched.staff_id]['status_am'] = 'WFH'
+                elif sched.duration == 'HALF_DAY_PM':
+                    staff_status[sched.staff_id]['status_pm'] = 'WFH'
+
+            staff_list_status = list(staff_status.values())
+
+            return {
+                'date': date.isoformat(),
+                'staff': staff_list_status
+            }
 
-            if subordinates_info['type'] == 'none':
-                return {'date': date.isoformat(), 'staff': []}
+        elif subordinates_info['type'] == 'manager':
+            managers = subordinates_info['managers']
+            result = {}
 
-            if subordinates_info['type'] == 'direct':
-                staff_list = subordinates_info['staff']
-                staff_ids = [staff.staff_id for staff in staff_list]
+            # Approved schedules for every team on the date, fetched in one query
+            all_staff_ids = set()
+            for manager, staffs in managers.items():
+                all_staff_ids.add(manager.staff_id)
+                all_staff_ids.update(staff.staff_id for staff in staffs)
+            schedules_by_staff = defaultdict(list)
+            for sched in WFHScheduleService._approved_on(date, all_staff_ids):
+                schedules_by_staff[sched.staff_id].append(sched)
+
+            for manager, staffs in managers.items():
+                # Include the manager in the staff list
+                staff_ids = [manager.staff_id] + [staff.staff_id for staff in staffs]
 
                 staff_status = {}
-                for staff in staff_list:
+
+                # For manager
+                staff_status[manager.staff_id] = {
+                    'staff_id': manager.staff_id,
+                    'name': f"{manager.staff_fname} {manager.staff_lname}",
+                    'position': manager.position,
+                    'status_am': 'OFFICE',
+                    'status_pm': 'OFFICE'
+                }
+
+                # For staffs
+                for staff in staffs:
                     staff_status[staff.staff_id] = {
                         'staff_id': staff.staff_id,
                         'name': f"{staff.staff_fname} {staff.staff_lname}",
@@ -211,11 +298,7 @@ class WFHScheduleService:
                         'status_pm': 'OFFICE'
                     }
 
-                schedules = WFHSchedule.query.filter(
-                    WFHSchedule.staff_id.in_(staff_ids),
-                    WFHSchedule.date == date,
-                    WFHSchedule.status == 'APPROVED'
-                ).all()
+                schedules = [sched for s_id in staff_ids for sched in schedules_by_staff[s_id]]
 
                 for sched in schedules:
                     if sched.duration == 'FULL_DAY':
@@ -228,176 +311,87 @@ class WFHScheduleService:
 
                 staff_list_status = list(staff_status.values())
 
-                return {
-                    'date': date.isoformat(),
+                result[manager.staff_fname + ' ' + manager.staff_lname + "'s Team"] = {
+                    'manager_id': manager.staff_id,
+                    'manager_name': f"{manager.staff_fname} {manager.staff_lname}",
+                    'manager_position': manager.position,  # Include manager's position
                     'staff': staff_list_status
                 }
 
-            elif subordinates_info['type'] == 'manager':
-                managers = subordinates_info['managers']
-                result = {}
-
-                for manager, staffs in managers.items():
-                    # Include the manager in the staff list
-                    staff_ids = [manager.staff_id] + [staff.staff_id for staff in staffs]
-
-                    staff_status = {}
-
-                    # For manager
-                    staff_status[manager.staff_id] = {
-                        'staff_id': manager.staff_id,
-                        'name': f"{manager.staff_fname} {manager.staff_lname}",
-                        'position': manager.position,
-                        'status_am': 'OFFICE',
-                        'status_pm': 'OFFICE'
-                    }
-
-                    # For staffs
-                    for staff in staffs:
-                        staff_status[staff.staff_id] = {
-                            'staff_id': staff.staff_id,
-                            'name': f"{staff.staff_fname} {staff.staff_lname}",
-                            'position': staff.position,
-                            'status_am': 'OFFICE',
-                            'status_pm': 'OFFICE'
-                        }
-
-                    schedules = WFHSchedule.query.filter(
-                        WFHSchedule.staff_id.in_(staff_ids),
-                        WFHSchedule.date == date,
-                        WFHSchedule.status == 'APPROVED'
-                    ).all()
-
-                    for sched in schedules:
-                        if sched.duration == 'FULL_DAY':
-                            staff_status[sched.staff_id]['status_am'] = 'WFH'
-                            staff_status[sched.staff_id]['status_pm'] = 'WFH'
-                        elif sched.duration == 'HALF_DAY_AM':
-                            staff_status[sched.staff_id]['status_am'] = 'WFH'
-                        elif sched.duration == 'HALF_DAY_PM':
-                            staff_status[sched.staff_id]['status_pm'] = 'WFH'
-
-                    staff_list_status = list(staff_status.values())
-
-                    result[manager.staff_fname + ' ' + manager.staff_lname + "'s Team"] = {
-                        'manager_id': manager.staff_id,
-                        'manager_name': f"{manager.staff_fname} {manager.staff_lname}",
-                        'manager_position': manager.position,  # Include manager's position
-                        'staff': staff_list_status
-                    }
-
-                return {
-                    'date': date.isoformat(),
-                    'managers': result
-                }
-        except Exception as e:
-            print(f"Error in manager_schedule_detail: {str(e)}")
-            return {'date': date.isoformat(), 'staff': []}
+            return {
+                'date': date.isoformat(),
+                'managers': result
+            }
 
     @staticmethod
     def get_personal_schedule(staff_id, start_date, end_date):
-        date_list = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_list.append(current_date)
-            current_date += timedelta(days=1)
-
-        dates_data = []
-
-        for d in date_list:
-            date_str = d.isoformat()
-            schedule = ''
-
-            # Get all approved and pending schedules for the date
-            schedules = WFHSchedule.query.filter(
+        # Get all approved and pending schedules for the whole range in one query
+        schedules = db.session.execute(
+            select(WFHSchedule.date, WFHSchedule.duration, WFHSchedule.status).where(
                 WFHSchedule.staff_id == staff_id,
-                WFHSchedule.date == d,
-                WFHSchedule.status.in_(['APPROVED', 'PENDING']) 
-            ).all()
+                WFHSchedule.date >= start_date,
+                WFHSchedule.date <= end_date,
+                WFHSchedule.status.in_(['APPROVED', 'PENDING'])
+            ).order_by(WFHSchedule.date, WFHSchedule.schedule_id)
+        ).all()
 
-            for sched in schedules:
-                if sched.duration == 'FULL_DAY' and sched.status == 'APPROVED':
-                    schedule += 'FullDay'
-                elif sched.duration == 'HALF_DAY_AM' and sched.status == 'APPROVED':
-                    schedule += 'AM'
-                elif sched.duration == 'HALF_DAY_PM' and sched.status == 'APPROVED':
-                    schedule += 'PM'
-                elif sched.duration == 'FULL_DAY' and sched.status == 'PENDING':
-                    schedule += 'FullDayPending'
-                elif sched.duration == 'HALF_DAY_AM' and sched.status == 'PENDING':
-                    schedule += 'AMPending'
-                elif sched.duration == 'HALF_DAY_PM' and sched.status == 'PENDING':
-                    schedule += 'PMPending'
+        schedules_by_date = {}
+        for sched in schedules:
+            schedule = schedules_by_date.get(sched.date, '')
+            if sched.duration == 'FULL_DAY' and sched.status == 'APPROVED':
+                schedule += 'FullDay'
+            elif sched.duration == 'HALF_DAY_AM' and sched.status == 'APPROVED':
+                schedule += 'AM'
+            elif sched.duration == 'HALF_DAY_PM' and sched.status == 'APPROVED':
+                schedule += 'PM'
+            elif sched.duration == 'FULL_DAY' and sched.status == 'PENDING':
+                schedule += 'FullDayPending'
+            elif sched.duration == 'HALF_DAY_AM' and sched.status == 'PENDING':
+                schedule += 'AMPending'
+            elif sched.duration == 'HALF_DAY_PM' and sched.status == 'PENDING':
+                schedule += 'PMPending'
+            schedules_by_date[sched.date] = schedule
 
+        dates_data = []
+        current_date = start_date
+        while current_date <= end_date:
             dates_data.append({
-                'date': date_str,
-                'schedule': schedule,
+                'date': current_date.isoformat(),
+                'schedule': schedules_by_date.get(current_date, ''),
             })
+            current_date += timedelta(days=1)
         return {'dates': dates_data}
 
     @staticmethod
+    @cached('staff_schedule_summary', lambda manager_id, start_date, end_date, s_id: CacheScope(
+        frozenset([manager_id]), start_date, end_date))
     def get_staff_schedule_summary(manager_id, start_date, end_date,s_id):
-        staff_list = Staff.query.filter_by(reporting_manager=manager_id).all()
+        staff_list = OrgHierarchyService.get_index().get_children(manager_id)
         staff_ids = [staff.staff_id for staff in staff_list]
         total_staff = len(staff_ids) - 1
         if total_staff <= 0:
             return {'dates': []}
 
-        date_list = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_list.append(current_date)
-            current_date += timedelta(days=1)
-
-        dates_data = []
-        for d in date_list:
-            date_str = d.isoformat()
-
-            # Initialize counts
-            wfh_count_am = 0
-            wfh_count_pm = 0
-
-            # Get all approved schedules for the date
-            schedules = WFHSchedule.query.filter(
-                WFHSchedule.staff_id.in_(staff_ids),
-                WFHSchedule.date == d,
-                WFHSchedule.status == 'APPROVED'
-            ).all()
-
-            for sched in schedules:
-                if sched.staff_id != int(s_id):
-                    if sched.duration == 'FULL_DAY':
-                        wfh_count_am += 1
-                        wfh_count_pm += 1
-                    elif sched.duration == 'HALF_DAY_AM':
-                        wfh_count_am += 1
-                    elif sched.duration == 'HALF_DAY_PM':
-                        wfh_count_pm += 1
-
-            office_count_am = total_staff - wfh_count_am
-            office_count_pm = total_staff - wfh_count_pm
-
-            dates_data.append({
-                'date': date_str,
-                'total_staff': total_staff,
-                'wfh_count_am': wfh_count_am,
-                'wfh_count_pm': wfh_count_pm,
-                'office_count_am': office_count_am,
-                'office_count_pm': office_count_pm
-            })
-        return {'dates': dates_data}
+        # The requesting staff member is not counted against their own team
+        exclude_staff_id = int(s_id) if s_id is not None else None
+        counts = WFHScheduleService._count_wfh_by_date(
+            start_date, end_date, staff_ids=staff_ids, exclude_staff_id=exclude_staff_id)
+        return {'dates': WFHScheduleService._build_summary(start_date, end_date, counts, total_staff)}
 
     @staticmethod
+    @cached('staff_schedule_detail', lambda staff_id, date: _team_scope(staff_id, date))
     def get_staff_schedule_detail(staff_id, date):
-        manager_id = Staff.query.filter_by(staff_id=staff_id).first().reporting_manager
+        org_index = OrgHierarchyService.get_index()
+        staff = org_index.get_staff(staff_id)
+        if staff is None:
+            raise ValueError(f"No staff found with id: {staff_id}")
+        manager_id = staff.reporting_manager
 
-        if manager_id:
-            print(f"The manager in charge has ID: {manager_id}")
-        else:
+        if not manager_id:
             manager_id = staff_id
-            print(f"The manager in charge has ID: {manager_id}")
+        logger.debug("The manager in charge has ID: %s", manager_id)
 
-        staff_list = Staff.query.filter_by(reporting_manager=manager_id).all()
+        staff_list = org_index.get_children(manager_id)
         staff_ids = [staff.staff_id for staff in staff_list]
         if not staff_ids:
             return {'date': date.isoformat(), 'staff': []}
@@ -411,13 +405,9 @@ class WFHScheduleService:
                 'status_am': 'OFFICE',
                 'status_pm': 'OFFICE'
             }
-        print(staff_status)
+        logger.debug("Team status for staff %s on %s: %s", staff_id, date, staff_status)
 
-        schedules = WFHSchedule.query.filter(
-            WFHSchedule.staff_id.in_(staff_ids),
-            WFHSchedule.date == date,
-            WFHSchedule.status == 'APPROVED'
-        ).all()
+        schedules = WFHScheduleService._approved_on(date, staff_ids)
 
         for sched in schedules:
             if sched.duration == 'FULL_DAY':
@@ -438,60 +428,113 @@ class WFHScheduleService:
         }
     
     @staticmethod
+    @cached('hr_schedule_summary', lambda start_date, end_date: CacheScope(None, start_date, end_date))
     def get_hr_schedule_summary(start_date, end_date):
-        staff_list = Staff.query.all()
-        staff_ids = [staff.staff_id for staff in staff_list]
-        total_staff = len(staff_ids)
+        total_staff = len(OrgHierarchyService.get_index().all_staff())
         if total_staff <= 0:
             return {'dates': []}
 
-        date_list = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_list.append(current_date)
-            current_date += timedelta(days=1)
+        counts = WFHScheduleService._count_wfh_by_date(start_date, end_date)
+        return {'dates': WFHScheduleService._build_summary(start_date, end_date, counts, total_staff)}
 
-        dates_data = []
-        
-        for d in date_list:
-            date_str = d.isoformat()
-
-            # Initialize counts
-            wfh_count_am = 0
-            wfh_count_pm = 0
+    @staticmethod
+    def _count_wfh_by_date(start_date, end_date, staff_ids=None, exclude_staff_id=None):
+        """
+        Counts approved WFH schedules per day over [start_date, end_date] with a
+        single GROUP BY query. Returns (wfh_count_am, wfh_count_pm), each indexed
+        by day offset from start_date, as NumPy arrays when NumPy is installed.
+        """
+        num_days = (end_date - start_date).days + 1
+        if num_days <= 0:
+            return [], []
+
+        query = db.session.query(
+            WFHSchedule.date,
+            WFHSchedule.duration,
+            func.count(WFHSchedule.schedule_id)
+        ).filter(
+            WFHSchedule.date >= start_date,
+            WFHSchedule.date <= end_date,
+            WFHSchedule.status == 'APPROVED'
+        )
+        if staff_ids is not None:
+            query = query.filter(WFHSchedule.staff_id.in_(staff_ids))
+        if exclude_staff_id is not None:
+            query = query.filter(WFHSchedule.staff_id != exclude_staff_id)
+        rows = query.group_by(WFHSchedule.date, WFHSchedule.duration).all()
+
+        start_ordinal = start_date.toordinal()
+        if np is not None:
+            offsets = np.fromiter((row[0].toordinal() - start_ordinal for row in rows), dtype=np.int64, count=len(rows))
+            codes = np.fromiter((DURATION_CODES.get(row[1], 0) for row in rows), dtype=np.int64, count=len(rows))
+            counts = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+            wfh_count_am = np.bincount(offsets, weights=counts * ((codes & AM) != 0), minlength=num_days)
+            wfh_count_pm = np.bincount(offsets, weights=counts * ((codes & PM) != 0), minlength=num_days)
+            return wfh_count_am.astype(np.int64), wfh_count_pm.astype(np.int64)
+
+        wfh_count_am = [0] * num_days
+        wfh_count_pm = [0] * num_days
+        for sched_date, duration, count in rows:
+            offset = sched_date.toordinal() - start_ordinal
+            code = DURATION_CODES.get(duration, 0)
+            if code & AM:
+                wfh_count_am[offset] += count
+            if code & PM:
+                wfh_count_pm[offset] += count
+        return wfh_count_am, wfh_count_pm
 
-            # Get all approved schedules for the date
-            schedules = WFHSchedule.query.filter(
-                WFHSchedule.date == d,
+    @staticmethod
+    def _approved_on(date, staff_ids):
+        """
+        Approved (staff_id, duration) rows of the given staff on one date.
+        Read-only views only need these two columns, so they are selected as
+        plain rows instead of WFHSchedule objects in the identity map.
+        """
+        return db.session.execute(
+            select(WFHSchedule.staff_id, WFHSchedule.duration).where(
+                WFHSchedule.staff_id.in_(staff_ids),
+                WFHSchedule.date == date,
                 WFHSchedule.status == 'APPROVED'
-            ).all()
-
-            for sched in schedules:
-                if sched.duration == 'FULL_DAY':
-                    wfh_count_am += 1
-                    wfh_count_pm += 1
-                elif sched.duration == 'HALF_DAY_AM':
-                    wfh_count_am += 1
-                elif sched.duration == 'HALF_DAY_PM':
-                    wfh_count_pm += 1
+            )
+        ).all()
 
-            office_count_am = total_staff - wfh_count_am
-            office_count_pm = total_staff - wfh_count_pm
+    @staticmethod
+    def _build_summary(start_date, end_date, counts, total_staff):
+        """
+        Expands per-day WFH counts into the dense list of daily summaries
+        returned by the summary endpoints.
+        """
+        wfh_count_am, wfh_count_pm = counts
+        if len(wfh_count_am) == 0:
+            return []
+
+        if np is not None:
+            dates = np.arange(start_date, end_date + timedelta(days=1), dtype='datetime64[D]').astype(str).tolist()
+            office_count_am = (total_staff - wfh_count_am).tolist()
+            office_count_pm = (total_staff - wfh_count_pm).tolist()
+            wfh_count_am = wfh_count_am.tolist()
+            wfh_count_pm = wfh_count_pm.tolist()
+        else:
+            dates = [(start_date + timedelta(days=offset)).isoformat() for offset in range(len(wfh_count_am))]
+            office_count_am = [total_staff - count for count in wfh_count_am]
+            office_count_pm = [total_staff - count for count in wfh_count_pm]
 
-            dates_data.append({
-                'date': date_str,
+        return [
+            {
+                'date': dates[offset],
                 'total_staff': total_staff,
-                'wfh_count_am': wfh_count_am,
-                'wfh_count_pm': wfh_count_pm,
-                'office_count_am': office_count_am,
-                'office_count_pm': office_count_pm
-            })
-            
-        return {'dates': dates_data}
-    
+                'wfh_count_am': wfh_count_am[offset],
+                'wfh_count_pm': wfh_count_pm[offset],
+                'office_count_am': office_count_am[offset],
+                'office_count_pm': office_count_pm[offset]
+            }
+            for offset in range(len(dates))
+        ]
+
     @staticmethod
+    @cached('hr_schedule_detail', lambda date: CacheScope(None, date, date))
     def get_hr_schedule_detail(date):
-        staff_list = Staff.query.all()
+        staff_list = OrgHierarchyService.get_index().all_staff()
         staff_ids = [staff.staff_id for staff in staff_list]
         total_staff = len(staff_ids)
         if total_staff <= 0:
@@ -509,13 +552,9 @@ class WFHScheduleService:
                 'status_am': 'OFFICE',
                 'status_pm': 'OFFICE'
             }
-        print(staff_status)
+        logger.debug("Company status on %s: %s", date, staff_status)
 
-        schedules = WFHSchedule.query.filter(
-            WFHSchedule.staff_id.in_(staff_ids),
-            WFHSchedule.date == date,
-            WFHSchedule.status == 'APPROVED'
-        ).all()
+        schedules = WFHScheduleService._approved_on(date, staff_ids)
 
         for sched in schedules:
             if sched.duration == 'FULL_DAY':
@@ -543,11 +582,13 @@ class WFHScheduleService:
                 orginal_request_id = schedule.request_id
                 schedule.reason_for_withdrawing = orginal_request_id
                 schedule.request_id = new_request_id
+                # A withdrawal request is announced once it holds the schedule
+                EventService.request_created(db.session.get(WFHRequest, new_request_id))
                 db.session.commit()
                 return schedule.request_id
             
         except Exception as e:
-            print(f"Error in updating schedule request id")
+            logger.exception("Error in updating schedule request id for schedule %s", schedule_id)
 
     @staticmethod
     def orig_schedule_request_id(schedule_id):
@@ -562,7 +603,7 @@ class WFHScheduleService:
                 return schedule.request_id
             
         except Exception as e:
-            print(f"Error in updating schedule request id")
+            logger.exception("Error in updating schedule request id for schedule %s", schedule_id)
             
             
     @staticmethod
@@ -588,7 +629,7 @@ class WFHScheduleService:
             for schedule in schedules
         ]
 
-        print({'schedules': schedule_list})  # Debug print to confirm data structure
+        logger.debug("Schedules for request_id %s: %s", request_id, schedule_list)
         return {'schedules': schedule_list}
 
     
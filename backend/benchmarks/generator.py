@@ -0,0 +1,131 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import db
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.team_occupancy_service import TeamOccupancyService
+
+DURATIONS = ['FULL_DAY', 'HALF_DAY_AM', 'HALF_DAY_PM']
+STATUS_WEIGHTS = [('APPROVED', 60), ('PENDING', 25), ('REJECTED', 10), ('WITHDRAWN', 5)]
+CHUNK_SIZE = 5000
+
+
+def generate_dataset(directors=2, managers_per_director=5, staff_per_manager=20,
+                     recurring_per_staff=2, adhoc_per_staff=5, seed=0, today=None):
+    """
+    Fills the current database with a synthetic org and its WFH history:
+    one CEO (staff_id 1) over `directors` directors, each with
+    `managers_per_director` managers who each lead `staff_per_manager` staff.
+
+    Every staff member gets `recurring_per_staff` weekly requests of 4-12 weeks
+    and `adhoc_per_staff` single-day requests, spread over weekdays between
+    2 months ago and 3 months from now. No staff member has two schedules on
+    the same date, matching what the request flow allows.
+
+    Returns the number of Staff, WFHRequest and WFHSchedule rows inserted.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.now().date()
+    window_start = today - timedelta(days=60)
+    window_end = today + timedelta(days=90)
+    weekdays = [window_start + timedelta(days=offset) for offset in range((window_end - window_start).days + 1)]
+    weekdays = [d for d in weekdays if d.weekday() < 5]
+
+    staff_rows = _build_staff(directors, managers_per_director, staff_per_manager)
+    request_rows = []
+    schedule_rows = []
+    request_id = 1
+
+    for staff in staff_rows:
+        if staff['role'] != 2:
+            continue
+        taken = set()
+
+        for _ in range(recurring_per_staff):
+            weeks = rng.randint(4, 12)
+            first = rng.choice(weekdays[:max(1, len(weekdays) - 5 * (weeks - 1))])
+            dates = [first + timedelta(weeks=week) for week in range(weeks)]
+            dates = [d for d in dates if d <= window_end and d not in taken]
+            if len(dates) < 2:
+                continue
+            request_id = _add_request(rng, staff, dates, today, request_id, request_rows, schedule_rows)
+            taken.update(dates)
+
+        for _ in range(adhoc_per_staff):
+            day = rng.choice(weekdays)
+            if day in taken:
+                continue
+            request_id = _add_request(rng, staff, [day], today, request_id, request_rows, schedule_rows)
+            taken.add(day)
+
+    for table, rows in ((Staff, staff_rows), (WFHRequest, request_rows), (WFHSchedule, schedule_rows)):
+        for start in range(0, len(rows), CHUNK_SIZE):
+            db.session.execute(insert(table), rows[start:start + CHUNK_SIZE])
+    db.session.commit()
+
+    TeamOccupancyService.rebuild(window_start, window_end)
+
+    return {'staff': len(staff_rows), 'requests': len(request_rows), 'schedules': len(schedule_rows)}
+
+
+def _build_staff(directors, managers_per_director, staff_per_manager):
+    rows = [_staff_row(1, 'CEO', 'CEO', 'MD', role=1, reporting_manager=1)]
+    next_id = 2
+    for d in range(directors):
+        dept = f"Dept{d + 1}"
+        director_id = next_id
+        next_id += 1
+        rows.append(_staff_row(director_id, dept, 'Director', 'Director', role=1, reporting_manager=1))
+        for _ in range(managers_per_director):
+            manager_id = next_id
+            next_id += 1
+            rows.append(_staff_row(manager_id, dept, 'Manager', 'Manager', role=3, reporting_manager=director_id))
+            for _ in range(staff_per_manager):
+                rows.append(_staff_row(next_id, dept, 'Staff', 'Executive', role=2, reporting_manager=manager_id))
+                next_id += 1
+    return rows
+
+
+def _staff_row(staff_id, dept, lname, position, role, reporting_manager):
+    return {
+        'staff_id': staff_id,
+        'staff_fname': f"{lname}{staff_id}",
+        'staff_lname': lname,
+        'dept': dept,
+        'position': position,
+        'country': 'Singapore',
+        'email': f"staff{staff_id}@example.com",
+        'reporting_manager': reporting_manager,
+        'role': role,
+        'password': 'password',
+    }
+
+
+def _add_request(rng, staff, dates, today, request_id, request_rows, schedule_rows):
+    status = rng.choices([s for s, _ in STATUS_WEIGHTS], weights=[w for _, w in STATUS_WEIGHTS])[0]
+    duration = rng.choice(DURATIONS)
+    request_rows.append({
+        'request_id': request_id,
+        'staff_id': staff['staff_id'],
+        'manager_id': staff['reporting_manager'],
+        'request_date': min(today, dates[0]),
+        'start_date': dates[0],
+        'end_date': dates[-1] if len(dates) > 1 else None,
+        'duration': duration,
+        'status': status,
+        'reason_for_applying': 'Synthetic request',
+    })
+    for d in dates:
+        schedule_rows.append({
+            'request_id': request_id,
+            'staff_id': staff['staff_id'],
+            'manager_id': staff['reporting_manager'],
+            'date': d,
+            'duration': duration,
+            'status': status,
+            'dept': staff['dept'],
+            'position': staff['position'],
+        })
+    return request_id + 1
@@ -0,0 +1,239 @@
+"""
+Times the WFH service methods against synthetic orgs of increasing size and
+writes the results as JSON, so runs before and after a change can be diffed.
+
+    cd backend
+    python -m benchmarks.run --scales small medium --output results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.wfh_schedule_service import WFHScheduleService
+from app.services.wfh_request_service import WFHRequestService
+from app.services.wfh_check_service import WFHCheckService
+from benchmarks.generator import generate_dataset
+
+# Keyword arguments for generate_dataset at each named scale
+SCALES = {
+    'tiny': dict(directors=1, managers_per_director=2, staff_per_manager=5, recurring_per_staff=1, adhoc_per_staff=2),
+    'small': dict(directors=2, managers_per_director=5, staff_per_manager=20, recurring_per_staff=2, adhoc_per_staff=5),
+    'medium': dict(directors=4, managers_per_director=10, staff_per_manager=25, recurring_per_staff=4,
+                   adhoc_per_staff=15),
+    'large': dict(directors=5, managers_per_director=20, staff_per_manager=50, recurring_per_staff=14,
+                  adhoc_per_staff=40),
+}
+
+
+class BenchmarkConfig(TestConfig):
+    TESTING = False
+    METRICS_ENABLED = False
+    # Keep per-request log lines out of the timings and the JSON on stdout
+    LOG_LEVEL = 'WARNING'
+    # Time the computations themselves, not cache hits on repeated runs
+    RESPONSE_CACHE_ENABLED = False
+
+
+def run_benchmarks(scales, repeat=5, database_url=None, seed=0):
+    """
+    Builds a fresh database for each scale, fills it with generate_dataset and
+    times every benchmark `repeat` times. Returns a JSON-serialisable dict.
+    """
+    config = BenchmarkConfig
+    if database_url:
+        config = type('BenchmarkConfig', (BenchmarkConfig,), {'SQLALCHEMY_DATABASE_URI': database_url})
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'seed': seed,
+        'scales': [],
+    }
+
+    for scale in scales:
+        app = create_app(config)
+        with app.app_context():
+            report['database'] = db.engine.dialect.name
+            db.drop_all()
+            db.create_all()
+
+            started = time.perf_counter()
+            dataset = generate_dataset(seed=seed, **SCALES[scale])
+            generate_seconds = time.perf_counter() - started
+
+            results = [_time_benchmark(name, call, repeat) for name, call in _benchmarks(repeat)]
+            report['scales'].append({
+                'name': scale,
+                'parameters': SCALES[scale],
+                'dataset': dataset,
+                'generate_seconds': round(generate_seconds, 3),
+                'results': results,
+            })
+
+            db.session.remove()
+            db.drop_all()
+
+    return report
+
+
+def _time_benchmark(name, call, repeat):
+    statement_counts = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statement_counts[-1] += 1
+
+    timings = []
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        for i in range(repeat):
+            statement_counts.append(0)
+            db.session.expire_all()
+            started = time.perf_counter()
+            call(i)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+        db.session.rollback()
+
+    return {
+        'name': name,
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'statements': max(statement_counts),
+    }
+
+
+def _benchmarks(repeat):
+    """
+    Returns (name, call) pairs. Each call takes the repeat index, so methods
+    that change data can act on a different row every time. Read-only methods
+    come first so writes do not skew them.
+    """
+    today = datetime.now().date()
+    start_date = today - timedelta(days=60)
+    end_date = today + timedelta(days=90)
+
+    # Plain ids rather than ORM objects, so expiring the session between runs triggers no reloads
+    director_id = Staff.query.filter(Staff.role == 1, Staff.staff_id != 1).order_by(Staff.staff_id).first().staff_id
+    manager_id = Staff.query.filter_by(role=3).order_by(Staff.staff_id).first().staff_id
+    staff_id = Staff.query.filter_by(role=2, reporting_manager=manager_id).order_by(Staff.staff_id).first().staff_id
+    recurring_id = WFHRequest.query.filter(
+        WFHRequest.end_date.isnot(None)
+    ).order_by(WFHRequest.request_id).first().request_id
+    team_dates = [today + timedelta(weeks=week) for week in range(12)]
+
+    pending = [r.request_id for r in WFHRequest.query.filter(
+        WFHRequest.status == 'PENDING', WFHRequest.start_date > today
+    ).order_by(WFHRequest.request_id).limit(2 * repeat)]
+    schedules = [s.schedule_id for s in WFHSchedule.query.filter_by(
+        status='APPROVED'
+    ).order_by(WFHSchedule.schedule_id).limit(repeat)]
+    # Synthetic schedules are all on weekdays, so a Saturday is always free to request
+    saturday = end_date - timedelta(days=(end_date.weekday() - 5) % 7)
+    requesters = [
+        (s.staff_id, s.reporting_manager, s.dept, s.position)
+        for s in Staff.query.filter_by(role=2).order_by(Staff.staff_id.desc()).limit(repeat)
+    ]
+
+    def create_request(i):
+        requester_id, requester_manager_id, dept, position = requesters[i % len(requesters)]
+        wfh_request = WFHRequestService.create_request(
+            requester_id, requester_manager_id, today, saturday, None, 'Benchmark', 'FULL_DAY')
+        WFHScheduleService.create_schedule(
+            wfh_request.request_id, requester_id, requester_manager_id, saturday, None, 'FULL_DAY', dept, position)
+
+    def approve_request(i):
+        request_id = pending[i % len(pending)]
+        WFHRequestService.update_request(request_id, 'APPROVED', start_date, '')
+        WFHScheduleService.update_schedule(request_id, 'APPROVED')
+
+    def reject_request(i):
+        request_id = pending[(repeat + i) % len(pending)]
+        WFHRequestService.update_request(request_id, 'REJECTED', start_date, 'Benchmark')
+        WFHScheduleService.update_schedule(request_id, 'REJECTED')
+
+    def withdraw_schedule(i):
+        schedule_id = schedules[i % len(schedules)]
+        WFHScheduleService.change_schedule_request_id(schedule_id, recurring_id)
+        WFHScheduleService.orig_schedule_request_id(schedule_id)
+
+    return [
+        ('WFHScheduleService.get_manager_schedule_summary[director]',
+         lambda i: WFHScheduleService.get_manager_schedule_summary(director_id, start_date, end_date)),
+        ('WFHScheduleService.get_manager_schedule_summary[manager]',
+         lambda i: WFHScheduleService.get_manager_schedule_summary(manager_id, start_date, end_date)),
+        ('WFHScheduleService.get_manager_schedule_detail[director]',
+         lambda i: WFHScheduleService.get_manager_schedule_detail(director_id, today)),
+        ('WFHScheduleService.get_manager_schedule_detail[manager]',
+         lambda i: WFHScheduleService.get_manager_schedule_detail(manager_id, today)),
+        ('WFHScheduleService.get_personal_schedule',
+         lambda i: WFHScheduleService.get_personal_schedule(staff_id, start_date, end_date)),
+        ('WFHScheduleService.get_staff_schedule_summary',
+         lambda i: WFHScheduleService.get_staff_schedule_summary(
+             manager_id, start_date, end_date, staff_id)),
+        ('WFHScheduleService.get_staff_schedule_detail',
+         lambda i: WFHScheduleService.get_staff_schedule_detail(staff_id, today)),
+        ('WFHScheduleService.get_hr_schedule_summary',
+         lambda i: WFHScheduleService.get_hr_schedule_summary(start_date, end_date)),
+        ('WFHScheduleService.get_hr_schedule_detail',
+         lambda i: WFHScheduleService.get_hr_schedule_detail(today)),
+        ('WFHScheduleService.get_schedules_by_request_id',
+         lambda i: WFHScheduleService.get_schedules_by_request_id(recurring_id)),
+        ('WFHScheduleService.get_schedules_by_ori_req_id',
+         lambda i: WFHScheduleService.get_schedules_by_ori_req_id(recurring_id)),
+        ('WFHRequestService.get_pending_requests_for_manager',
+         lambda i: WFHRequestService.get_pending_requests_for_manager(manager_id)),
+        ('WFHRequestService.get_staff_requests',
+         lambda i: WFHRequestService.get_staff_requests(staff_id)),
+        ('WFHRequestService.check_withdrawal',
+         lambda i: WFHRequestService.check_withdrawal(staff_id, today)),
+        ('WFHCheckService.team_count',
+         lambda i: WFHCheckService.team_count(manager_id)),
+        ('WFHCheckService.check_team_count',
+         lambda i: WFHCheckService.check_team_count(staff_id, today, 'FULL_DAY')),
+        ('WFHCheckService.check_team_capacity_bulk',
+         lambda i: WFHCheckService.check_team_capacity_bulk(staff_id, team_dates, 'HALF_DAY_AM')),
+        ('WFHRequestService.create_request+WFHScheduleService.create_schedule', create_request),
+        ('WFHRequestService.update_request+WFHScheduleService.update_schedule[approve]', approve_request),
+        ('WFHRequestService.update_request+WFHScheduleService.update_schedule[reject]', reject_request),
+        ('WFHScheduleService.change_schedule_request_id+orig_schedule_request_id', withdraw_schedule),
+        ('WFHRequestService.reject_expired',
+         lambda i: WFHRequestService.reject_expired(start_date)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', nargs='+', choices=SCALES, default=['small', 'medium'],
+                        help='Dataset sizes to benchmark (default: small medium)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (default: 5)')
+    parser.add_argument('--database-url', default=None,
+                        help='SQLAlchemy URL of a scratch database; its tables are dropped. '
+                             'Defaults to in-memory SQLite.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+    parser.add_argument('--output', default=None, help='File to write the JSON report to (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scales, repeat=args.repeat, database_url=args.database_url, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -17,8 +17,55 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Seconds before the cached org hierarchy is rebuilt from the Staff table
+    ORG_HIERARCHY_TTL = int(os.environ.get("ORG_HIERARCHY_TTL", 300))
+
+    # Application log level and whether to emit one JSON object per line
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_JSON = os.environ.get("LOG_JSON", "true").lower() != "false"
+
+    # Serve per-route latency and query-count metrics on /metrics
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+
+    # Cache schedule summary and detail views until an approval touches their team and dates.
+    # Off unless RESPONSE_CACHE_ENABLED=true, since it adds a version lookup to every cached
+    # view and a version write to every commit that changes approved schedules.
+    # 'database' shares invalidations across workers through the CacheVersion table.
+    # 'memory' invalidates only the worker that committed the change, so other workers
+    # serve stale views for up to RESPONSE_CACHE_TTL; use it only with a single process
+    RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "database")
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    # Upper bound on an entry's age, in case an invalidation is missed
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 120))
+    # Seconds a request waits for an identical in-flight computation before computing itself
+    RESPONSE_CACHE_WAIT_TIMEOUT = float(os.environ.get("RESPONSE_CACHE_WAIT_TIMEOUT", 30))
+    # Views that may be served stale while they refresh in the background, as
+    # view -> (max_age, stale_while_revalidate) in seconds. None by default; to let the HR
+    # views lag by up to 5 + 60 seconds, for example, set it in a Config subclass to
+    #   {'hr_schedule_summary': (5, 60), 'hr_schedule_detail': (5, 60)}
+    # View names are the first argument of @cached in wfh_schedule_service.
+    RESPONSE_CACHE_STALE_WHILE_REVALIDATE = {}
+
+    # Server-sent event stream of request and occupancy changes on /api/events.
+    # Each stream holds a connection open, so run gunicorn with threaded or async
+    # workers (e.g. --worker-class gthread --threads 32) when it is enabled
+    EVENT_STREAM_ENABLED = os.environ.get("EVENT_STREAM_ENABLED", "true").lower() != "false"
+    # Seconds between each worker's reads of newly committed events
+    EVENT_STREAM_POLL_INTERVAL = float(os.environ.get("EVENT_STREAM_POLL_INTERVAL", 1))
+    EVENT_STREAM_HEARTBEAT = int(os.environ.get("EVENT_STREAM_HEARTBEAT", 15))
+    # Streams end after this long and the client reconnects from its last event
+    EVENT_STREAM_MAX_SECONDS = int(os.environ.get("EVENT_STREAM_MAX_SECONDS", 300))
+    # Undelivered event batches a stream may hold before it is closed
+    EVENT_STREAM_MAX_QUEUED = int(os.environ.get("EVENT_STREAM_MAX_QUEUED", 100))
+    # Events older than this are deleted and can no longer be replayed
+    EVENT_RETENTION_HOURS = int(os.environ.get("EVENT_RETENTION_HOURS", 24))
+
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Tests run in a single process
+    RESPONSE_CACHE_BACKEND = "memory"
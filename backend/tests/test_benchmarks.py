@@ -0,0 +1,97 @@
+import json
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.models.team_daily_occupancy import TeamDailyOccupancy
+from benchmarks.generator import generate_dataset
+from benchmarks import run
+
+
+class GeneratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_generate_dataset_builds_hierarchy(self):
+        counts = generate_dataset(directors=2, managers_per_director=3, staff_per_manager=4, seed=1)
+
+        # CEO + 2 directors + 6 managers + 24 staff
+        self.assertEqual(counts['staff'], 33)
+        self.assertEqual(Staff.query.count(), 33)
+        self.assertEqual(Counter(role for role, in db.session.query(Staff.role)), {1: 3, 3: 6, 2: 24})
+        for manager in Staff.query.filter_by(role=3):
+            self.assertEqual(Staff.query.get(manager.reporting_manager).role, 1)
+            self.assertEqual(Staff.query.filter_by(reporting_manager=manager.staff_id).count(), 4)
+
+        self.assertEqual(WFHRequest.query.count(), counts['requests'])
+        self.assertEqual(WFHSchedule.query.count(), counts['schedules'])
+
+    def test_generate_dataset_schedules_are_valid(self):
+        today = datetime.now().date()
+        generate_dataset(directors=1, managers_per_director=2, staff_per_manager=5, recurring_per_staff=3,
+                         adhoc_per_staff=10, seed=2, today=today)
+
+        dates_per_staff = Counter((s.staff_id, s.date) for s in WFHSchedule.query)
+        self.assertEqual(max(dates_per_staff.values()), 1)
+
+        for schedule in WFHSchedule.query:
+            self.assertLess(schedule.date.weekday(), 5)
+            self.assertTrue(today - timedelta(days=60) <= schedule.date <= today + timedelta(days=90))
+
+        recurring = WFHRequest.query.filter(WFHRequest.end_date.isnot(None)).all()
+        self.assertTrue(recurring)
+        for wfh_request in recurring:
+            schedules = WFHSchedule.query.filter_by(request_id=wfh_request.request_id).all()
+            self.assertTrue(all(s.date.weekday() == wfh_request.start_date.weekday() for s in schedules))
+            self.assertTrue(all(s.status == wfh_request.status for s in schedules))
+
+        self.assertGreater(TeamDailyOccupancy.query.count(), 0)
+
+    def test_generate_dataset_is_deterministic(self):
+        first = generate_dataset(directors=1, managers_per_director=2, staff_per_manager=3, seed=5)
+        rows = [(s.staff_id, s.date, s.duration, s.status) for s in WFHSchedule.query.order_by(WFHSchedule.schedule_id)]
+
+        db.drop_all()
+        db.create_all()
+        self.assertEqual(generate_dataset(directors=1, managers_per_director=2, staff_per_manager=3, seed=5), first)
+        self.assertEqual(
+            [(s.staff_id, s.date, s.duration, s.status) for s in WFHSchedule.query.order_by(WFHSchedule.schedule_id)],
+            rows,
+        )
+
+
+class BenchmarkRunnerTestCase(unittest.TestCase):
+    def test_run_benchmarks_reports_every_service(self):
+        report = run.run_benchmarks(['tiny'], repeat=2)
+
+        # Everything in the report must survive a JSON round trip
+        report = json.loads(json.dumps(report))
+        self.assertEqual(report['database'], 'sqlite')
+        (scale,) = report['scales']
+        self.assertEqual(scale['name'], 'tiny')
+        self.assertEqual(scale['dataset']['staff'], 14)
+
+        names = [result['name'] for result in scale['results']]
+        for service in ('WFHScheduleService', 'WFHRequestService', 'WFHCheckService'):
+            self.assertTrue(any(name.startswith(service) for name in names))
+        for result in scale['results']:
+            self.assertEqual(result['runs'], 2)
+            self.assertLessEqual(result['min_ms'], result['max_ms'])
+            self.assertGreaterEqual(result['statements'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
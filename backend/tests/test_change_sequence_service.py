@@ -0,0 +1,128 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.change_sequence_service import ChangeSequenceService
+
+
+class ChangeSequenceServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        db.session.add(Staff(staff_id=1, staff_fname="Test", staff_lname="Staff", dept="Sales", position="Staff",
+                             country="CountryA", email="staff@test.com", reporting_manager=1, role=2,
+                             password="pw"))
+        db.session.commit()
+        self.today = datetime.now().date()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _request(self):
+        return WFHRequest(staff_id=1, manager_id=1, request_date=self.today, start_date=self.today,
+                          reason_for_applying="Seq", duration="FULL_DAY")
+
+    def test_rows_changed_in_one_commit_share_the_next_number(self):
+        self.assertEqual(ChangeSequenceService.current(), 0)
+
+        first, second = self._request(), self._request()
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        self.assertEqual((first.change_seq, second.change_seq), (1, 1))
+        self.assertEqual(ChangeSequenceService.current(), 1)
+
+        first.status = "APPROVED"
+        db.session.commit()
+        self.assertEqual((first.change_seq, second.change_seq), (2, 1))
+
+    def test_commits_without_tracked_changes_do_not_advance(self):
+        db.session.add(self._request())
+        db.session.commit()
+        db.session.add(Staff(staff_id=2, staff_fname="Other", staff_lname="Staff", dept="Sales", position="Staff",
+                             country="CountryA", email="other@test.com", reporting_manager=1, role=2,
+                             password="pw"))
+        db.session.commit()
+
+        self.assertEqual(ChangeSequenceService.current(), 1)
+
+    def test_bulk_inserted_schedules_are_stamped(self):
+        wfh_request = self._request()
+        db.session.add(wfh_request)
+        db.session.commit()
+
+        db.session.execute(insert(WFHSchedule), [
+            {'request_id': wfh_request.request_id, 'staff_id': 1, 'manager_id': 1,
+             'date': self.today + timedelta(weeks=week), 'duration': 'FULL_DAY', 'status': 'PENDING',
+             'dept': 'Sales', 'position': 'Staff'}
+            for week in range(3)
+        ])
+        db.session.commit()
+
+        self.assertEqual({s.change_seq for s in WFHSchedule.query}, {2})
+
+    def test_rollback_assigns_nothing(self):
+        db.session.add(self._request())
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        self.assertEqual(ChangeSequenceService.current(), 0)
+
+    def test_stamp_changes_with_matching_rows(self):
+        wfh_request = self._request()
+        db.session.add(wfh_request)
+        db.session.commit()
+        stamp = ChangeSequenceService.stamp(WFHRequest, WFHRequest.staff_id == 1)
+
+        wfh_request.reason_for_rejection = "Changed"
+        db.session.commit()
+        self.assertNotEqual(ChangeSequenceService.stamp(WFHRequest, WFHRequest.staff_id == 1), stamp)
+        self.assertEqual(ChangeSequenceService.stamp(WFHRequest, WFHRequest.staff_id == 2), (None, 0))
+
+    def test_get_changes_returns_rows_after_the_cursor(self):
+        first, second = self._request(), self._request()
+        db.session.add(first)
+        db.session.commit()
+        db.session.add(second)
+        db.session.commit()
+
+        changes = ChangeSequenceService.get_changes(1)
+        self.assertEqual([r.request_id for r in changes['requests']], [second.request_id])
+        self.assertEqual((changes['next_since'], changes['has_more']), (2, False))
+        self.assertEqual(ChangeSequenceService.get_changes(0, staff_ids=[2])['requests'], [])
+
+    def test_get_changes_pages_end_on_whole_commits(self):
+        db.session.add_all([self._request(), self._request()])
+        db.session.commit()
+        db.session.add(self._request())
+        db.session.commit()
+        db.session.add(self._request())
+        db.session.commit()
+
+        # A commit larger than the limit comes back whole
+        page = ChangeSequenceService.get_changes(0, limit=1)
+        self.assertEqual(([r.change_seq for r in page['requests']], page['next_since'], page['has_more']),
+                         ([1, 1], 1, True))
+
+        page = ChangeSequenceService.get_changes(1, limit=1)
+        self.assertEqual(([r.change_seq for r in page['requests']], page['next_since'], page['has_more']),
+                         ([2], 2, True))
+
+        page = ChangeSequenceService.get_changes(2, limit=1)
+        self.assertEqual(([r.change_seq for r in page['requests']], page['next_since'], page['has_more']),
+                         ([3], 3, False))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
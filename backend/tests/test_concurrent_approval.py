@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.models.team_daily_occupancy import TeamDailyOccupancy
+from app.services.wfh_approval_service import WFHApprovalService
+
+TEAM_SIZE = 6
+TEAMS = (1, 10)
+
+
+class ConcurrentApprovalTestCase(unittest.TestCase):
+    """
+    Approves every pending request of two teams from many threads at once,
+    against a file-backed database so each thread has its own connection,
+    and checks that no team ends up over the 50% WFH limit.
+    """
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_path}"
+            SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30, "check_same_thread": False}}
+            LOG_LEVEL = "WARNING"
+
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        # Two teams of six staff each, so at most three per team may WFH on a date
+        self.today = datetime.now().date()
+        self.date = self.today + timedelta(days=7)
+        self.request_ids = {}
+        for manager_id in TEAMS:
+            db.session.add(Staff(staff_id=manager_id, staff_fname="Team", staff_lname=f"Manager{manager_id}",
+                                 dept="Sales", position="Manager", country="CountryA",
+                                 email=f"manager{manager_id}@test.com", reporting_manager=None, role=3,
+                                 password="pw"))
+            for offset in range(1, TEAM_SIZE + 1):
+                db.session.add(Staff(staff_id=manager_id + offset, staff_fname="Team", staff_lname="Staff",
+                                     dept="Sales", position="Staff", country="CountryA",
+                                     email=f"staff{manager_id + offset}@test.com", reporting_manager=manager_id,
+                                     role=2, password="pw"))
+        db.session.commit()
+
+        for manager_id in TEAMS:
+            self.request_ids[manager_id] = []
+            for offset in range(1, TEAM_SIZE + 1):
+                wfh_request = WFHRequest(staff_id=manager_id + offset, manager_id=manager_id,
+                                         request_date=self.today, start_date=self.date,
+                                         reason_for_applying="Stress", duration="FULL_DAY")
+                db.session.add(wfh_request)
+                db.session.flush()
+                db.session.add(WFHSchedule(request_id=wfh_request.request_id, staff_id=manager_id + offset,
+                                           manager_id=manager_id, date=self.date, duration="FULL_DAY",
+                                           status="PENDING", dept="Sales", position="Staff"))
+                self.request_ids[manager_id].append(wfh_request.request_id)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def _run_concurrently(self, calls):
+        barrier = threading.Barrier(len(calls))
+        errors = []
+
+        def worker(call):
+            with self.app.app_context():
+                barrier.wait()
+                try:
+                    call()
+                except Exception as e:  # pragma: no cover - reported below
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(call,)) for call in calls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        self.assertEqual(errors, [])
+
+    def assertTeamsWithinLimit(self):
+        db.session.expire_all()
+        for manager_id in TEAMS:
+            approved = WFHSchedule.query.filter_by(manager_id=manager_id, date=self.date, status="APPROVED").count()
+            self.assertEqual(approved, TEAM_SIZE // 2, f"team {manager_id}")
+
+            approved_requests = WFHRequest.query.filter_by(manager_id=manager_id, status="APPROVED").count()
+            self.assertEqual(approved_requests, TEAM_SIZE // 2, f"team {manager_id}")
+
+            occupancy = db.session.get(TeamDailyOccupancy, (manager_id, self.date))
+            self.assertEqual((occupancy.wfh_count_am, occupancy.wfh_count_pm), (TEAM_SIZE // 2, TEAM_SIZE // 2))
+
+    def test_concurrent_single_approvals_respect_team_limit(self):
+        two_months_ago = self.today - timedelta(days=60)
+        calls = [
+            (lambda request_id=request_id: WFHApprovalService.approve_request(request_id, [self.date], two_months_ago))
+            for manager_id in TEAMS for request_id in self.request_ids[manager_id]
+        ]
+        self._run_concurrently(calls)
+        self.assertTeamsWithinLimit()
+
+    def test_concurrent_bulk_approvals_respect_team_limit(self):
+        two_months_ago = self.today - timedelta(days=60)
+        # Pairs of requests, each pair approved in its own batch
+        batches = [
+            [{'request_id': request_id, 'request_status': 'APPROVED'} for request_id in ids[i:i + 2]]
+            for ids in self.request_ids.values() for i in range(0, TEAM_SIZE, 2)
+        ]
+        calls = [
+            (lambda batch=batch: WFHApprovalService.bulk_update_requests(batch, two_months_ago))
+            for batch in batches
+        ]
+        self._run_concurrently(calls)
+        self.assertTeamsWithinLimit()
+
+    def test_lock_rows_only_locks_given_team(self):
+        from app.services.team_occupancy_service import TeamOccupancyService
+
+        rows = TeamOccupancyService.lock_rows([(TEAMS[0], self.date), (TEAMS[0], self.date)])
+        db.session.commit()
+
+        self.assertEqual(list(rows), [(TEAMS[0], self.date)])
+        self.assertIsNone(db.session.get(TeamDailyOccupancy, (TEAMS[1], self.date)))
+
+    def test_lock_rows_never_commits_staged_changes(self):
+        from app.services.team_occupancy_service import TeamOccupancyService
+
+        db.session.get(Staff, TEAMS[0]).staff_fname = "Staged"
+        with self.assertRaises(RuntimeError):
+            TeamOccupancyService.lock_rows([(TEAMS[0], self.date)])
+        db.session.rollback()
+
+        self.assertEqual(db.session.get(Staff, TEAMS[0]).staff_fname, "Team")
+        self.assertIsNone(db.session.get(TeamDailyOccupancy, (TEAMS[0], self.date)))
+
+    def test_rejected_approval_leaves_no_occupancy_rows(self):
+        # Requests starting before the cut-off are refused after the rows were locked
+        cut_off = self.date + timedelta(days=1)
+        outcome = WFHApprovalService.approve_request(self.request_ids[TEAMS[0]][0], [self.date], cut_off)
+
+        self.assertFalse(outcome['success'])
+        self.assertEqual(TeamDailyOccupancy.query.count(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
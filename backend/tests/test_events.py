@@ -0,0 +1,205 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from config import TestConfig
+from app.events import get_broker
+from app.models.staff import Staff
+from app.models.wfh_schedule import WFHSchedule
+from app.services.event_service import EventService
+from app.services.wfh_approval_service import WFHApprovalService
+from app.services.wfh_request_service import WFHRequestService
+from app.services.wfh_schedule_service import WFHScheduleService
+
+
+class EventConfig(TestConfig):
+    # The tests poll the broker themselves
+    EVENT_STREAM_POLL_INTERVAL = 60
+    EVENT_STREAM_HEARTBEAT = 1
+
+
+def read_events(chunks, count):
+    # Parses the next `count` events of a stream, skipping comments and the retry hint
+    events = []
+    while len(events) < count:
+        chunk = next(chunks)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith((':', 'retry:')):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        events.append({'event': fields['event'], 'id': fields.get('id'), 'data': json.loads(fields['data'])})
+    return events
+
+
+class EventTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(EventConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        # Manager 2 with staff 1, 3, 6 and 7, and staff 4 in another team under manager 5
+        staff = ((2, 2, 3), (1, 2, 2), (3, 2, 2), (6, 2, 2), (7, 2, 2), (5, 5, 3), (4, 5, 2))
+        for staff_id, manager_id, role in staff:
+            db.session.add(Staff(staff_id=staff_id, staff_fname="Event", staff_lname=f"Staff{staff_id}",
+                                 dept="Sales", position="Staff", country="CountryA",
+                                 email=f"staff{staff_id}@test.com", reporting_manager=manager_id, role=role,
+                                 password="pw"))
+        db.session.commit()
+
+        self.today = datetime.now().date()
+        self.date = self.today + timedelta(days=7)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_request(self, staff_id, manager_id=2):
+        wfh_request = WFHRequestService.create_request(
+            staff_id=staff_id, manager_id=manager_id, request_date=self.today, start_date=self.date,
+            end_date=None, reason_for_applying="Events", duration="FULL_DAY")
+        WFHScheduleService.create_schedule(wfh_request.request_id, staff_id, manager_id, self.date, None,
+                                           "FULL_DAY", "Sales", "Staff")
+        return wfh_request
+
+    def created_seq(self, wfh_request):
+        # The request is announced by the commit that inserted its schedules
+        return WFHSchedule.query.filter_by(request_id=wfh_request.request_id).first().change_seq
+
+    def test_events_are_written_by_the_commit(self):
+        wfh_request = self.add_request(1)
+
+        events, upper = EventService.get_events(0)
+        self.assertEqual([(e['kind'], e['seq'], e['data']['request_id']) for e in events],
+                         [('request_created', self.created_seq(wfh_request), wfh_request.request_id)])
+        self.assertEqual(upper, self.created_seq(wfh_request))
+
+        EventService.request_status(wfh_request)
+        db.session.rollback()
+        self.assertEqual(len(EventService.get_events(0)[0]), 1)
+
+    def test_requests_without_schedules_are_not_announced(self):
+        first = self.add_request(1)
+        # Staff 1 already works from home on the only date of this recurring request, so it is removed again
+        end_date = self.date + timedelta(days=1)
+        second = WFHRequestService.create_request(
+            staff_id=1, manager_id=2, request_date=self.today, start_date=self.date, end_date=end_date,
+            reason_for_applying="Events", duration="FULL_DAY")
+        with self.assertRaises(ValueError):
+            WFHScheduleService.create_schedule(second.request_id, 1, 2, self.date, end_date, "FULL_DAY", "Sales",
+                                               "Staff")
+
+        self.assertEqual([e['data']['request_id'] for e in EventService.get_events(0)[0]], [first.request_id])
+
+    def test_withdrawal_requests_are_announced_with_their_schedule(self):
+        original = self.add_request(1)
+        _, since = EventService.get_events(0)
+        withdrawal = WFHRequestService.create_request(
+            staff_id=1, manager_id=2, request_date=self.today, start_date=self.date, end_date=None,
+            reason_for_applying="Events", duration="WITHDRAWAL REQUEST")
+        self.assertEqual(EventService.get_events(since)[0], [])
+
+        schedule = WFHSchedule.query.filter_by(request_id=original.request_id).one()
+        WFHScheduleService.change_schedule_request_id(schedule.schedule_id, withdrawal.request_id)
+
+        self.assertEqual([(e['kind'], e['data']['request_id']) for e in EventService.get_events(since)[0]],
+                         [('request_created', withdrawal.request_id)])
+
+    def test_occupancy_events_collapse_per_team_and_date(self):
+        first, second = self.add_request(1), self.add_request(3)
+        _, since = EventService.get_events(0)
+
+        results = WFHApprovalService.bulk_update_requests([
+            {'request_id': first.request_id, 'request_status': 'APPROVED'},
+            {'request_id': second.request_id, 'request_status': 'APPROVED'},
+        ], self.today - timedelta(days=60))
+        self.assertTrue(all(result['success'] for result in results))
+
+        events, _ = EventService.get_events(since)
+        self.assertEqual(sorted(e['kind'] for e in events), ['occupancy', 'request_status', 'request_status'])
+        occupancy = next(e['data'] for e in events if e['kind'] == 'occupancy')
+        self.assertEqual((occupancy['manager_id'], occupancy['wfh_count_am'], occupancy['wfh_count_pm']), (2, 2, 2))
+        self.assertEqual(len({e['seq'] for e in events}), 1)
+
+    def test_expired_requests_publish_status_events(self):
+        wfh_request = self.add_request(1)
+        wfh_request.start_date = self.today - timedelta(days=61)
+        db.session.commit()
+        _, since = EventService.get_events(0)
+
+        self.assertEqual(WFHRequestService.reject_expired(self.today - timedelta(days=60))['requests'], 1)
+
+        events, _ = EventService.get_events(since, [2])
+        self.assertEqual([(e['kind'], e['data']) for e in events],
+                         [('request_status', {'request_id': wfh_request.request_id, 'status': 'EXPIRED'})])
+
+    def test_events_reach_the_staff_member_and_their_manager(self):
+        self.add_request(1)
+        self.add_request(4, manager_id=5)
+
+        self.assertEqual([e['staff_id'] for e in EventService.get_events(0, [1])[0]], [1])
+        self.assertEqual([e['staff_id'] for e in EventService.get_events(0, [2])[0]], [1])
+        self.assertEqual(EventService.get_events(0, [3])[0], [])
+
+    def test_broker_delivers_matching_events_once(self):
+        broker = get_broker()
+        company, _ = broker.subscribe(None)
+        other_team, _ = broker.subscribe([5, 4])
+        try:
+            self.add_request(1)
+            self.assertEqual(broker.poll(), 1)
+            self.assertEqual(broker.poll(), 0)
+
+            self.assertEqual([e['kind'] for e in company.batches.get_nowait()], ['request_created'])
+            self.assertTrue(company.batches.empty())
+            self.assertTrue(other_team.batches.empty())
+        finally:
+            broker.unsubscribe(company)
+            broker.unsubscribe(other_team)
+
+    def test_stream_replays_then_follows_live_events(self):
+        first = self.add_request(1)
+
+        response = self.client.get('/api/events?scope=team:2&since=0', buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+        try:
+            ready, replayed = read_events(chunks, 2)
+            self.assertEqual(ready['event'], 'ready')
+            self.assertEqual((replayed['event'], replayed['data']['data']['request_id']),
+                             ('request_created', first.request_id))
+            self.assertEqual(replayed['id'], str(self.created_seq(first)))
+
+            second = self.add_request(3)
+            get_broker().poll()
+            live, = read_events(chunks, 1)
+            self.assertEqual((live['event'], live['data']['data']['request_id']),
+                             ('request_created', second.request_id))
+        finally:
+            response.close()
+        self.assertEqual(get_broker()._subscribers, set())
+
+    def test_stream_resumes_from_last_event_id(self):
+        first = self.add_request(1)
+        self.add_request(3)
+
+        response = self.client.get('/api/events?scope=company', headers={'Last-Event-ID': str(self.created_seq(first))},
+                                   buffered=False)
+        chunks = iter(response.response)
+        try:
+            _, replayed = read_events(chunks, 2)
+            self.assertEqual(replayed['data']['staff_id'], 3)
+        finally:
+            response.close()
+
+    def test_stream_invalid_args(self):
+        self.assertEqual(self.client.get('/api/events?scope=everyone').status_code, 400)
+        self.assertEqual(self.client.get('/api/events?scope=company&since=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/events?scope=staff:999').status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import json
+import logging
+import logging.handlers
+import unittest
+from app import create_app, log
+from config import TestConfig
+from app.log import JsonFormatter
+
+
+class LogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.makeLogRecord({
+            'name': 'app.services.test', 'levelno': logging.INFO, 'levelname': 'INFO',
+            'msg': 'Created %s schedules', 'args': (3,), 'request_id': 42,
+        })
+        payload = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(payload['level'], 'INFO')
+        self.assertEqual(payload['logger'], 'app.services.test')
+        self.assertEqual(payload['message'], 'Created 3 schedules')
+        self.assertEqual(payload['request_id'], 42)
+        self.assertIn('timestamp', payload)
+
+    def test_app_logger_uses_queue_handler(self):
+        logger = logging.getLogger('app')
+        self.assertFalse(logger.propagate)
+        # Test runners may attach capture handlers of their own; only one queue handler is ours
+        queue_handlers = [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]
+        self.assertEqual(len(queue_handlers), 1)
+
+    def written(self, emit):
+        # Logs through the queue and returns what the listener wrote
+        stream = io.StringIO()
+        previous = log._stream_handler.setStream(stream)
+        try:
+            emit(logging.getLogger('app.services.test'))
+            log._listener.stop()
+            log._listener.start()
+        finally:
+            log._stream_handler.setStream(previous)
+        return stream.getvalue()
+
+    def test_exceptions_keep_their_own_field(self):
+        def emit(logger):
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("Failed %s", 5)
+
+        payload = json.loads(self.written(emit))
+
+        self.assertEqual(payload['message'], 'Failed 5')
+        self.assertIn('ValueError: boom', payload['exception'])
+
+    def test_later_apps_reconfigure_the_listener(self):
+        class TextConfig(TestConfig):
+            LOG_JSON = False
+            LOG_LEVEL = 'WARNING'
+
+        create_app(TextConfig)
+        try:
+            output = self.written(lambda logger: (logger.info("Hidden"), logger.warning("Shown")))
+            self.assertNotIn("Hidden", output)
+            self.assertIn("WARNING app.services.test: Shown", output)
+        finally:
+            create_app(TestConfig)
+
+    def test_debug_output_gated_by_level(self):
+        self.assertEqual(self.app.config['LOG_LEVEL'], 'INFO')
+        self.assertFalse(logging.getLogger('app.services.wfh_schedule_service').isEnabledFor(logging.DEBUG))
+
+
+if __name__ == "__main__":
+    unittest.main()
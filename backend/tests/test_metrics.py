@@ -0,0 +1,74 @@
+import re
+import unittest
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.metrics import Histogram
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+        db.create_all()
+
+        staff = Staff(staff_id=1, staff_fname="John", staff_lname="Doe", dept="Engineering", position="Engineer",
+                      country="CountryA", email="john.doe@example.com", reporting_manager=1, role=2,
+                      password="password123")
+        db.session.add(staff)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _sample(self, body, name, **labels):
+        label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$', body, re.MULTILINE)
+        self.assertIsNotNone(match, f"{name}{{{label_text}}} missing from:\n{body}")
+        return float(match.group(1))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 3, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.samples()), [('1.0', 1), ('5.0', 3), ('+Inf', 4)])
+        self.assertEqual(histogram.sum, 16.5)
+        self.assertEqual(histogram.count, 4)
+
+    def test_metrics_records_route_latency_and_queries(self):
+        self.client.get('/api/staff/1')
+        self.client.get('/api/staff/1')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+
+        labels = {'endpoint': 'staff.get_staff_by_id', 'method': 'GET'}
+        self.assertEqual(self._sample(body, 'http_requests_total', **labels, status='200'), 2)
+        self.assertEqual(self._sample(body, 'http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(self._sample(body, 'http_request_duration_seconds_bucket', **labels, le='+Inf'), 2)
+        self.assertEqual(self._sample(body, 'db_statements_per_request_sum', **labels), 2)
+        self.assertEqual(self._sample(body, 'db_rows_hydrated_total', **labels), 2)
+
+    def test_metrics_endpoint_not_recorded(self):
+        self.client.get('/metrics')
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertNotIn('endpoint="metrics"', body)
+
+    def test_metrics_can_be_disabled(self):
+        class NoMetricsConfig(TestConfig):
+            METRICS_ENABLED = False
+
+        app = create_app(NoMetricsConfig)
+        self.assertEqual(app.test_client().get('/metrics').status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
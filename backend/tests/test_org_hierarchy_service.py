@@ -0,0 +1,132 @@
+import unittest
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.services.org_hierarchy_service import OrgHierarchyService
+
+
+class OrgHierarchyServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        staff1 = Staff(staff_id=1, staff_fname="Test", staff_lname="Director", dept="Sales", position="Director",
+                       country="CountryA", email="director@test.com", reporting_manager=None, role=1,
+                       password="pw1")
+        staff2 = Staff(staff_id=2, staff_fname="Test", staff_lname="Manager", dept="Sales", position="Manager",
+                       country="CountryA", email="manager@test.com", reporting_manager=1, role=3, password="pw2")
+        staff3 = Staff(staff_id=3, staff_fname="Test", staff_lname="Staff", dept="Sales", position="Staff",
+                       country="CountryA", email="staff@test.com", reporting_manager=2, role=2, password="pw3")
+        db.session.add_all([staff1, staff2, staff3])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_index_is_cached(self):
+        index = OrgHierarchyService.get_index()
+        self.assertIs(OrgHierarchyService.get_index(), index)
+        self.assertEqual([node.staff_id for node in index.get_children(1, role=3)], [2])
+        self.assertEqual([node.staff_id for node in index.get_team(3)], [3])
+
+    def test_index_expires_after_ttl(self):
+        index = OrgHierarchyService.get_index()
+        self.app.config['ORG_HIERARCHY_TTL'] = 0
+        self.assertIsNot(OrgHierarchyService.get_index(), index)
+
+    def test_index_invalidated_on_staff_insert(self):
+        OrgHierarchyService.get_index()
+        db.session.add(Staff(staff_id=4, staff_fname="New", staff_lname="Staff", dept="Sales", position="Staff",
+                             country="CountryA", email="new@test.com", reporting_manager=2, role=2,
+                             password="pw4"))
+        db.session.commit()
+
+        index = OrgHierarchyService.get_index()
+        self.assertEqual([node.staff_id for node in index.get_children(2, role=2)], [3, 4])
+
+    def test_index_invalidated_on_bulk_delete(self):
+        OrgHierarchyService.get_index()
+        Staff.query.filter_by(staff_id=3).delete()
+        db.session.commit()
+
+        index = OrgHierarchyService.get_index()
+        self.assertIsNone(index.get_staff(3))
+        self.assertEqual(index.get_children(2), [])
+
+    def test_get_all_subordinates_director_with_managers(self):
+        result = OrgHierarchyService.get_all_subordinates(1)
+        self.assertEqual(result['type'], 'manager')
+        (manager, staffs), = result['managers'].items()
+        self.assertEqual(manager.staff_id, 2)
+        self.assertEqual([staff.staff_id for staff in staffs], [3])
+
+    def test_get_subtree_follows_deep_chains(self):
+        # Director 1 -> manager 2 -> manager 4 -> staff 5
+        db.session.add_all([
+            Staff(staff_id=4, staff_fname="Sub", staff_lname="Manager", dept="Sales", position="Manager",
+                  country="CountryA", email="submanager@test.com", reporting_manager=2, role=3, password="pw4"),
+            Staff(staff_id=5, staff_fname="Deep", staff_lname="Staff", dept="Sales", position="Staff",
+                  country="CountryA", email="deep@test.com", reporting_manager=4, role=2, password="pw5"),
+        ])
+        db.session.commit()
+
+        subtree = OrgHierarchyService.get_subtree(1)
+        self.assertEqual(subtree.root.staff_id, 1)
+        self.assertEqual([node.staff_id for node in subtree.get_children(2)], [3, 4])
+        self.assertEqual([node.staff_id for node in subtree.get_descendants(1)], [2, 3, 4, 5])
+        self.assertIsNone(OrgHierarchyService.get_subtree(99))
+
+        result = OrgHierarchyService.get_all_subordinates(2)
+        self.assertEqual(result['type'], 'direct')
+        self.assertEqual([staff.staff_id for staff in result['staff']], [3, 4, 5])
+
+        result = OrgHierarchyService.get_all_subordinates(1)
+        (manager, staffs), = result['managers'].items()
+        self.assertEqual(manager.staff_id, 2)
+        self.assertEqual([staff.staff_id for staff in staffs], [3, 4, 5])
+
+    def test_manager_team_includes_every_role_and_level_below(self):
+        # Manager 2 -> staff 3, sub-manager 4 -> staff 5; HR 6 reports to staff 3
+        db.session.add_all([
+            Staff(staff_id=4, staff_fname="Sub", staff_lname="Manager", dept="Sales", position="Manager",
+                  country="CountryA", email="submanager@test.com", reporting_manager=2, role=3, password="pw4"),
+            Staff(staff_id=5, staff_fname="Deep", staff_lname="Staff", dept="Sales", position="Staff",
+                  country="CountryA", email="deep@test.com", reporting_manager=4, role=2, password="pw5"),
+            Staff(staff_id=6, staff_fname="Hr", staff_lname="Staff", dept="HR", position="HR",
+                  country="CountryA", email="hr@test.com", reporting_manager=3, role=1, password="pw6"),
+        ])
+        db.session.commit()
+
+        # Unlike the baseline role 2 filter on direct reports, the sub-manager
+        # and everyone reporting through staff 3 are part of the team
+        result = OrgHierarchyService.get_all_subordinates(2)
+        self.assertEqual(result['type'], 'direct')
+        self.assertEqual([(staff.staff_id, staff.role) for staff in result['staff']],
+                         [(3, 2), (4, 3), (5, 2), (6, 1)])
+
+        result = OrgHierarchyService.get_all_subordinates(4)
+        self.assertEqual([staff.staff_id for staff in result['staff']], [5])
+
+    def test_get_subtree_ignores_self_reporting_root(self):
+        db.session.add(Staff(staff_id=6, staff_fname="Top", staff_lname="Boss", dept="CEO", position="MD",
+                             country="CountryA", email="ceo@test.com", reporting_manager=6, role=1,
+                             password="pw6"))
+        Staff.query.filter_by(staff_id=1).update({'reporting_manager': 6})
+        db.session.commit()
+
+        subtree = OrgHierarchyService.get_subtree(6)
+        self.assertEqual([node.staff_id for node in subtree.get_descendants(6)], [1, 2, 3])
+
+    def test_get_all_subordinates_invalid_staff_id(self):
+        with self.assertRaises(ValueError) as context:
+            OrgHierarchyService.get_all_subordinates(99)
+        self.assertEqual(str(context.exception), "No staff found with id: 99")
+
+
+if __name__ == "__main__":
+    unittest.main()
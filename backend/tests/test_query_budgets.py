@@ -0,0 +1,284 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.org_hierarchy_service import OrgHierarchyService
+
+MANAGER_COUNT = 5
+STAFF_PER_MANAGER = 20
+SCHEDULE_WEEKS = 12
+
+
+class QueryBudgetTestCase(unittest.TestCase):
+    """
+    Calls every API route against a seeded org and asserts how many SQL
+    statements it may issue, so an N+1 pattern fails the run instead of
+    showing up as a slow page.
+
+    Budgets are measured with a cold org-hierarchy cache and a fresh session.
+    """
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+        db.create_all()
+        self.today = datetime.now().date()
+        self._seed_org()
+
+        self.statement_count = 0
+        self.hydrated_count = 0
+        event.listen(db.engine, "before_cursor_execute", self._count)
+        event.listen(Session, "loaded_as_persistent", self._count_hydrated)
+
+    def tearDown(self):
+        event.remove(Session, "loaded_as_persistent", self._count_hydrated)
+        event.remove(db.engine, "before_cursor_execute", self._count)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _seed_org(self):
+        # Director 1 -> managers 2..6 -> staff 100.., with weekly schedules for everyone
+        staff_rows = [dict(
+            staff_id=1, staff_fname="Test", staff_lname="Director", dept="Sales", position="Director",
+            country="CountryA", email="director@test.com", reporting_manager=1, role=1, password="pw",
+        )]
+        self.manager_ids = []
+        self.staff_ids = []
+        for m in range(MANAGER_COUNT):
+            manager_id = 2 + m
+            self.manager_ids.append(manager_id)
+            staff_rows.append(dict(
+                staff_id=manager_id, staff_fname="Manager", staff_lname=str(m), dept="Sales",
+                position="Manager", country="CountryA", email=f"manager{m}@test.com",
+                reporting_manager=1, role=3, password="pw",
+            ))
+            for s in range(STAFF_PER_MANAGER):
+                staff_id = 100 + m * STAFF_PER_MANAGER + s
+                self.staff_ids.append(staff_id)
+                staff_rows.append(dict(
+                    staff_id=staff_id, staff_fname="Staff", staff_lname=str(staff_id), dept="Sales",
+                    position="Staff", country="CountryA", email=f"staff{staff_id}@test.com",
+                    reporting_manager=manager_id, role=2, password="pw",
+                ))
+        db.session.execute(insert(Staff), staff_rows)
+
+        request_rows = []
+        schedule_rows = []
+        request_id = 1
+        for staff in staff_rows[1:]:
+            if staff['role'] != 2:
+                continue
+            status = "APPROVED" if staff['staff_id'] % 3 else "PENDING"
+            start_date = self.today + timedelta(days=staff['staff_id'] % 5)
+            end_date = start_date + timedelta(weeks=SCHEDULE_WEEKS - 1)
+            request_rows.append(dict(
+                request_id=request_id, staff_id=staff['staff_id'], manager_id=staff['reporting_manager'],
+                request_date=self.today, start_date=start_date, end_date=end_date,
+                reason_for_applying="Budget test", duration="FULL_DAY", status=status,
+            ))
+            for week in range(SCHEDULE_WEEKS):
+                schedule_rows.append(dict(
+                    request_id=request_id, staff_id=staff['staff_id'], manager_id=staff['reporting_manager'],
+                    date=start_date + timedelta(weeks=week), duration="FULL_DAY", status=status,
+                    dept="Sales", position="Staff",
+                ))
+            request_id += 1
+        db.session.execute(insert(WFHRequest), request_rows)
+        db.session.execute(insert(WFHSchedule), schedule_rows)
+        db.session.commit()
+
+        self.staff_id = self.staff_ids[0]
+        self.manager_id = self.manager_ids[0]
+        self.pending_request_id = next(row['request_id'] for row in request_rows if row['status'] == "PENDING")
+        self.approved_request_id = next(row['request_id'] for row in request_rows if row['status'] == "APPROVED")
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statement_count += 1
+
+    def _count_hydrated(self, session, instance):
+        self.hydrated_count += 1
+
+    def call(self, method, url, **kwargs):
+        # Measure from cold caches and an empty identity map
+        db.session.remove()
+        OrgHierarchyService.invalidate()
+        if 'response_cache' in self.app.extensions:
+            self.app.extensions['response_cache'].clear()
+        self.statement_count = 0
+        self.hydrated_count = 0
+        response = self.client.open(url, method=method, **kwargs)
+        return response, self.statement_count
+
+    def assertWithinBudget(self, budget, method, url, **kwargs):
+        response, count = self.call(method, url, **kwargs)
+        self.assertLess(response.status_code, 500, response.get_data(as_text=True))
+        self.assertLessEqual(count, budget, f"{method} {url} issued {count} statements, budget is {budget}")
+        return response
+
+    def assertConstantInDays(self, url, budget):
+        # Summary endpoints must not issue one query per day in the range
+        short_range = f"start_date={self.today}&end_date={self.today + timedelta(days=7)}"
+        long_range = f"start_date={self.today - timedelta(days=60)}&end_date={self.today + timedelta(days=120)}"
+        separator = "&" if "?" in url else "?"
+
+        _, short_count = self.call("GET", f"{url}{separator}{short_range}")
+        _, long_count = self.call("GET", f"{url}{separator}{long_range}")
+        self.assertEqual(short_count, long_count, f"{url} query count grows with the date range")
+        self.assertLessEqual(long_count, budget)
+
+    # Staff controller
+
+    def test_login_budget(self):
+        self.assertWithinBudget(1, "POST", "/api/login", json={"email": "staff100@test.com", "password": "pw"})
+
+    def test_get_staff_budget(self):
+        self.assertWithinBudget(1, "GET", f"/api/staff/{self.staff_id}")
+
+    def test_departments_budget(self):
+        self.assertWithinBudget(1, "GET", "/api/departments")
+
+    # Summary views
+
+    def test_manager_schedule_summary_budget(self):
+        # Includes the ETag version stamp, taken before the aggregation
+        self.assertConstantInDays("/api/manager-schedule-summary/1", budget=3)
+        self.assertConstantInDays(f"/api/manager-schedule-summary/{self.manager_id}", budget=3)
+
+    def test_staff_schedule_summary_budget(self):
+        self.assertConstantInDays(
+            f"/api/staff-schedule-summary/{self.manager_id}?staff_id={self.staff_id}", budget=2)
+
+    def test_hr_schedule_summary_budget(self):
+        self.assertConstantInDays("/api/hr-schedule-summary", budget=2)
+
+    def test_personal_schedule_budget(self):
+        self.assertConstantInDays(f"/api/personal-schedule/{self.staff_id}", budget=2)
+
+    # Detail views
+
+    def test_manager_schedule_detail_budget(self):
+        self.assertWithinBudget(2, "GET", f"/api/manager-schedule-detail/1/{self.today}")
+        self.assertWithinBudget(2, "GET", f"/api/manager-schedule-detail/{self.manager_id}/{self.today}")
+
+    def test_staff_schedule_detail_budget(self):
+        self.assertWithinBudget(2, "GET", f"/api/staff-schedule-detail/{self.staff_id}/{self.today}")
+
+    def test_hr_schedule_detail_budget(self):
+        self.assertWithinBudget(2, "GET", f"/api/hr-schedule-detail/{self.today}")
+
+    def test_not_modified_skips_the_view(self):
+        # A matching If-None-Match is answered from the version stamp alone
+        for url, budget in (
+            (f"/api/personal-schedule/{self.staff_id}", 1),
+            (f"/api/manager-schedule-summary/{self.manager_id}", 2),
+            (f"/api/staff-requests/{self.staff_id}", 1),
+        ):
+            etag = self.client.get(url).headers['ETag']
+            response = self.assertWithinBudget(budget, "GET", url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_read_views_do_not_hydrate_orm_objects(self):
+        # Calendar, summary and detail views read plain column rows only
+        date_range = f"start_date={self.today - timedelta(days=60)}&end_date={self.today + timedelta(days=120)}"
+        for url in (
+            f"/api/personal-schedule/{self.staff_id}?{date_range}",
+            f"/api/manager-schedule-summary/1?{date_range}",
+            f"/api/staff-schedule-summary/{self.manager_id}?staff_id={self.staff_id}&{date_range}",
+            f"/api/hr-schedule-summary?{date_range}",
+            f"/api/manager-schedule-detail/1/{self.today}",
+            f"/api/manager-schedule-detail/{self.manager_id}/{self.today}",
+            f"/api/staff-schedule-detail/{self.staff_id}/{self.today}",
+            f"/api/hr-schedule-detail/{self.today}",
+        ):
+            response, _ = self.call("GET", url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(self.hydrated_count, 0, f"{url} loaded {self.hydrated_count} ORM objects")
+
+    # Requests
+
+    def test_pending_requests_budget(self):
+        self.assertWithinBudget(1, "GET", f"/api/pending-requests/{self.manager_id}")
+        self.assertWithinBudget(1, "GET", f"/api/pending-requests/{self.manager_id}?limit=5")
+
+    def test_staff_requests_budget(self):
+        self.assertWithinBudget(2, "GET", f"/api/staff-requests/{self.staff_id}")
+        self.assertWithinBudget(2, "GET", f"/api/staff-requests/{self.staff_id}?limit=5&status=APPROVED")
+
+    def test_changes_budget(self):
+        # The cursor, one overflow probe and one fetch each for schedules and requests
+        self.assertWithinBudget(5, "GET", "/api/changes?since=0&scope=company")
+        # Plus the reporting subtree lookup
+        self.assertWithinBudget(6, "GET", f"/api/changes?since=0&scope=team:{self.manager_id}")
+
+    def test_schedules_by_request_id_budget(self):
+        self.assertWithinBudget(1, "GET", f"/api/schedules-by-request-id/{self.approved_request_id}")
+
+    def test_schedules_by_ori_request_id_budget(self):
+        self.assertWithinBudget(1, "GET", f"/api/schedules-by-ori-request-id/{self.approved_request_id}")
+
+    def test_check_withdrawal_budget(self):
+        self.assertWithinBudget(
+            2, "GET", f"/api/check-withdrawal/{self.approved_request_id}?schedule_date={self.today}")
+
+    def test_check_wfh_count_budget(self):
+        # One lookup each for the staff member and team size, then one grouped count for all dates
+        dates = [str(self.today + timedelta(weeks=week)) for week in range(SCHEDULE_WEEKS)]
+        self.assertWithinBudget(
+            3, "POST", "/api/check-wfh-count",
+            json={"staff_id": self.staff_id, "dates": dates, "duration": "FULL_DAY"})
+
+    def test_create_request_budget(self):
+        start_date = self.today + timedelta(days=200)
+        self.assertWithinBudget(6, "POST", "/api/request", json={
+            "staff_id": self.staff_id, "manager_id": self.manager_id, "reason_for_applying": "Budget",
+            "date": str(start_date), "end_date": str(start_date + timedelta(weeks=SCHEDULE_WEEKS)),
+            "duration": "FULL_DAY", "dept": "Sales", "position": "Staff",
+        })
+
+    def test_update_request_budget(self):
+        # Includes the insert of the status change event
+        self.assertWithinBudget(13, "PATCH", "/api/update-request", json={
+            "request_id": self.pending_request_id, "request_status": "REJECTED", "reason": "Budget",
+        })
+
+    def test_bulk_update_request_budget(self):
+        # Constant in the batch size: every pending request of the first team in one call,
+        # including the occupancy row locks taken before the capacity check, the
+        # atomic occupancy counter updates, the change sequence stamped on the changed rows and the published events at commit
+        pending = WFHRequest.query.filter_by(manager_id=self.manager_id, status="PENDING").all()
+        self.assertGreater(len(pending), 3)
+        response = self.assertWithinBudget(19, "PATCH", "/api/bulk-update-request", json={"requests": [
+            {"request_id": r.request_id, "request_status": "APPROVED"} for r in pending
+        ]})
+        self.assertTrue(all(result["success"] for result in response.get_json()["results"]))
+
+    def test_reject_expired_budget(self):
+        # Constant in the number expired: the ids, the two status updates, the change
+        # sequence stamped on the expired requests and their schedules, and their events
+        db.session.execute(update(WFHRequest).where(WFHRequest.status == "PENDING").values(
+            start_date=self.today - timedelta(days=61)))
+        db.session.commit()
+        response = self.assertWithinBudget(8, "POST", "/api/reject-expired-request")
+        self.assertIn("Updated requests to 'EXPIRED'.", response.get_json()["message"])
+        self.assertEqual(WFHRequest.query.filter_by(status="PENDING").count(), 0)
+
+    def test_create_withdraw_request_budget(self):
+        # Two commits, each stamping the rows it changed with the change sequence,
+        # and one insert of the events they published
+        schedule = WFHSchedule.query.filter_by(request_id=self.approved_request_id).order_by(WFHSchedule.date).first()
+        self.assertWithinBudget(14, "POST", "/api/create-withdraw-request", json={
+            "schedule_id": schedule.schedule_id, "reason": "Budget",
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.wfh_schedule_service import WFHScheduleService
+from app.services.wfh_request_service import WFHRequestService
+from app.services.wfh_check_service import WFHCheckService
+
+# A plan step that walks a whole table instead of searching an index
+FULL_SCAN = re.compile(r'^SCAN "?(WFHSchedule|WFHRequest)"?\b')
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """
+    Runs the hot service methods, captures every statement they send to the
+    database and checks its EXPLAIN QUERY PLAN, so a missing index shows up
+    as a full table scan.
+    """
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        self.director = Staff(
+            staff_id=1, staff_fname="Test", staff_lname="Director", dept="Sales", position="Director",
+            country="CountryA", email="director@test.com", reporting_manager=None, role=1, password="pw1",
+        )
+        self.manager = Staff(
+            staff_id=2, staff_fname="Test", staff_lname="Manager", dept="Sales", position="Manager",
+            country="CountryA", email="manager@test.com", reporting_manager=1, role=3, password="pw2",
+        )
+        self.staff = Staff(
+            staff_id=3, staff_fname="Test", staff_lname="Staff", dept="Sales", position="Staff",
+            country="CountryA", email="staff@test.com", reporting_manager=2, role=2, password="pw3",
+        )
+        # A second team member, so team views have a team to count and query for
+        self.colleague = Staff(
+            staff_id=4, staff_fname="Test", staff_lname="Colleague", dept="Sales", position="Staff",
+            country="CountryA", email="colleague@test.com", reporting_manager=2, role=2, password="pw4",
+        )
+        db.session.add_all([self.director, self.manager, self.staff, self.colleague])
+        db.session.commit()
+
+        self.today = datetime.now().date()
+        self.request = WFHRequest(
+            staff_id=3, manager_id=2, request_date=self.today, start_date=self.today + timedelta(days=5),
+            reason_for_applying="Plan test", duration="FULL_DAY",
+        )
+        db.session.add(self.request)
+        db.session.commit()
+        db.session.add(WFHSchedule(
+            request_id=self.request.request_id, staff_id=3, manager_id=2, date=self.today + timedelta(days=5),
+            duration="FULL_DAY", status="PENDING", dept="Sales", position="Staff",
+        ))
+        db.session.commit()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._record)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+    def assertNoFullScans(self, call):
+        self.statements = []
+        call()
+        statements = [
+            (statement, parameters) for statement, parameters in self.statements
+            if "WFHSchedule" in statement or "WFHRequest" in statement
+        ]
+        # A call that never reaches the tables would pass without checking anything
+        self.assertTrue(statements)
+
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            details = [row[-1] for row in plan]
+            for detail in details:
+                self.assertIsNone(
+                    FULL_SCAN.match(detail),
+                    f"Full table scan in plan {details} for query:\n{statement}",
+                )
+
+    def test_schedule_service_queries_use_indexes(self):
+        start_date = self.today
+        end_date = self.today + timedelta(days=30)
+
+        self.assertNoFullScans(lambda: WFHScheduleService.get_manager_schedule_summary(1, start_date, end_date))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_manager_schedule_detail(2, start_date))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_personal_schedule(3, start_date, start_date + timedelta(days=2)))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_staff_schedule_summary(2, start_date, end_date, 3))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_staff_schedule_detail(3, start_date))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_hr_schedule_summary(start_date, end_date))
+        self.assertNoFullScans(lambda: WFHScheduleService.get_hr_schedule_detail(start_date))
+        self.assertNoFullScans(lambda: WFHScheduleService.update_schedule(self.request.request_id, "APPROVED"))
+
+    def test_request_service_queries_use_indexes(self):
+        two_months_ago = self.today - timedelta(days=60)
+
+        self.assertNoFullScans(lambda: WFHRequestService.get_pending_requests_for_manager(2))
+        self.assertNoFullScans(lambda: WFHRequestService.get_staff_requests(3))
+        self.assertNoFullScans(lambda: WFHRequestService.check_withdrawal(3, self.today))
+        self.assertNoFullScans(lambda: WFHRequestService.reject_expired(two_months_ago))
+
+    def test_check_service_queries_use_indexes(self):
+        dates = [self.today + timedelta(days=7 * week) for week in range(4)]
+
+        self.assertNoFullScans(lambda: WFHCheckService.check_team_capacity_bulk(3, dates, "HALF_DAY_AM"))
+
+    def test_check_indexes_command(self):
+        runner = self.app.test_cli_runner()
+
+        result = runner.invoke(args=["check-indexes"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("All declared indexes are present", result.output)
+
+        db.session.execute(db.text("DROP INDEX ix_wfhschedule_date_status"))
+        db.session.commit()
+
+        result = runner.invoke(args=["check-indexes"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Missing index: WFHSchedule.ix_wfhschedule_date_status", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,482 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import create_app, db
+from config import TestConfig
+from app.cache import LRUStore, MemoryBackend, SingleFlight
+from app.models.cache_version import CacheVersion
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.services.wfh_request_service import WFHRequestService
+from app.services.wfh_schedule_service import WFHScheduleService
+
+
+class CacheConfig(TestConfig):
+    RESPONSE_CACHE_ENABLED = True
+
+
+class RecordingBackend(MemoryBackend):
+    """In-memory backend that records its bumps, loaded through a 'module:Class' path."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.bumped = []
+
+    def bump(self, scopes):
+        self.bumped.append(scopes)
+        return super().bump(scopes)
+
+
+def seed_org():
+    # Director 1 leads managers 10 and 20, each with three staff
+    staff = [Staff(staff_id=1, staff_fname="Test", staff_lname="Director", dept="Sales", position="Director",
+                   country="CountryA", email="director@test.com", reporting_manager=1, role=1, password="pw")]
+    for manager_id in (10, 20):
+        staff.append(Staff(staff_id=manager_id, staff_fname="Test", staff_lname=f"Manager{manager_id}", dept="Sales",
+                           position="Manager", country="CountryA", email=f"manager{manager_id}@test.com",
+                           reporting_manager=1, role=3, password="pw"))
+        for staff_id in range(manager_id + 1, manager_id + 4):
+            staff.append(Staff(staff_id=staff_id, staff_fname="Test", staff_lname=f"Staff{staff_id}", dept="Sales",
+                               position="Staff", country="CountryA", email=f"staff{staff_id}@test.com",
+                               reporting_manager=manager_id, role=2, password="pw"))
+    db.session.add_all(staff)
+    db.session.commit()
+
+
+def add_request(staff_id, manager_id, day, status="PENDING"):
+    wfh_request = WFHRequest(staff_id=staff_id, manager_id=manager_id, request_date=day, start_date=day,
+                             reason_for_applying="Cache", duration="FULL_DAY", status=status)
+    db.session.add(wfh_request)
+    db.session.flush()
+    db.session.add(WFHSchedule(request_id=wfh_request.request_id, staff_id=staff_id, manager_id=manager_id, date=day,
+                               duration="FULL_DAY", status=status, dept="Sales", position="Staff"))
+    db.session.commit()
+    return wfh_request.request_id
+
+
+class LRUStoreTestCase(unittest.TestCase):
+    def test_evicts_least_recently_used_entry(self):
+        store = LRUStore(max_entries=2, max_bytes=1000)
+        store.set('a', 1, 10)
+        store.set('b', 2, 10)
+        store.get('a')
+        store.set('c', 3, 10)
+
+        self.assertEqual((store.get('a'), store.get('b'), store.get('c')), (1, None, 3))
+
+    def test_evicts_to_stay_under_byte_limit(self):
+        store = LRUStore(max_entries=10, max_bytes=100)
+        store.set('a', 1, 60)
+        store.set('b', 2, 30)
+        store.set('c', 3, 30)
+
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(store.size, 60)
+
+        # Values larger than the whole store are not cached at all
+        store.set('d', 4, 101)
+        self.assertIsNone(store.get('d'))
+        self.assertEqual(len(store), 2)
+
+
+class MemoryBackendTestCase(unittest.TestCase):
+    def test_versions_older_than_ttl_are_pruned(self):
+        config = {'RESPONSE_CACHE_MAX_ENTRIES': 10, 'RESPONSE_CACHE_MAX_BYTES': 1000, 'RESPONSE_CACHE_TTL': 60}
+        with patch('app.cache.time.monotonic', return_value=0):
+            backend = MemoryBackend(config)
+            backend.bump(['team:10', 'date:a'])
+        with patch('app.cache.time.monotonic', return_value=30):
+            backend.bump(['team:10'])
+        with patch('app.cache.time.monotonic', return_value=61):
+            backend.bump(['team:20'])
+
+        self.assertEqual(backend.versions(['team:10', 'team:20', 'date:a']), {'team:10': 2, 'team:20': 3})
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def run_concurrently(self, count, fn):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(i):
+            barrier.wait()
+            try:
+                results[i] = fn()
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        return results
+
+    def test_concurrent_callers_share_one_computation(self):
+        flights = SingleFlight(timeout=10)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': len(calls)}
+
+        results = self.run_concurrently(8, lambda: flights.do('key', compute))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flights.shared, 7)
+
+    def test_waiters_see_the_leaders_exception(self):
+        flights = SingleFlight(timeout=10)
+
+        def compute():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        results = self.run_concurrently(4, lambda: flights.do('key', compute))
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flights._flights, {})
+
+    def test_waiter_computes_itself_after_timeout(self):
+        flights = SingleFlight(timeout=0.05)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return len(calls)
+
+        self.run_concurrently(2, lambda: flights.do('key', compute))
+
+        self.assertEqual(len(calls), 2)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        class RecordingConfig(CacheConfig):
+            RESPONSE_CACHE_BACKEND = f"{__name__}:RecordingBackend"
+
+        self.app = create_app(RecordingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        seed_org()
+
+        self.cache = self.app.extensions['response_cache']
+        self.cache.backend.bumped.clear()
+        self.today = datetime.now().date()
+        self.start_date = self.today
+        self.end_date = self.today + timedelta(days=30)
+        self.day = self.today + timedelta(days=3)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def summary(self, manager_id):
+        return WFHScheduleService.get_manager_schedule_summary(manager_id, self.start_date, self.end_date)
+
+    def wfh_on(self, summary, day):
+        return next(entry['wfh_count_am'] for entry in summary['dates'] if entry['date'] == day.isoformat())
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.summary(10)
+        second = self.summary(10)
+
+        self.assertIs(first, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_hr_views_are_not_served_stale_by_default(self):
+        request_id = add_request(11, 10, self.day)
+        before = WFHScheduleService.get_hr_schedule_summary(self.start_date, self.end_date)
+        WFHScheduleService.update_schedule(request_id, "APPROVED")
+        after = WFHScheduleService.get_hr_schedule_summary(self.start_date, self.end_date)
+
+        self.assertEqual(self.wfh_on(after, self.day), self.wfh_on(before, self.day) + 1)
+        self.assertEqual(self.cache.stale_hits, 0)
+
+    def test_approval_invalidates_only_affected_team_and_dates(self):
+        request_id = add_request(11, 10, self.day)
+        team_10 = self.summary(10)
+        team_20 = self.summary(20)
+        company = WFHScheduleService.get_hr_schedule_summary(self.start_date, self.end_date)
+        later = WFHScheduleService.get_manager_schedule_summary(
+            10, self.day + timedelta(days=1), self.end_date)
+
+        WFHScheduleService.update_schedule(request_id, "APPROVED")
+
+        self.assertEqual(self.wfh_on(self.summary(10), self.day), self.wfh_on(team_10, self.day) + 1)
+        self.assertEqual(
+            self.wfh_on(WFHScheduleService.get_hr_schedule_summary(self.start_date, self.end_date), self.day),
+            self.wfh_on(company, self.day) + 1)
+        self.assertIs(self.summary(20), team_20)
+        self.assertIs(WFHScheduleService.get_manager_schedule_summary(
+            10, self.day + timedelta(days=1), self.end_date), later)
+
+        # The director's view covers both teams
+        director = WFHScheduleService.get_manager_schedule_detail(1, self.day)
+        self.assertIn('WFH', str(director))
+
+    def test_direct_schedule_changes_invalidate(self):
+        detail = WFHScheduleService.get_staff_schedule_detail(12, self.day)
+        self.assertTrue(all(staff['status_am'] == 'OFFICE' for staff in detail['staff']))
+
+        add_request(12, 10, self.day, status="APPROVED")
+        detail = WFHScheduleService.get_staff_schedule_detail(12, self.day)
+        self.assertEqual(next(s for s in detail['staff'] if s['staff_id'] == 12)['status_am'], 'WFH')
+
+        schedule = WFHSchedule.query.filter_by(staff_id=12).one()
+        schedule.status = "WITHDRAWN"
+        db.session.commit()
+        detail = WFHScheduleService.get_staff_schedule_detail(12, self.day)
+        self.assertEqual(next(s for s in detail['staff'] if s['staff_id'] == 12)['status_am'], 'OFFICE')
+
+    def test_expiry_does_not_invalidate(self):
+        add_request(11, 10, self.today - timedelta(days=61))
+        self.summary(10)
+        two_months_ago = self.today - timedelta(days=60)
+
+        self.assertEqual(WFHRequestService.reject_expired(two_months_ago)['requests'], 1)
+        self.assertEqual(WFHRequestService.reject_expired(two_months_ago)['requests'], 0)
+
+        self.assertEqual(self.cache.backend.bumped, [])
+        self.summary(10)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_memory_backend_is_refused_with_several_workers(self):
+        class MemoryConfig(CacheConfig):
+            RESPONSE_CACHE_BACKEND = "memory"
+
+        with patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            with self.assertRaises(RuntimeError):
+                create_app(MemoryConfig)
+
+    def test_concurrent_misses_compute_once(self):
+        original = WFHScheduleService._count_wfh_by_date
+        calls = []
+
+        def slow_count(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.2)
+            return original(*args, **kwargs)
+
+        barrier = threading.Barrier(6)
+        results = []
+
+        def worker():
+            with self.app.app_context():
+                barrier.wait()
+                results.append(WFHScheduleService.get_staff_schedule_summary(10, self.start_date, self.end_date, 11))
+
+        with patch.object(WFHScheduleService, '_count_wfh_by_date', side_effect=slow_count):
+            threads = [threading.Thread(target=worker) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_misses_after_a_change_do_not_join_older_computation(self):
+        request_id = add_request(11, 10, self.day)
+        seq = self.cache.backend.current()
+        key = ('manager_schedule_summary', 10, self.start_date, self.end_date)
+        started = threading.Event()
+        release = threading.Event()
+
+        def stale_compute():
+            started.set()
+            release.wait(5)
+            return {'dates': 'stale'}
+
+        # A computation that started before the approval is still running
+        leader = threading.Thread(target=self.cache.flights.do, args=((key, seq), stale_compute))
+        leader.start()
+        started.wait(5)
+
+        WFHScheduleService.update_schedule(request_id, "APPROVED")
+        fresh = self.summary(10)
+        release.set()
+        leader.join(5)
+
+        self.assertNotEqual(fresh, {'dates': 'stale'})
+        self.assertEqual(self.wfh_on(fresh, self.day), 1)
+
+    def test_pending_changes_do_not_invalidate(self):
+        summary = self.summary(10)
+        add_request(11, 10, self.day)
+
+        self.assertIs(self.summary(10), summary)
+        self.assertEqual(self.cache.backend.bumped, [])
+
+    def test_staff_changes_invalidate_everything(self):
+        summary = self.summary(20)
+        db.session.add(Staff(staff_id=24, staff_fname="New", staff_lname="Staff", dept="Sales", position="Staff",
+                             country="CountryA", email="staff24@test.com", reporting_manager=20, role=2,
+                             password="pw"))
+        db.session.commit()
+
+        self.assertEqual(self.summary(20)['dates'][0]['total_staff'], summary['dates'][0]['total_staff'] + 1)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.summary(999), {'dates': []})
+        self.assertEqual(len(self.cache.backend.store), 0)
+
+    def test_entries_expire_after_ttl(self):
+        summary = self.summary(10)
+        self.cache.ttl = 0
+
+        self.assertIsNot(self.summary(10), summary)
+
+
+class StaleWhileRevalidateTestCase(unittest.TestCase):
+    def setUp(self):
+        class StaleConfig(CacheConfig):
+            RESPONSE_CACHE_STALE_WHILE_REVALIDATE = {'hr_schedule_summary': (5, 60)}
+
+        self.app = create_app(StaleConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        seed_org()
+
+        self.cache = self.app.extensions['response_cache']
+        self.today = datetime.now().date()
+        self.day = self.today + timedelta(days=3)
+        self.url = f"/api/hr-schedule-summary?start_date={self.today}&end_date={self.today + timedelta(days=7)}"
+        self.request_id = add_request(11, 10, self.day)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def wfh_count(self, response):
+        return response.get_json()['dates'][3]['wfh_count_am']
+
+    def age_entries(self, seconds):
+        store = self.cache.backend.store
+        for key, (entry, size) in list(store._entries.items()):
+            store._entries[key] = (entry._replace(created_at=entry.created_at - seconds), size)
+
+    def test_young_entries_are_served_without_version_checks(self):
+        first = self.client.get(self.url)
+        WFHScheduleService.update_schedule(self.request_id, "APPROVED")
+        second = self.client.get(self.url)
+
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(self.wfh_count(second), self.wfh_count(first))
+        self.assertEqual(second.headers['Cache-Control'], 'private, max-age=5, stale-while-revalidate=60')
+
+    def test_stale_entry_is_served_while_refreshing_in_background(self):
+        first = self.client.get(self.url)
+        WFHScheduleService.update_schedule(self.request_id, "APPROVED")
+        self.age_entries(10)
+
+        stale = self.client.get(self.url)
+        self.assertEqual(stale.headers['X-Cache'], 'STALE')
+        self.assertEqual(stale.headers['Age'], '10')
+        self.assertEqual(self.wfh_count(stale), self.wfh_count(first))
+
+        deadline = time.monotonic() + 5
+        while self.cache._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh.headers['X-Cache'], 'HIT')
+        self.assertEqual(self.wfh_count(fresh), self.wfh_count(first) + 1)
+
+    def test_entries_past_the_stale_window_are_recomputed(self):
+        first = self.client.get(self.url)
+        WFHScheduleService.update_schedule(self.request_id, "APPROVED")
+        self.age_entries(70)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(self.wfh_count(response), self.wfh_count(first) + 1)
+
+    def test_other_views_get_no_cache_control(self):
+        response = self.client.get(f"/api/manager-schedule-detail/10/{self.day}")
+
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertNotIn('Cache-Control', response.headers)
+
+
+class DatabaseBackendTestCase(unittest.TestCase):
+    """
+    Two apps on one database file stand in for two gunicorn workers.
+    """
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+        class SharedConfig(CacheConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.db_path}"
+            RESPONSE_CACHE_BACKEND = "database"
+
+        self.worker_a = create_app(SharedConfig)
+        self.worker_b = create_app(SharedConfig)
+        with self.worker_a.app_context():
+            db.create_all()
+            seed_org()
+
+        self.today = datetime.now().date()
+        self.day = self.today + timedelta(days=3)
+
+    def tearDown(self):
+        for app in (self.worker_a, self.worker_b):
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+        os.remove(self.db_path)
+
+    def summary(self):
+        return WFHScheduleService.get_manager_schedule_summary(10, self.today, self.today + timedelta(days=7))
+
+    def test_change_in_one_worker_invalidates_the_other(self):
+        with self.worker_b.app_context():
+            before = self.summary()
+            self.assertIs(self.summary(), before)
+
+        with self.worker_a.app_context():
+            WFHScheduleService.get_staff_schedule_detail(11, self.day)  # builds worker A's org index
+            request_id = add_request(11, 10, self.day)
+            WFHScheduleService.update_schedule(request_id, "APPROVED")
+
+        with self.worker_b.app_context():
+            after = self.summary()
+            self.assertIsNot(after, before)
+            self.assertEqual(after['dates'][3]['wfh_count_am'], before['dates'][3]['wfh_count_am'] + 1)
+
+    def test_versions_older_than_ttl_are_pruned(self):
+        with self.worker_a.app_context():
+            backend = self.worker_a.extensions['response_cache'].backend
+            backend.bump(['team:10', 'date:a'])
+            db.session.execute(update(CacheVersion).where(CacheVersion.scope == 'date:a').values(
+                bumped_at=datetime.now() - timedelta(seconds=backend.ttl + 1)))
+            db.session.commit()
+
+            backend._pruned_at -= backend.ttl
+            backend.bump(['team:20'])
+
+            seq = backend.current()
+            self.assertEqual(backend.versions(['team:10', 'team:20', 'date:a']), {'team:10': seq - 1, 'team:20': seq})
+
+
+if __name__ == "__main__":
+    unittest.main()
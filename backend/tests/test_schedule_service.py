@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from datetime import datetime, timedelta
 from app import create_app, db
 from config import TestConfig
@@ -119,6 +120,9 @@ class WFHScheduleServiceTestCase(unittest.TestCase):
         self.assertEqual(len(schedules), 1)
         self.assertEqual(schedules[0].date, start_date)
         self.assertEqual(schedules[0].duration, "FULL_DAY")
+        # The returned schedules are the persisted rows
+        self.assertIsNotNone(schedules[0].schedule_id)
+        self.assertIs(schedules[0], db.session.get(WFHSchedule, schedules[0].schedule_id))
 
     def test_create_schedule_recurring(self):
         today = datetime.now().date()
@@ -195,6 +199,49 @@ class WFHScheduleServiceTestCase(unittest.TestCase):
         deleted_request = WFHRequest.query.get(wfh_request.request_id)
         self.assertIsNone(deleted_request)
 
+    def test_create_schedule_recurring_skips_taken_dates(self):
+        today = datetime.now().date()
+        start_date = today + timedelta(days=5)
+        end_date = start_date + timedelta(days=28)  # 5 weekly dates
+        wfh_request = WFHRequest(
+            request_id=1,
+            staff_id=self.staff3.staff_id,
+            manager_id=self.staff2.staff_id,
+            request_date=today,
+            start_date=start_date,
+            end_date=end_date,
+            reason_for_applying="Test recurring schedule",
+            duration="FULL_DAY",
+        )
+        db.session.add(wfh_request)
+        # Week 2 is taken, week 3 only has an expired schedule
+        db.session.add_all([
+            WFHSchedule(request_id=2, staff_id=self.staff3.staff_id, manager_id=self.staff2.staff_id,
+                        date=start_date + timedelta(days=7), duration="HALF_DAY_AM", status="APPROVED",
+                        dept=self.staff3.dept, position=self.staff3.position),
+            WFHSchedule(request_id=3, staff_id=self.staff3.staff_id, manager_id=self.staff2.staff_id,
+                        date=start_date + timedelta(days=14), duration="FULL_DAY", status="EXPIRED",
+                        dept=self.staff3.dept, position=self.staff3.position),
+        ])
+        db.session.commit()
+
+        schedules = WFHScheduleService.create_schedule(
+            request_id=wfh_request.request_id,
+            staff_id=self.staff3.staff_id,
+            manager_id=self.staff2.staff_id,
+            start_date=start_date,
+            end_date=end_date,
+            duration="FULL_DAY",
+            dept=self.staff3.dept,
+            position=self.staff3.position,
+        )
+        expected_dates = [start_date + timedelta(days=7 * week) for week in (0, 2, 3, 4)]
+        self.assertEqual([schedule.date for schedule in schedules], expected_dates)
+
+        stored = WFHSchedule.query.filter_by(request_id=wfh_request.request_id).order_by(WFHSchedule.date).all()
+        self.assertEqual([schedule.date for schedule in stored], expected_dates)
+        self.assertTrue(all(schedule.status == "PENDING" for schedule in stored))
+
     def test_create_schedule_no_schedules_created(self):
         today = datetime.now().date()
         start_date = today + timedelta(days=5)
@@ -533,6 +580,33 @@ class WFHScheduleServiceTestCase(unittest.TestCase):
         }
         self.assertEqual(result, expected_result)
 
+    def test_get_personal_schedule_combines_half_days_in_range(self):
+        start_date = datetime.now().date() + timedelta(days=5)
+        end_date = start_date + timedelta(days=2)
+        staff_id = self.staff3.staff_id
+
+        db.session.add_all([
+            WFHSchedule(request_id=1, staff_id=staff_id, manager_id=self.staff2.staff_id, date=start_date,
+                        duration="HALF_DAY_AM", status="APPROVED", dept=self.staff3.dept, position=self.staff3.position),
+            WFHSchedule(request_id=2, staff_id=staff_id, manager_id=self.staff2.staff_id, date=start_date,
+                        duration="HALF_DAY_PM", status="PENDING", dept=self.staff3.dept, position=self.staff3.position),
+            WFHSchedule(request_id=3, staff_id=staff_id, manager_id=self.staff2.staff_id, date=end_date,
+                        duration="FULL_DAY", status="REJECTED", dept=self.staff3.dept, position=self.staff3.position),
+            WFHSchedule(request_id=4, staff_id=staff_id, manager_id=self.staff2.staff_id,
+                        date=end_date + timedelta(days=1), duration="FULL_DAY", status="APPROVED",
+                        dept=self.staff3.dept, position=self.staff3.position),
+        ])
+        db.session.commit()
+
+        result = WFHScheduleService.get_personal_schedule(staff_id, start_date, end_date)
+        self.assertEqual(result, {
+            'dates': [
+                {'date': start_date.isoformat(), 'schedule': 'AMPMPending'},
+                {'date': (start_date + timedelta(days=1)).isoformat(), 'schedule': ''},
+                {'date': end_date.isoformat(), 'schedule': ''},
+            ]
+        })
+
     def test_get_personal_schedule_with_no_schedule(self):
         today = datetime.now().date()
         start_date = today + timedelta(days=5)
@@ -668,6 +742,40 @@ class WFHScheduleServiceTestCase(unittest.TestCase):
                 self.assertEqual(date_data['wfh_count_pm'], 0)
             self.assertEqual(date_data['total_staff'], 4)
 
+    def test_get_manager_schedule_summary_director_with_nested_managers(self):
+        # staff6 is a sub-manager under staff2 with staff7 below them
+        staff6 = Staff(staff_id=6, staff_fname="Sub", staff_lname="Manager", dept="Test Department",
+                       position="Manager", country="Test Country", email="submanager@test.com",
+                       reporting_manager=self.staff2.staff_id, role=3, password="testpassword6")
+        staff7 = Staff(staff_id=7, staff_fname="Nested", staff_lname="Staff", dept="Test Department",
+                       position="Staff", country="Test Country", email="nested@test.com",
+                       reporting_manager=6, role=2, password="testpassword7")
+        db.session.add_all([staff6, staff7])
+        db.session.commit()
+
+        start_date = datetime.now().date()
+        schedule = WFHSchedule(
+            request_id=1,
+            staff_id=staff7.staff_id,
+            manager_id=staff6.staff_id,
+            date=start_date,
+            duration='HALF_DAY_AM',
+            status='APPROVED',
+            dept=staff7.dept,
+            position=staff7.position,
+        )
+        db.session.add(schedule)
+        db.session.commit()
+
+        result = WFHScheduleService.get_manager_schedule_summary(self.staff1.staff_id, start_date, start_date)
+        self.assertEqual(result['dates'][0]['total_staff'], 6)
+        self.assertEqual(result['dates'][0]['wfh_count_am'], 1)
+
+        result = WFHScheduleService.get_manager_schedule_detail(self.staff1.staff_id, start_date)
+        team = result['managers']["Test Manager's Team"]
+        self.assertEqual([staff['staff_id'] for staff in team['staff']], [2, 3, 6, 7])
+        self.assertEqual(team['staff'][3]['status_am'], 'WFH')
+
     def test_get_manager_schedule_summary_director_with_direct_subordinates(self):
         # Adding a direct subordinate to the director
         staff6 = Staff(
@@ -857,6 +965,61 @@ class WFHScheduleServiceTestCase(unittest.TestCase):
         # Expected: No schedules, no staff
         self.assertEqual(result['dates'], [])
 
+    def test_hr_schedule_summary_counts_grouped_by_date(self):
+        start_date = datetime.now().date()
+        end_date = start_date + timedelta(days=150)
+        target_date = start_date + timedelta(days=100)
+
+        # Two full-day and one half-day schedule on the same date, one outside the range
+        db.session.add_all([
+            WFHSchedule(request_id=1, staff_id=self.staff2.staff_id, manager_id=1, date=target_date,
+                        duration='FULL_DAY', status='APPROVED', dept='Test Department', position='Manager'),
+            WFHSchedule(request_id=2, staff_id=self.staff3.staff_id, manager_id=2, date=target_date,
+                        duration='FULL_DAY', status='APPROVED', dept='Test Department', position='Staff'),
+            WFHSchedule(request_id=3, staff_id=self.staff5.staff_id, manager_id=4, date=target_date,
+                        duration='HALF_DAY_PM', status='APPROVED', dept='Test Department', position='Staff'),
+            WFHSchedule(request_id=4, staff_id=self.staff5.staff_id, manager_id=4, date=end_date + timedelta(days=1),
+                        duration='FULL_DAY', status='APPROVED', dept='Test Department', position='Staff'),
+        ])
+        db.session.commit()
+
+        result = WFHScheduleService.get_hr_schedule_summary(start_date, end_date)
+
+        self.assertEqual(len(result['dates']), 151)
+        for date_data in result['dates']:
+            if date_data['date'] == target_date.isoformat():
+                self.assertEqual(date_data['wfh_count_am'], 2)
+                self.assertEqual(date_data['wfh_count_pm'], 3)
+                self.assertEqual(date_data['office_count_am'], 3)
+                self.assertEqual(date_data['office_count_pm'], 2)
+            else:
+                self.assertEqual(date_data['wfh_count_am'], 0)
+                self.assertEqual(date_data['wfh_count_pm'], 0)
+
+    def test_hr_schedule_summary_without_numpy_matches(self):
+        start_date = datetime.now().date()
+        end_date = start_date + timedelta(days=365)
+        db.session.add_all([
+            WFHSchedule(request_id=1, staff_id=self.staff3.staff_id, manager_id=2, date=start_date + timedelta(days=3),
+                        duration='HALF_DAY_AM', status='APPROVED', dept='Test Department', position='Staff'),
+            WFHSchedule(request_id=2, staff_id=self.staff5.staff_id, manager_id=4, date=start_date + timedelta(days=3),
+                        duration='FULL_DAY', status='APPROVED', dept='Test Department', position='Staff'),
+            WFHSchedule(request_id=3, staff_id=self.staff5.staff_id, manager_id=4, date=end_date,
+                        duration='HALF_DAY_PM', status='APPROVED', dept='Test Department', position='Staff'),
+        ])
+        db.session.commit()
+
+        result = WFHScheduleService.get_hr_schedule_summary(start_date, end_date)
+        with patch('app.services.wfh_schedule_service.np', None):
+            fallback_result = WFHScheduleService.get_hr_schedule_summary(start_date, end_date)
+
+        self.assertEqual(result, fallback_result)
+        self.assertEqual(len(result['dates']), 366)
+        self.assertEqual(result['dates'][3]['wfh_count_am'], 2)
+        self.assertEqual(result['dates'][3]['wfh_count_pm'], 1)
+        self.assertEqual(result['dates'][-1]['date'], end_date.isoformat())
+        self.assertEqual(result['dates'][-1]['office_count_pm'], 4)
+
     def test_hr_no_schedule_detail(self):
         date = datetime.now().date()
         result = WFHScheduleService.get_hr_schedule_detail(date)
@@ -203,6 +203,26 @@ class StaffServiceTestCase(unittest.TestCase):
         self.assertIn('staff', result)
         self.assertEqual(len(result['staff']), 0)
 
+    def test_get_all_subordinates_follows_the_org_hierarchy(self):
+        staff7 = Staff(
+            staff_id=7,
+            staff_fname="Deep",
+            staff_lname="Staff",
+            dept="Test Department",
+            position="Staff",
+            country="Test Country",
+            email="deep@test.com",
+            reporting_manager=self.staff3.staff_id,
+            role=2,
+            password="testpassword7",
+        )
+        db.session.add(staff7)
+        db.session.commit()
+
+        result = StaffService.get_all_subordinates(self.staff2.staff_id)
+        self.assertEqual(result['type'], 'direct')
+        self.assertEqual(result['staff'], [self.staff3, staff7])
+
     def test_get_all_subordinates_invalid_staff_id(self):
         with self.assertRaises(ValueError) as context:
             StaffService.get_all_subordinates(99)
@@ -0,0 +1,174 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_schedule import WFHSchedule
+from app.models.team_daily_occupancy import TeamDailyOccupancy
+from app.services.team_occupancy_service import TeamOccupancyService
+from app.services.wfh_schedule_service import WFHScheduleService
+
+
+class TeamOccupancyServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        self.manager = Staff(
+            staff_id=1,
+            staff_fname="Test",
+            staff_lname="Manager",
+            dept="Engineering",
+            position="Manager",
+            country="CountryA",
+            email="manager@test.com",
+            reporting_manager=None,
+            role=3,
+            password="password1",
+        )
+        self.staff1 = Staff(
+            staff_id=2,
+            staff_fname="Test",
+            staff_lname="Staff1",
+            dept="Engineering",
+            position="Engineer",
+            country="CountryA",
+            email="staff1@test.com",
+            reporting_manager=1,
+            role=2,
+            password="password2",
+        )
+        self.staff2 = Staff(
+            staff_id=3,
+            staff_fname="Test",
+            staff_lname="Staff2",
+            dept="Engineering",
+            position="Engineer",
+            country="CountryA",
+            email="staff2@test.com",
+            reporting_manager=1,
+            role=2,
+            password="password3",
+        )
+        db.session.add_all([self.manager, self.staff1, self.staff2])
+        db.session.commit()
+
+        self.date = datetime.now().date() + timedelta(days=5)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _add_schedule(self, request_id, staff, duration, status="PENDING", date=None):
+        schedule = WFHSchedule(
+            request_id=request_id,
+            staff_id=staff.staff_id,
+            manager_id=self.manager.staff_id,
+            date=date or self.date,
+            duration=duration,
+            status=status,
+            dept=staff.dept,
+            position=staff.position,
+        )
+        db.session.add(schedule)
+        db.session.commit()
+        return schedule
+
+    def _occupancy(self, date=None):
+        return db.session.get(TeamDailyOccupancy, (self.manager.staff_id, date or self.date))
+
+    def test_approve_increments_occupancy(self):
+        self._add_schedule(1, self.staff1, "FULL_DAY")
+        self._add_schedule(2, self.staff2, "HALF_DAY_AM")
+
+        WFHScheduleService.update_schedule(1, "APPROVED")
+        WFHScheduleService.update_schedule(2, "APPROVED")
+
+        occupancy = self._occupancy()
+        self.assertEqual(occupancy.wfh_count_am, 2)
+        self.assertEqual(occupancy.wfh_count_pm, 1)
+
+    def test_reject_does_not_touch_occupancy(self):
+        self._add_schedule(1, self.staff1, "FULL_DAY")
+
+        WFHScheduleService.update_schedule(1, "REJECTED")
+
+        self.assertIsNone(self._occupancy())
+
+    def test_withdraw_decrements_occupancy(self):
+        self._add_schedule(1, self.staff1, "HALF_DAY_PM")
+        WFHScheduleService.update_schedule(1, "APPROVED")
+        self.assertEqual(self._occupancy().wfh_count_pm, 1)
+
+        WFHScheduleService.update_schedule(1, "WITHDRAWN")
+
+        occupancy = self._occupancy()
+        self.assertEqual(occupancy.wfh_count_am, 0)
+        self.assertEqual(occupancy.wfh_count_pm, 0)
+
+    def test_counters_are_updated_in_place(self):
+        self._add_schedule(1, self.staff1, "FULL_DAY")
+        self._add_schedule(2, self.staff2, "HALF_DAY_AM", status="APPROVED")
+        db.session.add(TeamDailyOccupancy(
+            manager_id=self.manager.staff_id, date=self.date, wfh_count_am=1, wfh_count_pm=0))
+        db.session.commit()
+        stale = self._occupancy()
+
+        # Another transaction withdraws schedule 2 after this session read the row
+        db.session.execute(
+            update(TeamDailyOccupancy).values(wfh_count_am=TeamDailyOccupancy.wfh_count_am - 1)
+            .execution_options(synchronize_session=False))
+        WFHScheduleService.update_schedule(1, "APPROVED")
+
+        self.assertEqual((stale.wfh_count_am, stale.wfh_count_pm), (1, 1))
+
+    def test_negative_counters_are_logged(self):
+        self._add_schedule(1, self.staff1, "HALF_DAY_PM", status="APPROVED")
+
+        with self.assertLogs('app.services.team_occupancy_service', level='WARNING') as logs:
+            WFHScheduleService.update_schedule(1, "WITHDRAWN")
+
+        self.assertEqual(self._occupancy().wfh_count_pm, -1)
+        self.assertIn("dropped below zero", logs.output[0])
+
+    def test_rebuild_recomputes_range(self):
+        other_date = self.date + timedelta(days=1)
+        self._add_schedule(1, self.staff1, "FULL_DAY", status="APPROVED")
+        self._add_schedule(2, self.staff2, "HALF_DAY_PM", status="APPROVED")
+        self._add_schedule(3, self.staff2, "FULL_DAY", status="PENDING", date=other_date)
+
+        # Drifted row that no approved schedule backs
+        db.session.add(TeamDailyOccupancy(
+            manager_id=self.manager.staff_id, date=other_date, wfh_count_am=4, wfh_count_pm=4))
+        db.session.commit()
+
+        row_count = TeamOccupancyService.rebuild(self.date, other_date)
+
+        self.assertEqual(row_count, 1)
+        occupancy = self._occupancy()
+        self.assertEqual(occupancy.wfh_count_am, 1)
+        self.assertEqual(occupancy.wfh_count_pm, 2)
+        self.assertIsNone(self._occupancy(other_date))
+
+    def test_rebuild_occupancy_command(self):
+        self._add_schedule(1, self.staff1, "FULL_DAY", status="APPROVED")
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=[
+            "rebuild-occupancy",
+            "--start-date", self.date.isoformat(),
+            "--end-date", self.date.isoformat(),
+        ])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Rebuilt 1 team occupancy rows", result.output)
+        self.assertEqual(self._occupancy().wfh_count_am, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
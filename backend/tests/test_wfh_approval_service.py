@@ -0,0 +1,194 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from app import create_app, db
+from config import TestConfig
+from app.models.staff import Staff
+from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
+from app.models.team_daily_occupancy import TeamDailyOccupancy
+from app.services.team_occupancy_service import TeamOccupancyService
+from app.services.wfh_approval_service import WFHApprovalService
+
+
+class WFHApprovalServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        # Manager 1 leads a team of four staff (2..5), so at most two may WFH at once
+        staff = [Staff(staff_id=1, staff_fname="Test", staff_lname="Manager", dept="Sales", position="Manager",
+                       country="CountryA", email="manager@test.com", reporting_manager=1, role=3, password="pw")]
+        for staff_id in range(2, 6):
+            staff.append(Staff(staff_id=staff_id, staff_fname="Test", staff_lname=f"Staff{staff_id}", dept="Sales",
+                               position="Staff", country="CountryA", email=f"staff{staff_id}@test.com",
+                               reporting_manager=1, role=2, password="pw"))
+        db.session.add_all(staff)
+        db.session.commit()
+
+        self.today = datetime.now().date()
+        self.two_months_ago = self.today - timedelta(days=60)
+        self.date = self.today + timedelta(days=5)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _pending_request(self, staff_id, duration="FULL_DAY", dates=None):
+        dates = dates or [self.date]
+        wfh_request = WFHRequest(
+            staff_id=staff_id, manager_id=1, request_date=self.today, start_date=dates[0],
+            end_date=dates[-1] if len(dates) > 1 else None, reason_for_applying="Bulk", duration=duration,
+        )
+        db.session.add(wfh_request)
+        db.session.commit()
+        db.session.add_all([
+            WFHSchedule(request_id=wfh_request.request_id, staff_id=staff_id, manager_id=1, date=d,
+                        duration=duration, status="PENDING", dept="Sales", position="Staff")
+            for d in dates
+        ])
+        db.session.commit()
+        return wfh_request.request_id
+
+    def test_batch_approvals_count_against_each_other(self):
+        request_ids = [self._pending_request(staff_id) for staff_id in (2, 3, 4)]
+
+        results = WFHApprovalService.bulk_update_requests(
+            [{'request_id': request_id, 'request_status': 'APPROVED'} for request_id in request_ids],
+            self.two_months_ago)
+
+        self.assertEqual([r['success'] for r in results], [True, True, False])
+        self.assertIn("policy violation", results[2]['message'])
+        self.assertEqual(
+            [db.session.get(WFHRequest, request_id).status for request_id in request_ids],
+            ["APPROVED", "APPROVED", "PENDING"])
+        self.assertEqual(WFHSchedule.query.filter_by(status="APPROVED").count(), 2)
+
+        occupancy = db.session.get(TeamDailyOccupancy, (1, self.date))
+        self.assertEqual((occupancy.wfh_count_am, occupancy.wfh_count_pm), (2, 2))
+
+    def test_batch_half_days_in_different_halves_do_not_clash(self):
+        db.session.add(WFHSchedule(request_id=999, staff_id=5, manager_id=1, date=self.date, duration="HALF_DAY_AM",
+                                   status="APPROVED", dept="Sales", position="Staff"))
+        db.session.commit()
+        am_request = self._pending_request(2, duration="HALF_DAY_AM")
+        pm_requests = [self._pending_request(staff_id, duration="HALF_DAY_PM") for staff_id in (3, 4)]
+
+        results = WFHApprovalService.bulk_update_requests(
+            [{'request_id': request_id, 'request_status': 'APPROVED'} for request_id in [am_request] + pm_requests],
+            self.two_months_ago)
+
+        self.assertEqual([r['success'] for r in results], [True, True, True])
+
+    def test_mixed_approve_reject_and_invalid_entries(self):
+        approve_id = self._pending_request(2)
+        reject_id = self._pending_request(3)
+
+        results = WFHApprovalService.bulk_update_requests([
+            {'request_id': approve_id, 'request_status': 'APPROVED'},
+            {'request_id': reject_id, 'request_status': 'REJECTED', 'reason': 'Short staffed'},
+            {'request_id': approve_id, 'request_status': 'REJECTED'},
+            {'request_id': 12345, 'request_status': 'APPROVED'},
+            {'request_id': reject_id, 'request_status': 'CANCELLED'},
+        ], self.two_months_ago)
+
+        self.assertEqual([r['success'] for r in results], [True, True, False, False, False])
+        self.assertEqual(results[2]['message'], "Duplicate request in batch")
+        self.assertEqual(results[3]['message'], "Request does not exist")
+        self.assertEqual(results[4]['message'], "Unsupported status: CANCELLED")
+
+        rejected = db.session.get(WFHRequest, reject_id)
+        self.assertEqual(rejected.status, "REJECTED")
+        self.assertEqual(rejected.reason_for_rejection, "Short staffed")
+        self.assertEqual(WFHSchedule.query.filter_by(request_id=reject_id).one().status, "REJECTED")
+
+    def test_withdrawal_requests(self):
+        original_id = self._pending_request(2)
+        WFHApprovalService.bulk_update_requests(
+            [{'request_id': original_id, 'request_status': 'APPROVED'}], self.two_months_ago)
+        schedule = WFHSchedule.query.filter_by(request_id=original_id).one()
+
+        withdrawal = WFHRequest(staff_id=2, manager_id=1, request_date=self.today, start_date=self.date,
+                                reason_for_applying="Withdraw", duration="WITHDRAWAL REQUEST")
+        db.session.add(withdrawal)
+        db.session.commit()
+        schedule.reason_for_withdrawing = original_id
+        schedule.request_id = withdrawal.request_id
+        db.session.commit()
+
+        results = WFHApprovalService.bulk_update_requests(
+            [{'request_id': withdrawal.request_id, 'request_status': 'APPROVED'}], self.two_months_ago)
+
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(schedule.status, "WITHDRAWN")
+        self.assertEqual(db.session.get(WFHRequest, original_id).status, "WITHDRAWN")
+        occupancy = db.session.get(TeamDailyOccupancy, (1, self.date))
+        self.assertEqual((occupancy.wfh_count_am, occupancy.wfh_count_pm), (0, 0))
+
+    def test_rejected_withdrawal_restores_original_request(self):
+        original_id = self._pending_request(2)
+        schedule = WFHSchedule.query.filter_by(request_id=original_id).one()
+        schedule.status = "APPROVED"
+        withdrawal = WFHRequest(staff_id=2, manager_id=1, request_date=self.today, start_date=self.date,
+                                reason_for_applying="Withdraw", duration="WITHDRAWAL REQUEST")
+        db.session.add(withdrawal)
+        db.session.commit()
+        schedule.reason_for_withdrawing = original_id
+        schedule.request_id = withdrawal.request_id
+        db.session.commit()
+
+        results = WFHApprovalService.bulk_update_requests(
+            [{'request_id': withdrawal.request_id, 'request_status': 'REJECTED', 'reason': 'No'}],
+            self.two_months_ago)
+
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(schedule.status, "APPROVED")
+        self.assertEqual(schedule.request_id, original_id)
+
+    def _reassigned_request(self):
+        # Staff 2 moved to manager 1 after asking manager 6, whose team the schedule still counts in
+        db.session.add(Staff(staff_id=6, staff_fname="Test", staff_lname="Former", dept="Sales", position="Manager",
+                             country="CountryA", email="former@test.com", reporting_manager=6, role=3,
+                             password="pw"))
+        request_id = self._pending_request(2)
+        WFHSchedule.query.filter_by(request_id=request_id).update({'manager_id': 6})
+        db.session.commit()
+        return request_id
+
+    def assertLocksWrittenRows(self, approve):
+        request_id = self._reassigned_request()
+        with patch('app.services.wfh_approval_service.TeamOccupancyService.lock_rows',
+                   wraps=TeamOccupancyService.lock_rows) as lock_rows:
+            approve(request_id)
+
+        self.assertEqual(set(lock_rows.call_args.args[0]), {(1, self.date), (6, self.date)})
+        self.assertEqual(db.session.get(TeamDailyOccupancy, (6, self.date)).wfh_count_am, 1)
+
+    def test_approval_locks_the_rows_it_writes(self):
+        self.assertLocksWrittenRows(
+            lambda request_id: WFHApprovalService.approve_request(request_id, [self.date], self.two_months_ago))
+
+    def test_batch_approval_locks_the_rows_it_writes(self):
+        self.assertLocksWrittenRows(lambda request_id: WFHApprovalService.bulk_update_requests(
+            [{'request_id': request_id, 'request_status': 'APPROVED'}], self.two_months_ago))
+
+    def test_failure_rolls_back_whole_batch(self):
+        request_ids = [self._pending_request(staff_id) for staff_id in (2, 3)]
+        decisions = [{'request_id': request_id, 'request_status': 'APPROVED'} for request_id in request_ids]
+
+        # The second request fails after the first has been applied in the session
+        with patch('app.services.wfh_approval_service.WFHScheduleService.apply_status',
+                   side_effect=[None, Exception("Database error")]):
+            with self.assertRaises(Exception):
+                WFHApprovalService.bulk_update_requests(decisions, self.two_months_ago)
+
+        self.assertEqual(db.session.get(WFHRequest, request_ids[0]).status, "PENDING")
+        self.assertEqual(WFHSchedule.query.filter_by(status="APPROVED").count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -145,6 +145,66 @@ class WFHCheckServiceTestCase(unittest.TestCase):
             )
         self.assertEqual(str(context.exception), "No staff found with id: 1")
 
+    def test_check_team_count_ignores_other_teams_and_other_half(self):
+        date = datetime.now().date()
+
+        # staff3 is in another team, staff1's schedule is for the other half of the day
+        schedule1 = WFHSchedule(
+            request_id=1,
+            staff_id=self.staff3.staff_id,
+            manager_id=2,
+            date=date,
+            duration="FULL_DAY",
+            status="APPROVED",
+            dept=self.staff3.dept,
+            position=self.staff3.position,
+        )
+        schedule2 = WFHSchedule(
+            request_id=2,
+            staff_id=self.staff1.staff_id,
+            manager_id=1,
+            date=date,
+            duration="HALF_DAY_PM",
+            status="APPROVED",
+            dept=self.staff1.dept,
+            position=self.staff1.position,
+        )
+        db.session.add_all([schedule1, schedule2])
+        db.session.commit()
+
+        result = WFHCheckService.check_team_count(self.staff2.staff_id, date, "HALF_DAY_AM")
+        self.assertEqual(result, 'Success')
+
+        result = WFHCheckService.check_team_count(self.staff2.staff_id, date, "HALF_DAY_PM")
+        self.assertEqual(result, 'Unable to apply due to max limit')
+
+    def test_check_team_capacity_bulk(self):
+        date = datetime.now().date()
+        next_week = date + timedelta(days=7)
+
+        schedule = WFHSchedule(
+            request_id=1,
+            staff_id=self.staff1.staff_id,
+            manager_id=1,
+            date=next_week,
+            duration="FULL_DAY",
+            status="APPROVED",
+            dept=self.staff1.dept,
+            position=self.staff1.position,
+        )
+        db.session.add(schedule)
+        db.session.commit()
+
+        result = WFHCheckService.check_team_capacity_bulk(
+            self.staff2.staff_id, [next_week.isoformat(), date], "HALF_DAY_AM")
+
+        self.assertEqual(result['team_count'], 2)
+        self.assertEqual(result['violated_dates'], [next_week.isoformat()])
+        self.assertEqual(result['dates'], [
+            {'date': date.isoformat(), 'wfh_count': 0, 'headroom': 1},
+            {'date': next_week.isoformat(), 'wfh_count': 1, 'headroom': 0},
+        ])
+
     def test_check_team_count_2_staff_in_dept(self):
         # Remove staff from department
      
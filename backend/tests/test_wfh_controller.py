@@ -232,8 +232,9 @@ class WFHControllerTestCase(unittest.TestCase):
         db.session.add(wfh_request)
         db.session.commit()
 
-        with patch('app.services.wfh_check_service.WFHCheckService.check_team_count', 
-                return_value='Policy violated'):
+        violated_date = datetime.strptime(self.future_date, "%Y-%m-%d").date().isoformat()
+        with patch('app.services.wfh_check_service.WFHCheckService.check_team_capacity_bulk', 
+                return_value={'violated_dates': [violated_date]}):
             data = {
                 "request_id": wfh_request.request_id,
                 "request_status": "APPROVED",
@@ -274,6 +275,43 @@ class WFHControllerTestCase(unittest.TestCase):
             self.assertEqual(response.status_code, 500)
             self.assertIn("An error occurred", response.get_json()["message"])
 
+    def test_bulk_update_wfh_requests(self):
+        request_ids = self._add_pending_requests(2)
+        for request_id in request_ids:
+            wfh_request = WFHRequest.query.get(request_id)
+            db.session.add(WFHSchedule(
+                request_id=request_id, staff_id=self.staff.staff_id, manager_id=self.manager.staff_id,
+                date=wfh_request.start_date, duration="FULL_DAY", status="PENDING",
+                dept=self.staff.dept, position=self.staff.position,
+            ))
+        db.session.commit()
+
+        response = self.client.patch("/api/bulk-update-request", json={"requests": [
+            {"request_id": request_ids[0], "request_status": "REJECTED", "reason": "Busy"},
+            {"request_id": request_ids[1], "request_status": "REJECTED", "reason": "Busy"},
+            {"request_id": 999, "request_status": "APPROVED"},
+        ]})
+        resp_data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((resp_data["updated"], resp_data["failed"]), (2, 1))
+        self.assertEqual([r["success"] for r in resp_data["results"]], [True, True, False])
+        self.assertEqual(WFHRequest.query.get(request_ids[0]).status, "REJECTED")
+
+    def test_bulk_update_wfh_requests_invalid_body(self):
+        for body in [{}, {"requests": []}, {"requests": [{"request_status": "APPROVED"}]},
+                     {"requests": [{"request_id": "1", "request_status": "APPROVED"}]}]:
+            response = self.client.patch("/api/bulk-update-request", json=body)
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_bulk_update_wfh_requests_exception(self):
+        with patch('app.services.wfh_approval_service.WFHApprovalService.bulk_update_requests',
+                   side_effect=Exception("Database error")):
+            response = self.client.patch("/api/bulk-update-request", json={"requests": [
+                {"request_id": 1, "request_status": "APPROVED"}]})
+            self.assertEqual(response.status_code, 500)
+            self.assertIn("An error occurred", response.get_json()["message"])
+
     def test_reject_expired_request(self):
         # Create an expired request
         expired_date = (self.today - timedelta(days=61)).strftime("%Y-%m-%d")
@@ -322,10 +360,41 @@ class WFHControllerTestCase(unittest.TestCase):
             content_type="application/json",
         )
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.get_data(as_text=True), "done")
+        resp_data = response.get_json()
+        self.assertEqual(resp_data["team_count"], 2)
+        self.assertEqual(resp_data["violated_dates"], [])
+        self.assertEqual(resp_data["dates"], [{"date": self.future_date, "wfh_count": 0, "headroom": 1}])
+
+    def test_check_wfh_count_multiple_dates(self):
+        other_date = (self.today + timedelta(days=12)).strftime("%Y-%m-%d")
+        schedule = WFHSchedule(
+            request_id=1,
+            staff_id=self.manager.staff_id,
+            manager_id=self.manager.staff_id,
+            date=datetime.strptime(other_date, "%Y-%m-%d").date(),
+            duration="HALF_DAY_AM",
+            status="APPROVED",
+            dept=self.manager.dept,
+            position=self.manager.position,
+        )
+        db.session.add(schedule)
+        db.session.commit()
+
+        data = {"staff_id": self.staff.staff_id, "dates": [self.future_date, other_date], "duration": "FULL_DAY"}
+        response = self.client.post(
+            "/api/check-wfh-count",
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        resp_data = response.get_json()
+        self.assertEqual(resp_data["violated_dates"], [other_date])
+        self.assertEqual(resp_data["dates"][0]["headroom"], 1)
+        self.assertEqual(resp_data["dates"][1]["wfh_count"], 1)
+        self.assertEqual(resp_data["dates"][1]["headroom"], 0)
 
     def test_check_wfh_count_exception(self):
-        with patch('app.services.wfh_check_service.WFHCheckService.check_team_count', 
+        with patch('app.services.wfh_check_service.WFHCheckService.check_team_capacity_bulk', 
                 side_effect=Exception("Check failed")):
             data = {
                 "staff_id": self.staff.staff_id,
@@ -1147,6 +1216,176 @@ class WFHControllerTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("staff_requests", response.get_json())
 
+    def _add_expired_request(self):
+        # A PENDING request and schedule from before the two month approval window
+        expired_date = self.today - timedelta(days=61)
+        expired_request = WFHRequest(
+            staff_id=self.staff.staff_id, manager_id=self.manager.staff_id, request_date=expired_date,
+            start_date=expired_date, status="PENDING", reason_for_applying="Expired request", duration="FULL_DAY")
+        db.session.add(expired_request)
+        db.session.flush()
+        db.session.add(WFHSchedule(
+            request_id=expired_request.request_id, staff_id=self.staff.staff_id, manager_id=self.manager.staff_id,
+            date=expired_date, duration="FULL_DAY", status="PENDING", dept=self.staff.dept,
+            position=self.staff.position))
+        db.session.commit()
+        return expired_request.request_id
+
+    def test_reject_expired_request_is_a_change(self):
+        request_id = self._add_expired_request()
+        cursor = self.client.get('/api/changes?scope=company').get_json()["next_since"]
+
+        self.assertEqual(self.client.post("/api/reject-expired-request").status_code, 200)
+
+        resp_data = self.client.get(f'/api/changes?since={cursor}&scope=staff:{self.staff.staff_id}').get_json()
+        self.assertEqual([(r["request_id"], r["status"]) for r in resp_data["requests"]], [(request_id, "EXPIRED")])
+        self.assertEqual([s["status"] for s in resp_data["schedules"]], ["EXPIRED"])
+        self.assertGreater(resp_data["next_since"], cursor)
+
+    def _add_pending_requests(self, count):
+        requests = [
+            WFHRequest(staff_id=self.staff.staff_id, manager_id=self.manager.staff_id, request_date=self.today,
+                       start_date=self.today + timedelta(days=day), reason_for_applying="Paging",
+                       duration="FULL_DAY")
+            for day in range(1, count + 1)
+        ]
+        db.session.add_all(requests)
+        db.session.commit()
+        return [r.request_id for r in requests]
+
+    def test_get_staff_requests_paginated(self):
+        ids = self._add_pending_requests(5)
+
+        seen = []
+        cursor = None
+        while True:
+            url = f'/api/staff-requests/{self.staff.staff_id}?limit=2'
+            if cursor:
+                url += f'&cursor={cursor}'
+            resp_data = self.client.get(url).get_json()
+            seen.extend(r["request_id"] for r in resp_data["staff_requests"])
+            self.assertLessEqual(len(resp_data["staff_requests"]), 2)
+            cursor = resp_data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, ids)
+
+    def test_get_staff_requests_status_filter(self):
+        ids = self._add_pending_requests(2)
+        WFHRequest.query.get(ids[0]).status = "APPROVED"
+        db.session.commit()
+
+        response = self.client.get(f'/api/staff-requests/{self.staff.staff_id}?status=approved,rejected')
+        self.assertEqual([r["request_id"] for r in response.get_json()["staff_requests"]], [ids[0]])
+
+    def test_staff_requests_etag(self):
+        ids = self._add_pending_requests(2)
+        url = f'/api/staff-requests/{self.staff.staff_id}'
+
+        response = self.client.get(url)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_data(), b'')
+
+        # Another page of the same data has its own tag
+        self.assertNotEqual(self.client.get(f'{url}?limit=1').headers['ETag'], etag)
+
+        db.session.get(WFHRequest, ids[0]).status = "APPROVED"
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_personal_schedule_etag(self):
+        url = f'/api/personal-schedule/{self.staff.staff_id}'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        data = {
+            "staff_id": self.staff.staff_id, "manager_id": self.manager.staff_id, "reason_for_applying": "ETag",
+            "date": self.future_date, "duration": "FULL_DAY", "dept": self.staff.dept,
+            "position": self.staff.position,
+        }
+        self.assertEqual(self.client.post("/api/request", json=data).status_code, 201)
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("FullDayPending", [d["schedule"] for d in response.get_json()["dates"]])
+
+    def test_etags_change_when_requests_expire(self):
+        self._add_expired_request()
+        urls = [f'/api/staff-requests/{self.staff.staff_id}',
+                f'/api/personal-schedule/{self.staff.staff_id}?start_date={self.today - timedelta(days=70)}']
+        etags = [self.client.get(url).headers['ETag'] for url in urls]
+
+        self.assertEqual(self.client.post("/api/reject-expired-request").status_code, 200)
+
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(
+            [r["status"] for r in self.client.get(urls[0]).get_json()["staff_requests"]], ["EXPIRED"])
+
+    def test_personal_schedule_etag_follows_the_default_window(self):
+        url = f'/api/personal-schedule/{self.staff.staff_id}'
+        etag = self.client.get(url).headers['ETag']
+
+        class Tomorrow(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.now(tz) + timedelta(days=1)
+
+        with patch('app.controllers.wfh_controller.datetime', Tomorrow):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_manager_schedule_summary_etag(self):
+        request_id = self._add_pending_requests(1)[0]
+        day = self.today + timedelta(days=1)
+        db.session.add(WFHSchedule(request_id=request_id, staff_id=self.staff.staff_id,
+                                   manager_id=self.manager.staff_id, date=day, duration="FULL_DAY",
+                                   status="PENDING", dept=self.staff.dept, position=self.staff.position))
+        db.session.commit()
+        url = f'/api/manager-schedule-summary/{self.manager.staff_id}'
+        etag = self.client.get(url).headers['ETag']
+
+        # An unchanged summary is answered without building it
+        with patch.object(WFHScheduleService, 'get_manager_schedule_summary') as summary:
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+            summary.assert_not_called()
+
+        WFHScheduleService.update_schedule(request_id, "APPROVED")
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            next(d for d in response.get_json()["dates"] if d["date"] == day.isoformat())["wfh_count_am"], 1)
+
+    def test_get_pending_requests_paginated(self):
+        ids = self._add_pending_requests(3)
+
+        response = self.client.get(f"/api/pending-requests/{self.manager.staff_id}?limit=2")
+        resp_data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["request_id"] for r in resp_data["pending_requests"]], ids[:2])
+
+        response = self.client.get(
+            f"/api/pending-requests/{self.manager.staff_id}?limit=2&cursor={resp_data['next_cursor']}")
+        resp_data = response.get_json()
+        self.assertEqual([r["request_id"] for r in resp_data["pending_requests"]], ids[2:])
+        self.assertIsNone(resp_data["next_cursor"])
+
+    def test_request_list_invalid_paging_args(self):
+        for query in ["limit=0", "limit=abc", "cursor=bogus", "start_date=2024-13-01"]:
+            response = self.client.get(f"/api/pending-requests/{self.manager.staff_id}?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            response = self.client.get(f'/api/staff-requests/{self.staff.staff_id}?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
     def test_get_staff_requests_exception(self):
         with patch('app.services.wfh_request_service.WFHRequestService.get_staff_requests', 
                 side_effect=Exception("Database error")):
@@ -1364,6 +1603,39 @@ class WFHControllerTestCase(unittest.TestCase):
 
 
 
+    def test_changes_since_cursor(self):
+        response = self.client.get('/api/changes?scope=company')
+        self.assertEqual(response.status_code, 200)
+        cursor = response.get_json()["next_since"]
+
+        data = {
+            "staff_id": self.staff.staff_id, "manager_id": self.manager.staff_id, "reason_for_applying": "Sync",
+            "date": self.future_date, "duration": "FULL_DAY", "dept": self.staff.dept,
+            "position": self.staff.position,
+        }
+        request_id = self.client.post("/api/request", json=data).get_json()["request_id"]
+
+        for scope in (f"staff:{self.staff.staff_id}", f"team:{self.manager.staff_id}", "company"):
+            resp_data = self.client.get(f'/api/changes?since={cursor}&scope={scope}').get_json()
+            self.assertEqual([r["request_id"] for r in resp_data["requests"]], [request_id], scope)
+            self.assertEqual([s["date"] for s in resp_data["schedules"]], [self.future_date], scope)
+            self.assertGreater(resp_data["next_since"], cursor)
+            self.assertFalse(resp_data["has_more"])
+
+        # The manager is not part of their own team, and has no changes
+        resp_data = self.client.get(f'/api/changes?since={cursor}&scope=staff:{self.manager.staff_id}').get_json()
+        self.assertEqual((resp_data["requests"], resp_data["schedules"]), ([], []))
+
+        # Nothing new after the returned cursor
+        resp_data = self.client.get(f'/api/changes?since={resp_data["next_since"]}&scope=company').get_json()
+        self.assertEqual(resp_data["requests"], [])
+
+    def test_changes_invalid_args(self):
+        for query in ("scope=everyone", "scope=staff:abc", "scope=company&since=-1", "scope=company&limit=0", ""):
+            self.assertEqual(self.client.get(f'/api/changes?{query}').status_code, 400, query)
+        self.assertEqual(self.client.get('/api/changes?since=0&scope=team:999').status_code, 404)
+
+
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ from app import create_app, db
 from config import TestConfig
 from app.models.staff import Staff
 from app.models.wfh_request import WFHRequest
+from app.models.wfh_schedule import WFHSchedule
 from app.services.wfh_request_service import WFHRequestService
 
 
@@ -243,9 +244,34 @@ class WFHRequestServiceTestCase(unittest.TestCase):
         db.session.add_all([valid_request, expired_request])
         db.session.commit()
 
+        expired_schedule = WFHSchedule(
+            request_id=expired_request.request_id,
+            staff_id=self.staff3.staff_id,
+            manager_id=self.staff2.staff_id,
+            date=expired_start_date,
+            duration="FULL_DAY",
+            status="PENDING",
+            dept=self.staff3.dept,
+            position=self.staff3.position,
+        )
+        valid_schedule = WFHSchedule(
+            request_id=valid_request.request_id,
+            staff_id=self.staff3.staff_id,
+            manager_id=self.staff2.staff_id,
+            date=valid_start_date,
+            duration="FULL_DAY",
+            status="PENDING",
+            dept=self.staff3.dept,
+            position=self.staff3.position,
+        )
+        db.session.add_all([expired_schedule, valid_schedule])
+        db.session.commit()
+
         two_months_ago = today - timedelta(days=60)
-        request_list = WFHRequestService.reject_expired(two_months_ago)
-        self.assertEqual(len(request_list), 1)
+        counts = WFHRequestService.reject_expired(two_months_ago)
+        self.assertEqual(counts, {'requests': 1, 'schedules': 1})
+        self.assertEqual(expired_schedule.status, "EXPIRED")
+        self.assertEqual(valid_schedule.status, "PENDING")
         expired_request = WFHRequest.query.filter_by(
             reason_for_applying="Expired request"
         ).first()
@@ -363,6 +389,52 @@ class WFHRequestServiceTestCase(unittest.TestCase):
         self.assertEqual(len(requests), 0)
         self.assertEqual(requests, [])
 
+    def test_get_staff_requests_filters_and_pages(self):
+        today = datetime.now().date()
+        requests = [
+            WFHRequest(staff_id=3, manager_id=2, request_date=today, start_date=today + timedelta(days=day),
+                       reason_for_applying="Paging", duration="FULL_DAY", status=status)
+            for day, status in [(1, "PENDING"), (2, "APPROVED"), (3, "REJECTED"), (4, "APPROVED"), (20, "APPROVED")]
+        ]
+        # A recurring request that started earlier but still covers the filtered range
+        requests.append(WFHRequest(staff_id=3, manager_id=2, request_date=today, start_date=today - timedelta(days=7),
+                                   end_date=today + timedelta(days=14), reason_for_applying="Recurring",
+                                   duration="FULL_DAY", status="APPROVED"))
+        db.session.add_all(requests)
+        db.session.commit()
+        ids = [r.request_id for r in requests]
+
+        approved = WFHRequestService.get_staff_requests(3, statuses=["APPROVED"])
+        self.assertEqual([r.request_id for r in approved], [ids[1], ids[3], ids[4], ids[5]])
+
+        in_range = WFHRequestService.get_staff_requests(
+            3, start_date=today + timedelta(days=2), end_date=today + timedelta(days=10))
+        self.assertEqual([r.request_id for r in in_range], [ids[1], ids[2], ids[3], ids[5]])
+
+        first_page = WFHRequestService.get_staff_requests(3, limit=2)
+        second_page = WFHRequestService.get_staff_requests(3, limit=2, after_id=first_page[-1].request_id)
+        self.assertEqual([r.request_id for r in first_page + second_page], ids[:4])
+
+    def test_get_pending_requests_for_manager_pages(self):
+        today = datetime.now().date()
+        requests = [
+            WFHRequest(staff_id=3, manager_id=2, request_date=today, start_date=today + timedelta(days=day),
+                       reason_for_applying="Paging", duration="FULL_DAY")
+            for day in range(1, 6)
+        ]
+        db.session.add_all(requests)
+        db.session.commit()
+
+        page = WFHRequestService.get_pending_requests_for_manager(2, limit=3, after_id=requests[0].request_id)
+        self.assertEqual([r.request_id for r in page], [r.request_id for r in requests[1:4]])
+
+    def test_cursor_round_trip(self):
+        cursor = WFHRequestService.encode_cursor(42)
+        self.assertEqual(WFHRequestService.decode_cursor(cursor), 42)
+        for bad_cursor in ["not-a-cursor", WFHRequestService.encode_cursor("42")]:
+            with self.assertRaises(ValueError):
+                WFHRequestService.decode_cursor(bad_cursor)
+
     def test_check_withdrawal_1(self):
         today = datetime.now().date()
         start_date = today + timedelta(days=5)